@@ -5,87 +5,19 @@
 # via any medium is strictly prohibited. Proprietary and confidential.
 # ------------------------------------------------------------------------
 
-# Import public interface of the library
-
-# Graph
-from libspn.graph.scope import Scope
-from libspn.graph.node import Input
-from libspn.graph.node import Node
-from libspn.graph.node import OpNode
-from libspn.graph.node import VarNode
-from libspn.graph.node import ParamNode
-from libspn.graph.ivs import IVs
-from libspn.graph.contvars import ContVars
-from libspn.graph.raw_input import RawInput
-from libspn.graph.concat import Concat
-from libspn.graph.sum import Sum
-from libspn.graph.parsums import ParSums
-from libspn.graph.sums import Sums
-from libspn.graph.sumslayer import SumsLayer
-from libspn.graph.product import Product
-from libspn.graph.permproducts import PermProducts
-from libspn.graph.products import Products
-from libspn.graph.productslayer import ProductsLayer
-from libspn.graph.weights import Weights
-from libspn.graph.weights import assign_weights
-from libspn.graph.weights import initialize_weights
-from libspn.graph.serialization import serialize_graph
-from libspn.graph.serialization import deserialize_graph
-from libspn.graph.saver import Saver, JSONSaver
-from libspn.graph.loader import Loader, JSONLoader
-from libspn.graph.algorithms import compute_graph_up
-from libspn.graph.algorithms import compute_graph_up_down
-from libspn.graph.algorithms import traverse_graph
-from libspn.graph.distribution import GaussianLeaf
-
-# Generators
-from libspn.generation.dense import DenseSPNGenerator
-from libspn.generation.dense_multinodes import DenseSPNGeneratorMultiNodes
-from libspn.generation.dense_layernodes import DenseSPNGeneratorLayerNodes
-from libspn.generation.weights import WeightsGenerator
-from libspn.generation.weights import generate_weights
-
-# Inference and learning
-from libspn.inference.type import InferenceType
-from libspn.inference.value import Value
-from libspn.inference.value import LogValue
-from libspn.inference.mpe_path import MPEPath
-from libspn.inference.mpe_state import MPEState
-from libspn.inference.gradient import Gradient
-from libspn.learning.em import EMLearning
-from libspn.learning.gd import GDLearning
-from libspn.learning.type import LearningType
-from libspn.learning.type import LearningInferenceType
-
-# Data
-from libspn.data.dataset import Dataset
-from libspn.data.file import FileDataset
-from libspn.data.csv import CSVFileDataset
-from libspn.data.generated import GaussianMixtureDataset
-from libspn.data.generated import IntGridDataset
-from libspn.data.image import ImageFormat
-from libspn.data.image import ImageShape
-from libspn.data.image import ImageDatasetBase
-from libspn.data.image import ImageDataset
-from libspn.data.mnist import MNISTDataset
-from libspn.data.cifar import CIFAR10Dataset
-from libspn.data.writer import DataWriter
-from libspn.data.writer import CSVDataWriter
-from libspn.data.writer import ImageDataWriter
-
-# Models
-from libspn.models.model import Model
-from libspn.models.discrete_dense import DiscreteDenseModel
-from libspn.models.test import Poon11NaiveMixtureModel
-
-# Session
-from libspn.session import session
-
-# Visualization
-from libspn.visual.plot import plot_2d
-from libspn.visual.image import show_image
-from libspn.visual.tf_graph import display_tf_graph
-from libspn.visual.spn_graph import display_spn_graph
+"""LibSPN.
+
+The public interface of the library is imported lazily. Importing ``libspn``
+only configures logging, while each public name is imported from its
+submodule when it is first accessed, so that e.g. visualization, datasets and
+custom ops are loaded only by applications using them. Modules running TF
+graphs that may contain custom ops without building any SPN nodes, such as
+:mod:`libspn.inference.frozen`, must import :mod:`libspn.ops.ops` themselves.
+"""
+
+import importlib
+import sys
+import types
 
 # Logging
 from libspn.log import config_logger
@@ -95,19 +27,109 @@ from libspn.log import INFO
 from libspn.log import DEBUG1
 from libspn.log import DEBUG2
 
-# Custom TF ops
-from libspn.ops import ops
-
-# Utils and config
-from libspn import conf
-from libspn import utils
-from libspn.utils import ValueType
-
-# App
-from libspn.app import App
-
-# Exceptions
-from libspn.exceptions import StructureError
+# Public interface of the library, imported lazily
+_lazy_attrs = {
+    # Graph
+    'Scope': 'libspn.graph.scope',
+    'Input': 'libspn.graph.node',
+    'Node': 'libspn.graph.node',
+    'OpNode': 'libspn.graph.node',
+    'VarNode': 'libspn.graph.node',
+    'ParamNode': 'libspn.graph.node',
+    'IVs': 'libspn.graph.ivs',
+    'ContVars': 'libspn.graph.contvars',
+    'RawInput': 'libspn.graph.raw_input',
+    'Concat': 'libspn.graph.concat',
+    'Sum': 'libspn.graph.sum',
+    'ParSums': 'libspn.graph.parsums',
+    'Sums': 'libspn.graph.sums',
+    'SumsLayer': 'libspn.graph.sumslayer',
+    'Product': 'libspn.graph.product',
+    'PermProducts': 'libspn.graph.permproducts',
+    'Products': 'libspn.graph.products',
+    'ProductsLayer': 'libspn.graph.productslayer',
+    'Weights': 'libspn.graph.weights',
+    'assign_weights': 'libspn.graph.weights',
+    'initialize_weights': 'libspn.graph.weights',
+    'serialize_graph': 'libspn.graph.serialization',
+    'deserialize_graph': 'libspn.graph.serialization',
+    'Saver': 'libspn.graph.saver',
+    'JSONSaver': 'libspn.graph.saver',
+    'Loader': 'libspn.graph.loader',
+    'JSONLoader': 'libspn.graph.loader',
+    'compute_graph_up': 'libspn.graph.algorithms',
+    'compute_graph_up_down': 'libspn.graph.algorithms',
+    'traverse_graph': 'libspn.graph.algorithms',
+    'GaussianLeaf': 'libspn.graph.distribution',
+    # Generators
+    'DenseSPNGenerator': 'libspn.generation.dense',
+    'DenseSPNGeneratorMultiNodes': 'libspn.generation.dense_multinodes',
+    'DenseSPNGeneratorLayerNodes': 'libspn.generation.dense_layernodes',
+    'WeightsGenerator': 'libspn.generation.weights',
+    'generate_weights': 'libspn.generation.weights',
+    # Inference and learning
+    'InferenceType': 'libspn.inference.type',
+    'Value': 'libspn.inference.value',
+    'LogValue': 'libspn.inference.value',
+    'MPEPath': 'libspn.inference.mpe_path',
+    'MPEState': 'libspn.inference.mpe_state',
+    'TopKMPEState': 'libspn.inference.mpe_state',
+    'Gradient': 'libspn.inference.gradient',
+    'MarginalInferencer': 'libspn.inference.marginal',
+    'MarginalQueries': 'libspn.inference.marginal',
+    'Sample': 'libspn.inference.sample',
+    'CompiledSPN': 'libspn.inference.compiled',
+    'batch_log_likelihood': 'libspn.inference.parallel',
+    'export_frozen_graph': 'libspn.inference.frozen',
+    'FrozenSPN': 'libspn.inference.frozen',
+    'EMLearning': 'libspn.learning.em',
+    'GDLearning': 'libspn.learning.gd',
+    'LearningType': 'libspn.learning.type',
+    'LearningInferenceType': 'libspn.learning.type',
+    # Data
+    'Dataset': 'libspn.data.dataset',
+    'FileDataset': 'libspn.data.file',
+    'CSVFileDataset': 'libspn.data.csv',
+    'GaussianMixtureDataset': 'libspn.data.generated',
+    'IntGridDataset': 'libspn.data.generated',
+    'ImageFormat': 'libspn.data.image',
+    'ImageShape': 'libspn.data.image',
+    'ImageDatasetBase': 'libspn.data.image',
+    'ImageDataset': 'libspn.data.image',
+    'MNISTDataset': 'libspn.data.mnist',
+    'CIFAR10Dataset': 'libspn.data.cifar',
+    'BinaryShardDataset': 'libspn.data.binary',
+    'DataWriter': 'libspn.data.writer',
+    'CSVDataWriter': 'libspn.data.writer',
+    'ImageDataWriter': 'libspn.data.writer',
+    'BinaryShardDataWriter': 'libspn.data.writer',
+    # Models
+    'Model': 'libspn.models.model',
+    'DiscreteDenseModel': 'libspn.models.discrete_dense',
+    'Poon11NaiveMixtureModel': 'libspn.models.test',
+    # Session
+    'session': 'libspn.session',
+    # Profiler
+    'profile_nodes': 'libspn.profiler',
+    'ProfileReport': 'libspn.profiler',
+    'NodeProfile': 'libspn.profiler',
+    # Visualization
+    'plot_2d': 'libspn.visual.plot',
+    'show_image': 'libspn.visual.image',
+    'display_tf_graph': 'libspn.visual.tf_graph',
+    'display_spn_graph': 'libspn.visual.spn_graph',
+    # Custom TF ops
+    'ops': 'libspn.ops',
+    # Utils and config
+    'conf': 'libspn',
+    'utils': 'libspn',
+    'ValueType': 'libspn.utils',
+    # App
+    'App': 'libspn.app',
+    # Exceptions
+    'StructureError': 'libspn.exceptions',
+}
+"""Modules from which public names are imported, indexed by name."""
 
 # All
 __all__ = [
@@ -127,16 +149,21 @@ __all__ = [
     'DenseSPNGeneratorLayerNodes', 'WeightsGenerator', 'generate_weights',
     # Inference and learning
     'InferenceType', 'Value', 'LogValue', 'MPEPath', 'Gradient', 'MPEState',
+    'TopKMPEState', 'MarginalInferencer', 'MarginalQueries', 'Sample',
+    'CompiledSPN', 'batch_log_likelihood',
+    'export_frozen_graph', 'FrozenSPN',
     'EMLearning', 'GDLearning', 'LearningType', 'LearningInferenceType',
     # Data
     'Dataset', 'FileDataset', 'CSVFileDataset', 'GaussianMixtureDataset',
     'IntGridDataset', 'ImageFormat', 'ImageShape', 'ImageDatasetBase',
-    'ImageDataset', 'MNISTDataset', 'CIFAR10Dataset',
-    'DataWriter', 'CSVDataWriter', 'ImageDataWriter',
+    'ImageDataset', 'MNISTDataset', 'CIFAR10Dataset', 'BinaryShardDataset',
+    'DataWriter', 'CSVDataWriter', 'ImageDataWriter', 'BinaryShardDataWriter',
     # Models
     'Model', 'DiscreteDenseModel', 'Poon11NaiveMixtureModel',
     # Session
     'session',
+    # Profiler
+    'profile_nodes', 'ProfileReport', 'NodeProfile',
     # Visualization
     'plot_2d', 'show_image', 'display_tf_graph', 'display_spn_graph',
     # Logging
@@ -146,5 +173,46 @@ __all__ = [
     # Exceptions
     'StructureError']
 
+
+def _import_attr(name):
+    """Import the public name ``name`` from its module."""
+    module = importlib.import_module(_lazy_attrs[name])
+    try:
+        # Not using getattr, which could call __getattr__ of this module
+        return module.__dict__[name]
+    except KeyError:
+        # The name is a submodule that was not imported yet
+        return importlib.import_module(module.__name__ + '.' + name)
+
+
+class _LazyModule(types.ModuleType):
+    """The type of the ``libspn`` module, importing public names on first
+    access."""
+
+    def __getattr__(self, name):
+        if name not in _lazy_attrs:
+            raise AttributeError("module '%s' has no attribute '%s'"
+                                 % (__name__, name))
+        value = _import_attr(name)
+        # Store, so that the name is imported only once
+        super().__setattr__(name, value)
+        return value
+
+    def __setattr__(self, name, value):
+        # Importing a submodule binds it to its name in the package, which
+        # must not shadow a public name of a different object (e.g. the
+        # libspn.session module and the session() function)
+        if (isinstance(value, types.ModuleType) and name in _lazy_attrs and
+                _lazy_attrs[name] != __name__ and
+                value.__name__ == __name__ + '.' + name):
+            return
+        super().__setattr__(name, value)
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(__all__))
+
+
+sys.modules[__name__].__class__ = _LazyModule
+
 # Configure the logger to show INFO and WARNING by default
 config_logger(level=INFO)
@@ -7,6 +7,7 @@
 
 """Global configuration options of LibSPN."""
 
+import os
 import tensorflow as tf
 
 dtype = tf.float32
@@ -37,3 +38,19 @@ memoization = True
 """Whether to use LRU caches to function
 return values in successive calls for reduced
 graph size."""
+
+memoization_maxsize = None
+"""Maximum number of values cached by each memoized function for a single
+TF graph. If ``None``, the caches are unbounded, but still released together
+with the TF graph."""
+
+tf_data_pipeline = False
+"""Whether :meth:`~libspn.Dataset.get_data` builds a ``tf.data`` input pipeline
+instead of an input pipeline based on queue runners."""
+
+data_prefetch = 2
+"""Number of batches prefetched by ``tf.data`` input pipelines of datasets."""
+
+data_cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "libspn")
+"""Directory in which datasets cache preprocessed data. If ``None``, caching is
+disabled."""
@@ -0,0 +1,204 @@
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+import json
+import os
+import numpy as np
+import tensorflow as tf
+from libspn.data.dataset import Dataset
+from libspn import conf
+from libspn import utils
+
+INDEX_FILE = "index.json"
+"""Name of the index file of a binary shard dataset."""
+
+FORMAT_NAME = "libspn-binary-shards"
+FORMAT_VERSION = 1
+
+
+def shard_files(path, shard):
+    """Get the paths of the samples and labels files of a shard."""
+    return (os.path.join(path, shard['name'] + ".samples"),
+            os.path.join(path, shard['name'] + ".labels"))
+
+
+def read_index(path):
+    """Read the index of the binary shard dataset stored in the directory
+    ``path``."""
+    with open(os.path.join(path, INDEX_FILE)) as f:
+        index = json.load(f)
+    if index.get('format') != FORMAT_NAME:
+        raise ValueError("'%s' is not a binary shard dataset" % path)
+    if index.get('version') != FORMAT_VERSION:
+        raise ValueError("Unsupported binary shard dataset version %s"
+                         % index.get('version'))
+    return index
+
+
+def _np_to_tf_dtype(dtype):
+    return tf.string if dtype.kind == 'S' else tf.as_dtype(dtype)
+
+
+class BinaryShardDataset(Dataset):
+    """A dataset read from fixed-width binary shards written by
+    :class:`~libspn.BinaryShardDataWriter`.
+
+    The dataset is a directory containing an index file and shards, each
+    storing a raw array of samples and optionally a raw array of labels. The
+    shards are memory-mapped and samples are read by index, so that data is
+    read without parsing or copying entire files, and shuffling is applied
+    to all samples in the dataset without a shuffling queue.
+
+    If the dataset contains labels, the data is returned as a tuple of tensors
+    ``(samples, labels)``, where ``samples`` has shape ``[batch_size,
+    num_vars]`` and ``labels`` has shape ``[batch_size, num_labels]``.
+    Otherwise, a single tensor ``samples`` is returned.
+
+    Args:
+        path (str): Path to the directory with the dataset.
+        num_vals (int or list of int): Number of values of each variable. Can be
+            a single value or a list of values, one for each of ``num_vars``
+            variables. Use ``None``, to indicate that a variable is continuous,
+            in the range ``[0, 1]``.
+        num_epochs (int): Number of epochs of produced data.
+        batch_size (int): Size of a single batch.
+        shuffle (bool): Shuffle data within each epoch.
+        num_threads (int): Number of threads enqueuing the data queue. If
+                           larger than ``1``, the performance will be better,
+                           but examples might not be in order even if
+                           ``shuffle`` is ``False``.
+        allow_smaller_final_batch(bool): If ``False``, the last batch will be
+                                         omitted if it has less elements than
+                                         ``batch_size``.
+        seed (int): Optional. Seed used when shuffling.
+    """
+
+    def __init__(self, path, num_vals, num_epochs, batch_size, shuffle,
+                 num_threads=1, allow_smaller_final_batch=False, seed=None):
+        self._path = os.path.expanduser(path)
+        index = read_index(self._path)
+        labels = index['labels']
+        super().__init__(num_vars=index['samples']['num_cols'],
+                         num_vals=num_vals,
+                         num_labels=labels['num_cols'] if labels else 0,
+                         num_epochs=num_epochs, batch_size=batch_size,
+                         shuffle=shuffle,
+                         # Samples are shuffled by index in this class
+                         # so batch shuffling is not needed
+                         shuffle_batch=False, min_after_dequeue=None,
+                         num_threads=num_threads,
+                         allow_smaller_final_batch=allow_smaller_final_batch,
+                         seed=seed)
+        self._shards = index['shards']
+        self._samples_dtype = np.dtype(index['samples']['dtype'])
+        self._labels_dtype = None
+        if labels:
+            # String labels of different shards can have different widths
+            self._labels_dtype = max(
+                [np.dtype(labels['dtype'])] +
+                [np.dtype(s['labels_dtype']) for s in self._shards],
+                key=lambda d: d.itemsize)
+        self._offsets = np.cumsum([0] + [s['num_rows'] for s in self._shards])
+        self._maps = None
+
+    @property
+    def path(self):
+        """str: Path to the directory with the dataset."""
+        return self._path
+
+    @property
+    def num_samples(self):
+        """int: Number of samples in the dataset."""
+        return int(self._offsets[-1])
+
+    def _open_shards(self):
+        """Memory-map the arrays of all shards."""
+        if self._maps is None:
+            maps = []
+            for shard in self._shards:
+                samples_file, labels_file = shard_files(self._path, shard)
+                samples = np.memmap(samples_file, dtype=self._samples_dtype,
+                                    mode='r',
+                                    shape=(shard['num_rows'], self._num_vars))
+                labels = (np.memmap(labels_file, dtype=shard['labels_dtype'],
+                                    mode='r',
+                                    shape=(shard['num_rows'], self._num_labels))
+                          if self._num_labels else None)
+                maps.append((samples, labels))
+            self._maps = maps
+        return self._maps
+
+    def read_rows(self, indices):
+        """Read samples and labels with the given indices.
+
+        Args:
+            indices (array): A 1D array of sample indices.
+
+        Returns:
+            list of array: Samples of shape ``[len(indices), num_vars]`` and,
+            if the dataset contains labels, labels of shape ``[len(indices),
+            num_labels]``.
+        """
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        maps = self._open_shards()
+        shard_ids = np.searchsorted(self._offsets, indices, side='right') - 1
+        samples = np.empty((indices.size, self._num_vars),
+                           dtype=self._samples_dtype)
+        labels = (np.empty((indices.size, self._num_labels),
+                           dtype=self._labels_dtype)
+                  if self._num_labels else None)
+        for s in np.unique(shard_ids):
+            selected = shard_ids == s
+            rows = indices[selected] - self._offsets[s]
+            samples[selected] = maps[s][0][rows]
+            if labels is not None:
+                labels[selected] = maps[s][1][rows]
+        return [samples] if labels is None else [samples, labels]
+
+    def _read_tensors(self, indices, shape):
+        """Assemble a TF operation reading the rows with the given indices
+        and setting the static shapes of the results."""
+        tout = [_np_to_tf_dtype(self._samples_dtype)]
+        if self._num_labels:
+            tout.append(_np_to_tf_dtype(self._labels_dtype))
+        data = tf.py_func(lambda i: self.read_rows(i), [indices], tout,
+                          stateful=False, name="read_rows")
+        data[0].set_shape(shape + [self._num_vars])
+        if self._num_labels:
+            data[1].set_shape(shape + [self._num_labels])
+        return data
+
+    @utils.docinherit(Dataset)
+    def generate_data(self):
+        index = tf.train.range_input_producer(
+            self.num_samples, num_epochs=self._num_epochs,
+            shuffle=self._shuffle, seed=self._seed).dequeue()
+        data = self._read_tensors(tf.reshape(index, [1]), [1])
+        return [tf.reshape(d, [-1]) for d in data]
+
+    @utils.docinherit(Dataset)
+    def process_data(self, data):
+        return data
+
+    @utils.docinherit(Dataset)
+    def get_tf_dataset(self, num_epochs=None):
+        # Batches of indices are read at once, instead of single samples
+        if num_epochs is None:
+            num_epochs = self._num_epochs
+        with tf.name_scope("Dataset") as self._name_scope:
+            dataset = tf.data.Dataset.range(self.num_samples)
+            if self._shuffle:
+                dataset = dataset.shuffle(self.num_samples, seed=self._seed,
+                                          reshuffle_each_iteration=True)
+            dataset = dataset.repeat(num_epochs).batch(
+                self._batch_size,
+                drop_remainder=not self._allow_smaller_final_batch)
+            dataset = dataset.map(
+                lambda indices: tuple(self.process_data(
+                    self._read_tensors(indices, [None]))),
+                num_parallel_calls=self._num_threads)
+            return dataset.prefetch(conf.data_prefetch)
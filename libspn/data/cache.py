@@ -0,0 +1,157 @@
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+"""On-disk cache of preprocessed dataset arrays.
+
+Arrays are stored as ``.npy`` files in :attr:`libspn.conf.data_cache_dir` and
+opened as read-only memory maps, so that repeated runs and multiple processes
+share the page cache instead of preprocessing the data again. Cache entries are
+identified by a key computed from the preprocessing parameters and the
+signature (path, size and modification time) of the source files, so that
+modified source files are never served from the cache.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+from libspn import conf
+from libspn.log import get_logger
+
+logger = get_logger()
+
+
+def source_signature(paths):
+    """Get the signature of the source files ``paths`` used in cache keys.
+
+    Args:
+        paths (list of str): Paths to the files.
+
+    Returns:
+        list: A list of ``[path, size, mtime]`` for every file.
+    """
+    signature = []
+    for p in paths:
+        stat = os.stat(p)
+        signature.append([os.path.realpath(p), stat.st_size, stat.st_mtime_ns])
+    return signature
+
+
+def cache_key(**fields):
+    """Compute a cache key from JSON-serializable ``fields``.
+
+    Returns:
+        str: Hexadecimal digest of the fields.
+    """
+    data = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def cache_path(name, key, suffix='.npy'):
+    """Get the path of the cache entry ``name`` with the given key.
+
+    Args:
+        name (str): Name of the entry.
+        key (str): Key of the entry obtained with :func:`cache_key`.
+        suffix (str): Suffix of the file name.
+
+    Returns:
+        str: The path, or ``None`` if caching is disabled.
+    """
+    if conf.data_cache_dir is None:
+        return None
+    return os.path.join(os.path.expanduser(conf.data_cache_dir),
+                        "%s-%s%s" % (name, key, suffix))
+
+
+def load_array(path, mmap=True):
+    """Load an array from the cache.
+
+    Args:
+        path (str): Path to the cache entry or ``None``.
+        mmap (bool): If ``True``, open the array as a read-only memory map.
+
+    Returns:
+        array: The array or ``None`` if the entry does not exist.
+    """
+    if path is None or not os.path.isfile(path):
+        return None
+    try:
+        return np.load(path, mmap_mode='r' if mmap else None)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring corrupted cache entry %s: %s" % (path, e))
+        return None
+
+
+def save_array(path, array):
+    """Store an array in the cache. The file is written atomically, so that
+    concurrent processes never read partially written entries. Failures to
+    write are logged and otherwise ignored.
+
+    Args:
+        path (str): Path to the cache entry or ``None``.
+        array (array): The array.
+    """
+    if path is None:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    except OSError as e:
+        logger.warning("Cannot write cache entry %s: %s" % (path, e))
+
+
+@contextmanager
+def array_writer(path, shape, dtype):
+    """Context manager creating an array, which is stored in the cache when the
+    context exits without errors. The array is a memory map of a temporary
+    file in the cache directory, so that it does not need to fit in memory,
+    and the file is moved to ``path`` atomically. If ``path`` is ``None`` or
+    the file cannot be created, the array is allocated in memory and not
+    stored.
+
+    Args:
+        path (str): Path to the cache entry or ``None``.
+        shape (tuple): Shape of the array.
+        dtype: Data type of the array.
+
+    Yields:
+        array: The array to fill.
+    """
+    array = None
+    if path is not None:
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                            suffix='.tmp')
+            os.close(fd)
+            array = np.lib.format.open_memmap(tmp_path, mode='w+',
+                                              dtype=dtype, shape=shape)
+        except OSError as e:
+            logger.warning("Cannot write cache entry %s: %s" % (path, e))
+            if tmp_path is not None:
+                os.remove(tmp_path)
+    if array is None:
+        yield np.empty(shape, dtype=dtype)
+        return
+    try:
+        yield array
+        array.flush()
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -105,14 +105,31 @@ class CIFAR10Dataset(ImageDatasetBase):
         if self._classes is not None:
             raise NotImplementedError("class filtering is not implemented for CIFAR10Dataset")
         file_queue = self._get_file_queue()
-        # Every record consists of a label and an image
-        num_bytes = (1 +  # Label, 2 for CIFAR-100
-                     self._orig_height * self._orig_width *
-                     self._orig_num_channels)
         # Reader
-        reader = tf.FixedLengthRecordReader(record_bytes=num_bytes)
+        reader = tf.FixedLengthRecordReader(record_bytes=self._record_bytes)
         # Read uint8 record
         key, value = reader.read(file_queue)
+        return self._parse_record(value)
+
+    @utils.docinherit(Dataset)
+    def generate_tf_dataset(self, num_epochs):
+        if self._classes is not None:
+            raise NotImplementedError("class filtering is not implemented for CIFAR10Dataset")
+        records = self._get_file_dataset(num_epochs).flat_map(
+            lambda file: tf.data.FixedLengthRecordDataset(
+                file, record_bytes=self._record_bytes))
+        return records.map(self._parse_record,
+                           num_parallel_calls=self._num_threads)
+
+    @property
+    def _record_bytes(self):
+        # Every record consists of a label and an image
+        return (1 +  # Label, 2 for CIFAR-100
+                self._orig_height * self._orig_width * self._orig_num_channels)
+
+    def _parse_record(self, value):
+        """Parse a single binary record into an image and a label."""
+        num_bytes = self._record_bytes
         record = tf.decode_raw(value, tf.uint8)
         # Get label (initial byte)
         label = tf.cast(tf.strided_slice(record, [0], [1]), tf.int32)
@@ -5,9 +5,13 @@
 # via any medium is strictly prohibited. Proprietary and confidential.
 # ------------------------------------------------------------------------
 
+from itertools import islice
+import numpy as np
 import tensorflow as tf
 from libspn.data.dataset import Dataset
 from libspn.data.file import FileDataset
+from libspn.data import cache
+from libspn.log import get_logger
 from libspn import utils
 
 
@@ -37,6 +41,14 @@ class CSVFileDataset(FileDataset):
         dataset = CustomCSVFileDataset(...,
                                        defaults=[[1.0], [1], [1], [1.0], [1.0]])
 
+    If ``in_memory`` is ``True``, instead of reading the files line by line
+    using TF readers, all files are parsed in large chunks using NumPy and the
+    parsed columns are cached on disk in :attr:`libspn.conf.data_cache_dir`,
+    keyed by the size and modification time of the files. The samples are then
+    served from the (memory-mapped) columns, and shuffling is applied to all
+    samples instead of using a shuffling queue. The columns of each sample are
+    passed to :meth:`process_data` in the same way as in the default mode.
+
     Args:
         files (str or list): A string containing a path to a file or a glob
                              matching multiple files, or a list of paths to
@@ -69,19 +81,36 @@ class CSVFileDataset(FileDataset):
                                          omitted if it has less elements than
                                          ``batch_size``.
         seed (int): Optional. Seed used when shuffling.
+        in_memory (bool): If ``True``, parse the files with NumPy, cache the
+                          result and serve the samples from memory. In this
+                          mode, ``defaults`` must contain values, not tensors.
     """
 
+    __logger = get_logger()
+    __info = __logger.info
+
+    _CHUNK_SIZE = 100000
+    """Number of lines parsed at once in the in-memory mode."""
+
     def __init__(self, files, num_vals, defaults,
                  num_epochs, batch_size, shuffle, num_labels=0,
                  min_after_dequeue=None, num_threads=1,
-                 allow_smaller_final_batch=False, seed=None):
+                 allow_smaller_final_batch=False, seed=None, in_memory=False):
         if not isinstance(defaults, list):
             raise ValueError("defaults must be a list of Tensors")
+        if in_memory and any(isinstance(d, tf.Tensor) or len(d) != 1
+                             for d in defaults):
+            raise ValueError("defaults must be single-element lists of values "
+                             "if in_memory is True")
         self._defaults = defaults
+        self._in_memory = in_memory
+        self._columns = None
         super().__init__(files=files, num_vars=len(defaults) - num_labels,
                          num_vals=num_vals, num_labels=num_labels,
                          num_epochs=num_epochs, batch_size=batch_size,
-                         shuffle=shuffle, shuffle_batch=shuffle,
+                         shuffle=shuffle,
+                         # Samples are shuffled by index in the in-memory mode
+                         shuffle_batch=shuffle and not in_memory,
                          min_after_dequeue=min_after_dequeue,
                          num_threads=num_threads,
                          allow_smaller_final_batch=allow_smaller_final_batch,
@@ -97,15 +126,152 @@ class CSVFileDataset(FileDataset):
                 raise ValueError("num_val '%s' is not compatible with default '%s'"
                                  % (n, d))
 
+    @property
+    def in_memory(self):
+        """bool: ``True`` if the data is parsed with NumPy and served from
+        memory."""
+        return self._in_memory
+
+    @property
+    @utils.docinherit(Dataset)
+    def num_samples(self):
+        # The number of lines is known only after parsing
+        return len(self._load_columns()[0]) if self._in_memory else None
+
+    def _column_dtypes(self):
+        """Get the NumPy dtypes of the columns, matching the dtypes produced
+        by ``tf.decode_csv`` for the defaults."""
+        dtypes = []
+        for d in self._defaults:
+            if isinstance(d[0], (str, bytes)):
+                dtypes.append(np.dtype(object))
+            elif isinstance(d[0], float):
+                dtypes.append(np.dtype(np.float32))
+            elif isinstance(d[0], int):
+                dtypes.append(np.dtype(np.int32))
+            else:
+                raise ValueError("Unsupported default value '%s'" % d[0])
+        return dtypes
+
+    def _parse_file(self, path):
+        """Parse a CSV file in chunks of lines, using pandas if available.
+
+        Returns:
+            list of array: Columns of the file, with missing fields replaced
+            by the defaults.
+        """
+        dtypes = self._column_dtypes()
+        try:
+            import pandas as pd
+        except ImportError:
+            chunks = list(self._parse_chunks_numpy(path, dtypes))
+        else:
+            chunks = list(self._parse_chunks_pandas(pd, path, dtypes))
+        if not chunks:
+            return [np.empty(0, dtype=bytes if d.kind == 'O' else d)
+                    for d in dtypes]
+        return [np.concatenate([c[i] for c in chunks])
+                for i in range(len(dtypes))]
+
+    def _parse_chunks_pandas(self, pd, path, dtypes):
+        """Parse a CSV file in chunks of lines with pandas, reading missing
+        fields as NaN."""
+        try:
+            reader = pd.read_csv(
+                path, header=None, names=list(range(len(dtypes))),
+                dtype={i: str if d.kind == 'O' else np.float64
+                       for i, d in enumerate(dtypes)},
+                keep_default_na=False, na_values=[''], encoding='utf-8',
+                chunksize=self._CHUNK_SIZE)
+        except pd.errors.EmptyDataError:
+            return
+        for frame in reader:
+            yield [self._fill_missing(i, frame[i].to_numpy(),
+                                      frame[i].isna().to_numpy(), d)
+                   for i, d in enumerate(dtypes)]
+
+    def _parse_chunks_numpy(self, path, dtypes):
+        """Parse a CSV file in chunks of lines with NumPy. Chunks with missing
+        fields or string columns are parsed as strings."""
+        numeric = all(d.kind != 'O' for d in dtypes)
+        with open(path, encoding='utf-8') as f:
+            while True:
+                lines = list(islice(f, self._CHUNK_SIZE))
+                if not lines:
+                    break
+                if numeric:
+                    try:
+                        data = np.loadtxt(lines, delimiter=',', dtype=np.float64,
+                                          ndmin=2, encoding='utf-8')
+                    except ValueError:
+                        # Missing fields
+                        pass
+                    else:
+                        yield [data[:, i].astype(d) for i, d in enumerate(dtypes)]
+                        continue
+                data = np.loadtxt(lines, delimiter=',', dtype=str, ndmin=2,
+                                  encoding='utf-8')
+                yield [self._fill_missing(i, data[:, i], data[:, i] == '', d)
+                       for i, d in enumerate(dtypes)]
+
+    def _fill_missing(self, i, values, missing, dtype):
+        """Replace the ``missing`` values of column ``i`` by the default and
+        convert the column to ``dtype``, or to fixed width bytes for string
+        columns."""
+        default = self._defaults[i][0]
+        if dtype.kind == 'O' or values.dtype.kind == 'U':
+            default = (default.decode('utf-8') if isinstance(default, bytes)
+                       else str(default))
+        values = np.where(missing, default, values)
+        if dtype.kind == 'O':
+            return np.char.encode(values.astype(str), 'utf-8')
+        return values.astype(dtype)
+
+    def _load_columns(self):
+        """Load the columns of all files from the cache, or parse the files
+        and store the columns in the cache."""
+        if self._columns is not None:
+            return self._columns
+        files, _ = self._get_files_labels(self._files)
+        key = cache.cache_key(
+            defaults=[d[0] for d in self._defaults],
+            sources=cache.source_signature(files))
+        path = cache.cache_path('csv', key)
+        data = cache.load_array(path)
+        if data is None:
+            self.__info("Parsing %d CSV files" % len(files))
+            columns = [np.concatenate(c) for c in
+                       zip(*[self._parse_file(f) for f in files])]
+            data = np.empty(len(columns[0]), dtype=[
+                ('c%d' % i, c.dtype) for i, c in enumerate(columns)])
+            for i, c in enumerate(columns):
+                data['c%d' % i] = c
+            cache.save_array(path, data)
+        self._columns = [data[n] for n in data.dtype.names]
+        return self._columns
+
     @utils.docinherit(Dataset)
     def generate_data(self):
         if self._classes is not None:
             raise NotImplementedError("class filtering is not implemented for CSVDataset")
+        if self._in_memory:
+            return self._get_rows_data(self._load_columns())
         file_queue = self._get_file_queue()
         reader = tf.TextLineReader()
         key, value = reader.read(file_queue)
         return tf.decode_csv(value, record_defaults=self._defaults)
 
+    @utils.docinherit(Dataset)
+    def generate_tf_dataset(self, num_epochs):
+        if self._classes is not None:
+            raise NotImplementedError("class filtering is not implemented for CSVDataset")
+        if self._in_memory:
+            return self._get_rows_dataset(self._load_columns(), num_epochs)
+        lines = self._get_file_dataset(num_epochs).flat_map(tf.data.TextLineDataset)
+        return lines.map(
+            lambda line: tuple(tf.decode_csv(line, record_defaults=self._defaults)),
+            num_parallel_calls=self._num_threads)
+
     @utils.docinherit(Dataset)
     def process_data(self, data):
         if self._num_labels > 0:
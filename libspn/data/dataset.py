@@ -8,13 +8,17 @@
 from abc import ABC, abstractmethod
 import tensorflow as tf
 import numpy as np
-from libspn.session import session
 from libspn.log import get_logger
+from libspn import conf
 
 
 class Dataset(ABC):
     """An abstract class defining the interface of a dataset.
 
+    The data can be served by an input pipeline based on queue runners, which
+    must be started e.g. using :func:`~libspn.session`, or by a ``tf.data``
+    pipeline, which does not use queue runners (see :meth:`get_tf_dataset`).
+
     Args:
         num_vars (int): Number of variables in each data sample.
         num_vals (int or list of int): Number of values of each variable. Can be
@@ -36,7 +40,9 @@ class Dataset(ABC):
                            but examples might not be in order even if
                            ``shuffle_batch`` is ``False``. If ``shuffle_batch``
                            is ``True``, this might lead to examples repeating in
-                           the same batch.
+                           the same batch. In ``tf.data`` pipelines, this is the
+                           number of samples processed in parallel, which
+                           preserves the order of the samples.
         allow_smaller_final_batch(bool): If ``False``, the last batch will be
                                          omitted if it has less elements than
                                          ``batch_size``.
@@ -138,6 +144,12 @@ class Dataset(ABC):
         """int: Seed used when shuffling."""
         return self._seed
 
+    @property
+    def num_samples(self):
+        """int: Number of samples in a single epoch, or ``None`` if it is not
+        known before reading the data."""
+        return None
+
     @property
     def allow_smaller_final_batch(self):
         """bool: If ``False``, the last batch is omitted if it has less
@@ -147,15 +159,86 @@ class Dataset(ABC):
     def get_data(self):
         """Get an operation obtaining batches of data from the dataset.
 
+        If :attr:`libspn.conf.tf_data_pipeline` is ``True``, the data is served
+        by a ``tf.data`` pipeline built by :meth:`get_tf_dataset` through a
+        one-shot iterator. Otherwise, queue runners are used. In both cases,
+        the operation raises ``OutOfRangeError`` after the last batch.
+
         Returns:
             A tensor or a list of tensors with the batch data.
         """
+        if conf.tf_data_pipeline:
+            iterator = self.get_tf_dataset().make_one_shot_iterator()
+            return self._unpack_batch(iterator.get_next())
         self.__info("Building dataset operations")
         with tf.name_scope("Dataset") as self._name_scope:
             raw_data = self.generate_data()
             proc_data = self.process_data(raw_data)
             return self.batch_data(proc_data)
 
+    def get_tf_dataset(self, num_epochs=None):
+        """Get a ``tf.data`` pipeline producing batches of data from the
+        dataset.
+
+        Samples are processed in parallel by :meth:`process_data` using
+        ``num_threads`` calls, shuffled deterministically if ``seed`` is set,
+        batched and prefetched (see :attr:`libspn.conf.data_prefetch`).
+
+        Args:
+            num_epochs (int): Number of epochs of produced data. If ``None``,
+                              the number of epochs of the dataset is used.
+
+        Returns:
+            tf.data.Dataset: Dataset producing tuples of batch tensors.
+        """
+        if num_epochs is None:
+            num_epochs = self._num_epochs
+        self.__info("Building tf.data dataset operations")
+        with tf.name_scope("Dataset") as self._name_scope:
+            dataset = self.generate_tf_dataset(num_epochs)
+            dataset = dataset.map(
+                lambda *data: tuple(self.process_data(list(data))),
+                num_parallel_calls=self._num_threads)
+            if self._shuffle_batch:
+                dataset = dataset.shuffle(self._min_after_dequeue,
+                                          seed=self._seed)
+            dataset = dataset.batch(
+                self._batch_size,
+                drop_remainder=not self._allow_smaller_final_batch)
+            return dataset.prefetch(conf.data_prefetch)
+
+    def get_iterator(self, num_epochs=1):
+        """Get an initializable iterator over the batches of a ``tf.data``
+        pipeline of the dataset. Running the initializer of the iterator
+        restarts the data, which makes it possible to iterate over epochs
+        explicitly, e.g.::
+
+            iterator = dataset.get_iterator()
+            data = iterator.get_next()
+            for epoch in range(num_epochs):
+                sess.run(iterator.initializer)
+                try:
+                    while True:
+                        sess.run(data)
+                except tf.errors.OutOfRangeError:
+                    pass
+
+        Args:
+            num_epochs (int): Number of epochs of data produced after each
+                              initialization of the iterator.
+
+        Returns:
+            tf.data.Iterator: The iterator. ``get_next()`` returns a tuple of
+            batch tensors.
+        """
+        return self.get_tf_dataset(num_epochs).make_initializable_iterator()
+
+    @staticmethod
+    def _unpack_batch(batch):
+        """Convert a tuple of batch tensors to the format of
+        :meth:`batch_data`."""
+        return batch[0] if len(batch) == 1 else list(batch)
+
     @abstractmethod
     def generate_data(self):
         """Assemble a TF operation generating the next data sample.
@@ -165,6 +248,102 @@ class Dataset(ABC):
         """
         pass
 
+    def generate_tf_dataset(self, num_epochs):
+        """Assemble a ``tf.data`` pipeline generating data samples for
+        ``num_epochs`` epochs, shuffled within each epoch if ``shuffle`` is
+        ``True``.
+
+        Args:
+            num_epochs (int): Number of epochs of produced data.
+
+        Returns:
+            tf.data.Dataset: Dataset producing tuples of tensors with a single
+            data sample.
+        """
+        raise NotImplementedError("%s does not support tf.data pipelines"
+                                  % type(self).__name__)
+
+    def _get_slices_dataset(self, arrays, num_epochs):
+        """Assemble a ``tf.data`` pipeline serving slices of ``arrays`` along
+        the first dimension for ``num_epochs`` epochs, shuffled within each
+        epoch if ``shuffle`` is ``True``. Shuffling is applied to all slices,
+        similarly to ``slice_input_producer``.
+
+        Args:
+            arrays (list): List of arrays of the same length.
+            num_epochs (int): Number of epochs of produced data.
+
+        Returns:
+            tf.data.Dataset: Dataset producing tuples of slices.
+        """
+        dataset = tf.data.Dataset.from_tensor_slices(tuple(arrays))
+        if self._shuffle:
+            dataset = dataset.shuffle(len(arrays[0]), seed=self._seed,
+                                      reshuffle_each_iteration=True)
+        return dataset.repeat(num_epochs)
+
+    def _get_rows_data(self, arrays):
+        """Assemble a TF operation serving rows of ``arrays`` for
+        ``num_epochs`` epochs, shuffled within each epoch if ``shuffle`` is
+        ``True``. Contrary to ``slice_input_producer``, the arrays are not
+        embedded in the graph, but rows are read by index, so that large or
+        memory-mapped arrays are not copied. Rows are read in chunks of
+        ``batch_size`` rows and enqueued in a queue serving single rows, so
+        that the arrays are accessed once per batch.
+
+        Args:
+            arrays (list): List of arrays of the same length.
+
+        Returns:
+            list of Tensor: Tensors with a single row of each array.
+        """
+        indices = tf.train.range_input_producer(
+            len(arrays[0]), num_epochs=self._num_epochs,
+            shuffle=self._shuffle, seed=self._seed).dequeue_up_to(
+                self._batch_size)
+        rows = self._read_rows(arrays, indices)
+        # The queue is closed by its runner once all indices are read
+        queue = tf.FIFOQueue(capacity=2 * self._batch_size,
+                             dtypes=[r.dtype for r in rows],
+                             shapes=[a.shape[1:] for a in arrays],
+                             name="rows_queue")
+        tf.train.add_queue_runner(
+            tf.train.QueueRunner(queue, [queue.enqueue_many(rows)]))
+        row = queue.dequeue()
+        return list(row) if isinstance(row, (list, tuple)) else [row]
+
+    def _get_rows_dataset(self, arrays, num_epochs):
+        """Assemble a ``tf.data`` pipeline serving rows of ``arrays`` read by
+        index. This is the ``tf.data`` equivalent of :meth:`_get_rows_data`.
+        Rows are read in chunks of ``batch_size`` rows.
+
+        Args:
+            arrays (list): List of arrays of the same length.
+            num_epochs (int): Number of epochs of produced data.
+
+        Returns:
+            tf.data.Dataset: Dataset producing tuples of rows.
+        """
+        dataset = tf.data.Dataset.range(len(arrays[0]))
+        if self._shuffle:
+            dataset = dataset.shuffle(len(arrays[0]), seed=self._seed,
+                                      reshuffle_each_iteration=True)
+        return dataset.repeat(num_epochs).batch(self._batch_size).map(
+            lambda indices: tuple(self._read_rows(arrays, indices))
+        ).flat_map(lambda *rows: tf.data.Dataset.from_tensor_slices(rows))
+
+    @staticmethod
+    def _read_rows(arrays, indices):
+        """Assemble a TF operation reading the rows of ``arrays`` with the
+        given indices."""
+        tout = [tf.string if a.dtype.kind in 'SO' else tf.as_dtype(a.dtype)
+                for a in arrays]
+        rows = tf.py_func(lambda i: [a[i] for a in arrays], [indices], tout,
+                          stateful=False, name="read_rows")
+        for r, a in zip(rows, arrays):
+            r.set_shape(indices.shape.concatenate(a.shape[1:]))
+        return rows
+
     @abstractmethod
     def process_data(self, data):
         """Assemble a TF operation processing a data sample.
@@ -211,28 +390,85 @@ class Dataset(ABC):
                 allow_smaller_final_batch=self._allow_smaller_final_batch)
         return batch
 
+    def iter_batches(self):
+        """Iterate over all batches (of all epochs) of data from the dataset.
+
+        The data is read in an internal graph and session, one batch at a
+        time, so that only a single batch is kept in memory. Therefore, even
+        datasets that do not fit in memory can be processed this way.
+
+        Yields:
+            An array, a list of arrays or a dictionary of arrays with a batch
+            of data.
+        """
+        # The graph and session are never made default across a yield, so
+        # that they do not leak into the caller's code between batches
+        graph = tf.Graph()
+        with graph.as_default():
+            data = self.get_data()
+            init_op = tf.group(tf.global_variables_initializer(),
+                               tf.local_variables_initializer())
+        sess = tf.Session(graph=graph)
+        try:
+            sess.run(init_op)
+            coord = tf.train.Coordinator()
+            with graph.as_default():
+                threads = tf.train.start_queue_runners(sess=sess, coord=coord)
+            try:
+                while not coord.should_stop():
+                    try:
+                        batch = sess.run(data)
+                    except tf.errors.OutOfRangeError:
+                        self.__info("Epoch limit reached")
+                        break
+                    yield batch
+            finally:
+                coord.request_stop()
+                coord.join(threads)
+        finally:
+            sess.close()
+
     def read_all(self):
         """Read all data (all batches and epochs) from the dataset into numpy
         arrays.
 
+        If :attr:`num_samples` is known, the arrays are allocated upfront and
+        filled batch by batch, otherwise the batches are concatenated.
+
         Returns:
             An array, a list of arrays or a dictionary of arrays with all the
             data in the dataset.
         """
-        # Read all batches in internal graph
-        batches = []
-        with tf.Graph().as_default():
-            data = self.get_data()
-            with session() as (sess, run):
-                while run():
-                    out = sess.run(data)
-                    batches.append(out)
-        # Concatenate
-        if isinstance(batches[0], list):
-            return [np.concatenate([b[key] for b in batches])
-                    for key in range(len(batches[0]))]
+        size = self.num_samples
+        if size is not None:
+            size *= self._num_epochs
+            if not self._allow_smaller_final_batch:
+                size -= size % self._batch_size
+        out = None
+        extra = []  # Batches not fitting in the preallocated arrays
+        num_read = 0
+        is_list = False
+        for batch in self.iter_batches():
+            is_list = isinstance(batch, list)
+            if not is_list:
+                batch = [batch]
+            n = len(batch[0])
+            if out is None and size is not None:
+                out = [np.empty((size,) + b.shape[1:], dtype=b.dtype)
+                       for b in batch]
+            if out is not None and not extra and num_read + n <= size:
+                for o, b in zip(out, batch):
+                    o[num_read:num_read + n] = b
+                num_read += n
+            else:
+                extra.append(batch)
+        if out is None:
+            out = [np.concatenate(b) for b in zip(*extra)]
         else:
-            return np.concatenate(batches)
+            out = [o[:num_read] for o in out]
+            if extra:
+                out = [np.concatenate((o,) + b) for o, b in zip(out, zip(*extra))]
+        return out if is_list else out[0]
 
     def write_all(self, writer):
         """Write all data (all batches and epochs) from the dataset using the
@@ -245,14 +481,8 @@ class Dataset(ABC):
         """
         self.__info("Writing all data from %s to %s" %
                     (type(self).__name__, type(writer).__name__))
-        with tf.Graph().as_default():
-            data = self.get_data()
-            with session() as (sess, run):
-                i = 0
-                while run():
-                    out = sess.run(data)
-                    i += 1
-                    self.__info("Writing batch %d" % i)
-                    if not isinstance(out, list):  # Convert to list
-                        out = [out]
-                    writer.write(*out)
+        for i, out in enumerate(self.iter_batches()):
+            self.__info("Writing batch %d" % (i + 1))
+            if not isinstance(out, list):  # Convert to list
+                out = [out]
+            writer.write(*out)
@@ -132,6 +132,38 @@ class FileDataset(Dataset):
                                               shuffle=self._shuffle,
                                               seed=self._seed)
 
+    def _get_file_label_dataset(self, num_epochs):
+        """Assemble a ``tf.data`` pipeline serving pairs of filenames and
+        labels for ``num_epochs`` epochs. This is the ``tf.data`` equivalent of
+        :meth:`_get_file_label_tensors`.
+
+        Args:
+            num_epochs (int): Number of epochs of produced data.
+
+        Returns:
+            tf.data.Dataset: Dataset producing ``(filename, label)`` tuples.
+        """
+        files, labels = self._get_files_labels(self._files, self._classes)
+        return self._get_slices_dataset([files, labels], num_epochs)
+
+    def _get_file_dataset(self, num_epochs):
+        """Assemble a ``tf.data`` pipeline serving filenames for
+        ``num_epochs`` epochs. This is the ``tf.data`` equivalent of
+        :meth:`_get_file_queue`.
+
+        Args:
+            num_epochs (int): Number of epochs of produced data.
+
+        Returns:
+            tf.data.Dataset: Dataset producing filenames.
+        """
+        files, _ = self._get_files_labels(self._files, self._classes)
+        dataset = tf.data.Dataset.from_tensor_slices(files)
+        if self._shuffle:
+            dataset = dataset.shuffle(len(files), seed=self._seed,
+                                      reshuffle_each_iteration=True)
+        return dataset.repeat(num_epochs)
+
     @staticmethod
     def _get_files_labels(files, classes=None):
         """Convert the file specification to a list of files and labels.
@@ -92,6 +92,11 @@ class GaussianMixtureDataset(Dataset):
         self._labels = None
         self._likelihoods = None
 
+    @property
+    @utils.docinherit(Dataset)
+    def num_samples(self):
+        return self._num_samples
+
     @property
     def samples(self):
         """array: Array of data samples."""
@@ -121,6 +126,12 @@ class GaussianMixtureDataset(Dataset):
                                                  seed=self._seed)
         return producer
 
+    @utils.docinherit(Dataset)
+    def generate_tf_dataset(self, num_epochs):
+        self.generate_samples()
+        return self._get_slices_dataset(
+            [self._samples, self._labels, self._likelihoods], num_epochs)
+
     @utils.docinherit(Dataset)
     def process_data(self, data):
         return data
@@ -209,14 +220,14 @@ class IntGridDataset(Dataset):
         self._num_dims = num_dims
         self._num_vals = num_vals
 
+    @property
     @utils.docinherit(Dataset)
-    def generate_data(self):
-        # Generate points
-        values = np.arange(0, self._num_vals)
-        points = np.array(
-            np.meshgrid(*[values for i in range(self._num_dims)])).T
-        points = points.reshape(-1, points.shape[-1])
+    def num_samples(self):
+        return self._num_vals ** self._num_dims
 
+    @utils.docinherit(Dataset)
+    def generate_data(self):
+        points = self._generate_points()
         # Add input producer that serves the generated samples
         # All data is shuffled independently of the capacity parameter
         producer = tf.train.slice_input_producer([points],
@@ -226,6 +237,17 @@ class IntGridDataset(Dataset):
                                                  seed=self._seed)
         return producer
 
+    @utils.docinherit(Dataset)
+    def generate_tf_dataset(self, num_epochs):
+        return self._get_slices_dataset([self._generate_points()], num_epochs)
+
+    def _generate_points(self):
+        """Generate all points of the grid."""
+        values = np.arange(0, self._num_vals)
+        points = np.array(
+            np.meshgrid(*[values for i in range(self._num_dims)])).T
+        return points.reshape(-1, points.shape[-1])
+
     @utils.docinherit(Dataset)
     def process_data(self, data):
         return data
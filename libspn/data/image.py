@@ -5,12 +5,16 @@
 # via any medium is strictly prohibited. Proprietary and confidential.
 # ------------------------------------------------------------------------
 
+import numpy as np
 import tensorflow as tf
 from libspn.data.file import FileDataset
+from libspn.data import cache
+from libspn.log import get_logger
 from libspn import conf
 from libspn import utils
 from enum import Enum
 from collections import namedtuple
+from contextlib import ExitStack
 import scipy
 import PIL
 
@@ -275,11 +279,21 @@ class ImageDataset(ImageDatasetBase):
         classes (list of int): Optional. If specified, only images with labels
                                listed here will be provided.
         seed (int): Optional. Seed used when shuffling.
+        cached (bool): If ``True``, all images are decoded and processed once
+                       and the processed samples are stored in the cache in
+                       :attr:`libspn.conf.data_cache_dir`, keyed by the
+                       format, ratio, crop and the list of files. All epochs,
+                       as well as future datasets with the same parameters,
+                       are then served from the (memory-mapped) cache.
     """
 
+    __logger = get_logger()
+    __info = __logger.info
+
     def __init__(self, image_files, format, num_epochs, batch_size, shuffle,
                  ratio=1, crop=0, accurate=False, num_threads=1,
-                 allow_smaller_final_batch=False, classes=None, seed=None):
+                 allow_smaller_final_batch=False, classes=None, seed=None,
+                 cached=False):
         oh, ow, onc = self._guess_orig_shape(image_files, classes)
         super().__init__(image_files, orig_height=oh, orig_width=ow,
                          orig_num_channels=onc, format=format,
@@ -297,10 +311,107 @@ class ImageDataset(ImageDatasetBase):
         if not isinstance(accurate, bool):
             raise ValueError("accurate must be a boolean")
         self._accurate = accurate
+        self._cached = cached
+        self._samples = None
+        self._labels = None
+
+    @property
+    def cached(self):
+        """bool: ``True`` if processed images are cached."""
+        return self._cached
+
+    @property
+    @utils.docinherit(FileDataset)
+    def num_samples(self):
+        return len(self._get_files_labels(self._files, self._classes)[0])
 
     @utils.docinherit(FileDataset)
     def generate_data(self):
+        if self._cached:
+            return self._get_rows_data(self.load_data())
         file, label = self._get_file_label_tensors()
+        return self._read_image(file, label)
+
+    @utils.docinherit(FileDataset)
+    def generate_tf_dataset(self, num_epochs):
+        if self._cached:
+            return self._get_rows_dataset(self.load_data(), num_epochs)
+        return self._get_file_label_dataset(num_epochs).map(
+            self._read_image, num_parallel_calls=self._num_threads)
+
+    @utils.docinherit(FileDataset)
+    def process_data(self, data):
+        if self._cached:
+            return data  # Processed before caching
+        return super().process_data(data)
+
+    def load_data(self):
+        """Load the processed images and labels from the cache, or decode and
+        process all images and store the results in the cache.
+
+        Returns:
+            list of array: Arrays of processed samples and labels.
+        """
+        if self._samples is None:
+            files, labels = self._get_files_labels(self._files, self._classes)
+            key = cache.cache_key(
+                format=self._format.name, ratio=self._ratio, crop=self._crop,
+                accurate=self._accurate, dtype=conf.dtype.name,
+                labels=labels, sources=cache.source_signature(files))
+            samples_path = cache.cache_path('images-samples', key)
+            labels_path = cache.cache_path('images-labels', key)
+            samples = cache.load_array(samples_path)
+            labels = cache.load_array(labels_path, mmap=False)
+            if samples is None or labels is None:
+                samples, labels = self._process_files(files, labels,
+                                                      samples_path)
+                cache.save_array(labels_path, labels)
+                # Serve the samples from a read-only memory map
+                cached_samples = cache.load_array(samples_path)
+                if cached_samples is not None:
+                    samples = cached_samples
+            self._samples = samples
+            self._labels = labels
+        return [self._samples, self._labels]
+
+    def _process_files(self, files, labels, samples_path):
+        """Decode and process all images in an internal graph. The processed
+        samples are written batch by batch to the cache entry
+        ``samples_path``, so that the whole dataset is never held in memory.
+
+        Returns:
+            tuple: Arrays of processed samples and labels.
+        """
+        self.__info("Decoding and processing %d images" % len(files))
+        samples = None
+        out_labels = np.empty((len(files), 1), dtype=object)
+        with tf.Graph().as_default(), ExitStack() as stack:
+            dataset = tf.data.Dataset.from_tensor_slices((files, labels)).map(
+                lambda file, label: tuple(ImageDatasetBase.process_data(
+                    self, self._read_image(file, label))),
+                num_parallel_calls=self._num_threads).batch(self._batch_size)
+            batch = dataset.make_one_shot_iterator().get_next()
+            num_read = 0
+            with tf.Session() as sess:
+                try:
+                    while True:
+                        batch_samples, batch_labels = sess.run(batch)
+                        if samples is None:
+                            # Shape and dtype are known after the first batch
+                            samples = stack.enter_context(cache.array_writer(
+                                samples_path,
+                                (len(files),) + batch_samples.shape[1:],
+                                batch_samples.dtype))
+                        n = len(batch_samples)
+                        samples[num_read:num_read + n] = batch_samples
+                        out_labels[num_read:num_read + n] = batch_labels
+                        num_read += n
+                except tf.errors.OutOfRangeError:
+                    pass
+        return samples, out_labels.astype(bytes)
+
+    def _read_image(self, file, label):
+        """Read and decode a single image file."""
         value = tf.read_file(file)
         image = self._decode_image(value, accurate=self._accurate)
         # Since decode_jpeg does not set the image shape, we need to set it manually
@@ -8,6 +8,7 @@
 
 from libspn.data.dataset import Dataset
 from libspn.data.image import ImageShape, ImageFormat
+from libspn.data import cache
 from libspn import conf
 from libspn import utils
 from libspn.log import get_logger
@@ -15,7 +16,6 @@ import numpy as np
 import tensorflow as tf
 import os
 from enum import Enum
-import scipy
 import gzip
 
 
@@ -27,6 +27,11 @@ def _read32(bytestream):
 class MNISTDataset(Dataset):
     """A dataset providing MNIST data with various types of processing applied.
 
+    The samples are served by index from the processed arrays, which are never
+    embedded in the TF graph. If ``cached`` is ``True``, the processed data is
+    stored on disk and memory-mapped when loaded again, so that repeated runs
+    and multiple processes share the page cache.
+
     The data is returned as a tuple of tensors ``(samples, labels)``, where
     ``samples`` has shape ``[batch_size, width*height]`` and contains
     flattened image data, and ``labels`` has shape ``[batch_size, 1]`` and
@@ -50,6 +55,10 @@ class MNISTDataset(Dataset):
         classes (list of int): Optional. If specified, only the listed classes
                                will be provided.
         seed (int): Optional. Seed used when shuffling.
+        cached (bool): If ``True``, the processed data is stored in the cache
+                       in :attr:`libspn.conf.data_cache_dir`, keyed by the
+                       subset, ratio, crop, format and classes, and loaded
+                       from it when available.
     """
 
     __logger = get_logger()
@@ -70,7 +79,8 @@ class MNISTDataset(Dataset):
 
     def __init__(self, subset, format, num_epochs, batch_size,
                  shuffle, ratio=1, crop=0, num_threads=1,
-                 allow_smaller_final_batch=False, classes=None, seed=None):
+                 allow_smaller_final_batch=False, classes=None, seed=None,
+                 cached=False):
         self._orig_width = 28
         self._orig_height = 28
         if subset not in MNISTDataset.Subset:
@@ -119,6 +129,7 @@ class MNISTDataset(Dataset):
             if len(set(classes)) != len(classes):
                 raise ValueError('classes must contain unique elements')
         self._classes = classes
+        self._cached = cached
         self._samples = None
         self._labels = None
         # Get data dir
@@ -151,6 +162,11 @@ class MNISTDataset(Dataset):
         """int: That many border pixels are cropped."""
         return self._crop
 
+    @property
+    def cached(self):
+        """bool: ``True`` if processed data is cached."""
+        return self._cached
+
     @property
     def classes(self):
         """list of int: List of classes provided by the dataset."""
@@ -159,6 +175,13 @@ class MNISTDataset(Dataset):
         else:
             return list(range(10))
 
+    @property
+    @utils.docinherit(Dataset)
+    def num_samples(self):
+        if self._samples is None:
+            self.load_data()
+        return len(self._samples)
+
     @property
     def samples(self):
         """array: Array of all data samples."""
@@ -177,14 +200,15 @@ class MNISTDataset(Dataset):
     @utils.docinherit(Dataset)
     def generate_data(self):
         self.load_data()
-        # Add input producer that serves the loaded samples
-        # All data is shuffled independently of the capacity parameter
-        producer = tf.train.slice_input_producer([self._samples, self._labels],
-                                                 num_epochs=self._num_epochs,
-                                                 # Shuffle data
-                                                 shuffle=self._shuffle,
-                                                 seed=self._seed)
-        return producer
+        # Rows are read by index, so the (memory-mapped) arrays are not
+        # copied into the graph. All data is shuffled independently of the
+        # capacity parameter.
+        return self._get_rows_data([self._samples, self._labels])
+
+    @utils.docinherit(Dataset)
+    def generate_tf_dataset(self, num_epochs):
+        self.load_data()
+        return self._get_rows_dataset([self._samples, self._labels], num_epochs)
 
     @utils.docinherit(Dataset)
     def process_data(self, data):
@@ -192,7 +216,43 @@ class MNISTDataset(Dataset):
         return data
 
     def load_data(self):
-        """Load all data from MNIST data files."""
+        """Load all data from MNIST data files or from the cache."""
+        if not self._cached:
+            self._process_data_files()
+            return
+        key = self._cache_key()
+        samples_path = cache.cache_path('mnist-samples', key)
+        labels_path = cache.cache_path('mnist-labels', key)
+        samples = cache.load_array(samples_path)
+        labels = cache.load_array(labels_path, mmap=False)
+        if samples is not None and labels is not None:
+            self.__debug1("Loaded MNIST data from %s" % samples_path)
+            self._samples = samples
+            self._labels = labels
+            return
+        self._process_data_files()
+        cache.save_array(samples_path, self._samples)
+        cache.save_array(labels_path, self._labels)
+
+    def _data_files(self):
+        """Get the names of the files with the images and labels of the
+        subset."""
+        files = []
+        if self._subset in {MNISTDataset.Subset.ALL, MNISTDataset.Subset.TRAIN}:
+            files += ['train-images-idx3-ubyte.gz', 'train-labels-idx1-ubyte.gz']
+        if self._subset in {MNISTDataset.Subset.ALL, MNISTDataset.Subset.TEST}:
+            files += ['t10k-images-idx3-ubyte.gz', 't10k-labels-idx1-ubyte.gz']
+        return [os.path.join(self._data_dir, f) for f in files]
+
+    def _cache_key(self):
+        return cache.cache_key(
+            subset=self._subset.name, ratio=self._ratio, crop=self._crop,
+            format=self._format.name, classes=self._classes,
+            dtype=conf.dtype.name,
+            sources=cache.source_signature(self._data_files()))
+
+    def _process_data_files(self):
+        """Load and process all data from MNIST data files."""
         # Load data
         if (self._subset == MNISTDataset.Subset.ALL or
                 self._subset == MNISTDataset.Subset.TRAIN):
@@ -211,8 +271,6 @@ class MNISTDataset(Dataset):
             samples = train_x
             labels = train_y
         elif self._subset == MNISTDataset.Subset.TEST:
-            for i in range(test_x.shape[0]):
-                test_x
             samples = test_x
             labels = test_y
         elif self._subset == MNISTDataset.Subset.ALL:
@@ -228,20 +286,15 @@ class MNISTDataset(Dataset):
             samples = samples[chosen]
             self._labels = labels[chosen]
 
-        # Process data (input samples are HxW uint8, and well normalized (0-254/255))
-        # - convert to float for accuracy, use float32, since that's what scipy wants
+        # Process data (input samples are NxHxW uint8, and well normalized (0-254/255))
+        # - convert to float for accuracy
         samples = samples.astype(np.float32) / 255.0
-        # - downsample
+        # - downsample all images at once by averaging ratio x ratio blocks
         if self._ratio > 1:
             num_samples = samples.shape[0]
-            samples_resized = [None] * num_samples
-            for i in range(num_samples):
-                samples_resized[i] = scipy.misc.imresize(
-                    samples[i], 1.0 / self._ratio,
-                    # bicubic looks best after normalization, sharper than bilinear/lanczos
-                    interp='bicubic',
-                    mode='F')  # Operate on float32 images
-            samples = np.array(samples_resized)
+            samples = samples.reshape(
+                num_samples, self._orig_height // self._ratio, self._ratio,
+                self._orig_width // self._ratio, self._ratio).mean(axis=(2, 4))
         # - crop (samples are float32 HxW)
         if self._crop > 0:
             samples = samples[:, self._crop:-self._crop, self._crop:-self._crop]
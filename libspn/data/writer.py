@@ -7,10 +7,13 @@
 
 from abc import ABC, abstractmethod
 import numpy as np
+import json
 import os
+import tempfile
 import scipy
 from libspn.log import get_logger
 from libspn import utils
+from libspn.data import binary
 
 
 class DataWriter(ABC):
@@ -110,6 +113,164 @@ class CSVDataWriter(DataWriter):
         self.__mode = 'ab'
 
 
+class BinaryShardDataWriter(DataWriter):
+    """
+    Writer that writes data in a sharded binary format, which can be read
+    using :class:`~libspn.BinaryShardDataset`.
+
+    The data is written to a directory containing an index file and shards,
+    each storing up to ``shard_size`` samples as a raw array of fixed-width
+    rows and, optionally, a raw array of labels. All samples must have the same
+    number of columns and dtype. Labels can be numeric or strings. Converting
+    a dataset once with :meth:`~libspn.Dataset.write_all` allows for reading
+    it later without any parsing.
+
+    Args:
+        path (str): Path to the directory of the dataset. The directory is
+                    created if it does not exist.
+        shard_size (int): Maximum number of samples in a shard.
+    """
+
+    def __init__(self, path, shard_size=65536):
+        self._path = os.path.expanduser(path)
+        if not isinstance(shard_size, int) or shard_size < 1:
+            raise ValueError("shard_size must be a positive integer")
+        self._shard_size = shard_size
+        self._index = None  # Created by the first write
+
+    @staticmethod
+    def _get_array(data, name):
+        """Convert an array or a list of 1D or 2D arrays to a 2D array with
+        the arrays as columns."""
+        if isinstance(data, np.ndarray):
+            data = [data]
+        elif not isinstance(data, list):
+            raise ValueError("%s must be an array or a list of arrays" % name)
+        cols = []
+        for d in data:
+            if d.dtype.kind == 'U':
+                d = np.char.encode(d, 'utf-8')
+            elif d.dtype.kind == 'O':  # TF strings
+                d = d.astype(bytes)
+            if d.ndim == 1:
+                d = d.reshape([-1, 1])
+            elif d.ndim != 2:
+                raise ValueError("%s arrays must be 1 or 2 dimensional" % name)
+            cols.append(d)
+        return np.ascontiguousarray(np.concatenate(cols, axis=1))
+
+    def _create(self, samples, labels):
+        """Erase any existing dataset and create an empty index."""
+        os.makedirs(self._path, exist_ok=True)
+        try:
+            old_index = binary.read_index(self._path)
+        except (OSError, ValueError):
+            old_index = None
+        if old_index is not None:
+            for shard in old_index['shards']:
+                for f in binary.shard_files(self._path, shard):
+                    if os.path.exists(f):
+                        os.remove(f)
+        self._index = {
+            'format': binary.FORMAT_NAME,
+            'version': binary.FORMAT_VERSION,
+            'samples': {'dtype': samples.dtype.str,
+                        'num_cols': samples.shape[1]},
+            'labels': (None if labels is None else
+                       {'dtype': labels.dtype.str, 'num_cols': labels.shape[1]}),
+            'shards': []}
+
+    def _write_index(self):
+        """Write the index atomically, so that readers always see a consistent
+        dataset."""
+        fd, tmp_path = tempfile.mkstemp(dir=self._path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self._index, f, indent=2)
+            os.replace(tmp_path, os.path.join(self._path, binary.INDEX_FILE))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _check(self, samples, labels):
+        """Check if the data is compatible with the already written data and
+        convert the labels to the dtype of the dataset."""
+        index = self._index
+        if (samples.shape[1] != index['samples']['num_cols'] or
+                samples.dtype.str != index['samples']['dtype']):
+            raise ValueError("data must have %d columns of dtype %s"
+                             % (index['samples']['num_cols'],
+                                index['samples']['dtype']))
+        if (labels is None) != (index['labels'] is None):
+            raise ValueError("labels must be given either for all writes "
+                             "or for none")
+        if labels is not None:
+            dtype = np.dtype(index['labels']['dtype'])
+            if labels.shape[1] != index['labels']['num_cols']:
+                raise ValueError("labels must have %d columns"
+                                 % index['labels']['num_cols'])
+            if dtype.kind == 'S' and labels.dtype.kind == 'S':
+                return labels
+            if not np.can_cast(labels.dtype, dtype):
+                raise ValueError("labels of dtype %s cannot be written "
+                                 "as %s" % (labels.dtype, dtype))
+            labels = labels.astype(dtype)
+        return labels
+
+    def write(self, data, labels=None):
+        """
+        Write data in one or multiple arrays with optional labels. The first
+        call to write erases any existing dataset in the directory, while all
+        subsequent calls append samples to the last shard, creating new shards
+        when it is full.
+
+        Args:
+            data (array or list of arrays): A 1D or 2D array or a list of 1D or
+                2D arrays with the data to write.
+            labels (array): A 1D or 2D array with the labels.
+        """
+        samples = self._get_array(data, "data")
+        if labels is not None:
+            if not isinstance(labels, np.ndarray):
+                raise ValueError("labels must be an array")
+            labels = self._get_array(labels, "labels")
+            if labels.shape[0] != samples.shape[0]:
+                raise ValueError("data and labels must have the same "
+                                 "number of rows")
+        if self._index is None:
+            self._create(samples, labels)
+        labels = self._check(samples, labels)
+
+        shards = self._index['shards']
+        start = 0
+        while start < samples.shape[0]:
+            shard = shards[-1] if shards else None
+            # Rows of string labels have a fixed width within a shard,
+            # wider labels are written to a new shard
+            if (shard is None or shard['num_rows'] >= self._shard_size or
+                    (labels is not None and labels.dtype.itemsize >
+                     np.dtype(shard['labels_dtype']).itemsize)):
+                shard = {'name': "shard-%05d" % len(shards),
+                         'num_rows': 0,
+                         'labels_dtype': (None if labels is None
+                                          else labels.dtype.str)}
+                shards.append(shard)
+            stop = min(start + self._shard_size - shard['num_rows'],
+                       samples.shape[0])
+            samples_file, labels_file = binary.shard_files(self._path, shard)
+            # Shards are created by this writer, so files of a new shard left
+            # by an earlier (e.g. interrupted) run are overwritten
+            mode = 'ab' if shard['num_rows'] else 'wb'
+            with open(samples_file, mode) as f:
+                samples[start:stop].tofile(f)
+            if labels is not None:
+                with open(labels_file, mode) as f:
+                    labels[start:stop].astype(shard['labels_dtype']).tofile(f)
+            shard['num_rows'] += stop - start
+            start = stop
+        self._write_index()
+
+
 class ImageDataWriter(DataWriter):
     """
     Writer writing flattened image data. The image format is selected by the
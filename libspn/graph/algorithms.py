@@ -10,12 +10,110 @@
 from collections import deque, defaultdict
 
 
+class GraphSchedule:
+    """A compiled traversal schedule of the SPN graph rooted in a node.
+
+    The schedule stores all the nodes of the graph in a topological order
+    (every node is preceded by the nodes connected to its inputs) together
+    with flat tables describing the edges of the graph. This allows the graph
+    algorithms to iterate over lists instead of re-discovering the graph
+    structure on every traversal.
+
+    Schedules should not be created directly. Instead, they are obtained
+    through :meth:`~libspn.Node.get_schedule`, which caches them for each root
+    in the TF graph. The cache is cleared whenever inputs of any node in the
+    TF graph are modified.
+
+    Args:
+        root (Node): The root of the SPN graph.
+
+    Attributes:
+        root (Node): The root of the SPN graph.
+        nodes (list of Node): Nodes of the graph in topological order. The
+            root is always the last node.
+        index (dict): Position of each node in ``nodes``, indexed by node.
+        inputs (list of tuple): For each node, a tuple containing the position
+            of the node connected to each input of the node or ``None`` if the
+            input is disconnected. Empty for nodes which are not op nodes.
+        parents (list of list): For each node, a list of tuples
+            ``(parent, input_nr)`` containing the position of each parent
+            node and the number of the parent input connected to the node.
+        in_degrees (list of int): For each node, the number of parent node
+            inputs connected to the node, i.e. ``len(parents[i])``.
+        breadth_first (list of int): Positions of the nodes in the order in
+            which they are visited by a breadth-first traversal starting at the
+            root.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.nodes = []
+        self.index = {}
+        self.inputs = []
+        self.parents = []
+
+        # Depth-first traversal adding each node once all its inputs were added
+        expanded = set()  # Op nodes with inputs placed on the stack
+        stack = [root]
+        while stack:
+            next_node = stack[-1]
+            if next_node in self.index:
+                # Already added through another parent
+                stack.pop()
+            elif next_node in expanded or not next_node.is_op:
+                # All inputs were added
+                stack.pop()
+                self._add_node(next_node)
+            else:
+                expanded.add(next_node)
+                for inpt in next_node.inputs:
+                    if inpt and inpt.node not in self.index:
+                        stack.append(inpt.node)
+
+        self.in_degrees = [len(p) for p in self.parents]
+
+        # Breadth-first order starting at the root
+        visited = [False] * len(self.nodes)
+        visited[-1] = True
+        self.breadth_first = [len(self.nodes) - 1]
+        for i in self.breadth_first:  # Grows while iterating
+            for child in self.inputs[i]:
+                if child is not None and not visited[child]:
+                    visited[child] = True
+                    self.breadth_first.append(child)
+
+    def _add_node(self, node):
+        """Append ``node`` to the schedule. All nodes connected to the inputs
+        of ``node`` must already be in the schedule."""
+        pos = len(self.nodes)
+        self.index[node] = pos
+        self.nodes.append(node)
+        self.parents.append([])
+        if node.is_op:
+            inputs = tuple(self.index[i.node] if i else None
+                           for i in node.inputs)
+            for nr, child in enumerate(inputs):
+                if child is not None:
+                    self.parents[child].append((pos, nr))
+        else:
+            inputs = ()
+        self.inputs.append(inputs)
+
+    def __len__(self):
+        return len(self.nodes)
+
+
 def compute_graph_up(root, val_fun, const_fun=None, all_values=None):
     """Computes a certain value for the ``root`` node in the graph, assuming
     that for op nodes, the value depends on values produced by inputs of the op
     node. For this, it traverses the graph depth-first from the ``root`` node
     to the leaf nodes.
 
+    If ``const_fun`` is not given, the cached :class:`GraphSchedule` of the
+    graph is used to visit the nodes. Otherwise, the graph is walked from the
+    ``root``, since such traversals usually stop after visiting only a few
+    nodes.
+
     Args:
         root (Node): The root of the SPN graph.
         val_fun (function): A function ``val_fun(node, *args)`` producing a
@@ -37,6 +135,41 @@ def compute_graph_up(root, val_fun, const_fun=None, all_values=None):
     """
     if all_values is None:  # Dictionary of computed values indexed by node
         all_values = {}
+    if const_fun is not None:
+        return _walk_graph_up(root, val_fun, const_fun, all_values)
+
+    schedule = root.get_schedule()
+    nodes = schedule.nodes
+    inputs = schedule.inputs
+    # Mark the nodes for which values must be computed, moving from the root
+    # towards the leafs. Values already present in all_values are reused and
+    # the nodes below them are not visited.
+    needed = [False] * len(nodes)
+    needed[-1] = True
+    for i in range(len(nodes) - 1, -1, -1):
+        if needed[i] and nodes[i] not in all_values:
+            for child in inputs[i]:
+                if child is not None:
+                    needed[child] = True
+
+    # Compute values moving up
+    values = [None] * len(nodes)
+    for i, node in enumerate(nodes):
+        if needed[i]:
+            try:
+                values[i] = all_values[node]
+            except KeyError:
+                values[i] = val_fun(node, *[None if child is None
+                                            else values[child]
+                                            for child in inputs[i]])
+                all_values[node] = values[i]
+
+    return values[-1]
+
+
+def _walk_graph_up(root, val_fun, const_fun, all_values):
+    """Implements :meth:`compute_graph_up` by walking the graph from the
+    ``root`` without using a schedule."""
     stack = deque()  # Stack of nodes to process
     stack.append(root)
 
@@ -50,7 +183,7 @@ def compute_graph_up(root, val_fun, const_fun=None, all_values=None):
                 # OpNode
                 input_vals = []
                 all_input_vals = True
-                if const_fun is None or const_fun(next_node) is False:
+                if const_fun(next_node) is False:
                     # Gather input values for non-const val fun
                     for inpt in next_node.inputs:
                         if inpt:  # Input is not empty
@@ -85,7 +218,9 @@ def compute_graph_up_down(root, down_fun, graph_input, up_fun=None,
     the graph. When moving up, it behaves exactly as :meth:`compute_graph_up`.
     When moving down it computes values for each input of a node based on
     values produced for inputs of parent nodes connected to this node. For this,
-    it traverses the graph breadth-first from the ``root`` node to the leaf nodes.
+    it traverses the graph from the ``root`` node to the leaf nodes, visiting
+    each node exactly once, when values for all parent node inputs connected to
+    it are available.
 
     Args:
         root (Node): The root of the SPN graph.
@@ -100,6 +235,7 @@ def compute_graph_up_down(root, down_fun, graph_input, up_fun=None,
             certain value for the ``node``. For an op node, it will have
             additional arguments with values produced for the input nodes of
             ``node``. The arguments can be ``None`` if the input was empty.
+            If set to ``None``, no upward pass is performed.
         up_values (dict): A dictionary indexed by ``node`` in which values
             computed for each node during the upward pass will be stored. Can
             be set to ``None``.
@@ -109,58 +245,50 @@ def compute_graph_up_down(root, down_fun, graph_input, up_fun=None,
     """
     if down_values is None:  # Dictionary of computed values indexed by node
         down_values = {}
-    queue = deque()  # Queue of nodes with computed values, but unprocessed inputs
-    parents = defaultdict(list)
-
-    def up_fun_parents(node, *args):
-        """Run up_fun and for each node find parent node inputs having the node
-        connected."""
-        # For each input, add the node and input number as relevant parent node
-        # input to the connected node
-        if node.is_op:
-            for nr, inpt in enumerate(node.inputs):
-                if inpt:
-                    parents[inpt.node].append((node, nr))
-        # Run up_fun
-        if up_fun is not None:
-            return up_fun(node, *args)
 
     # Traverse up
-    compute_graph_up(root, val_fun=up_fun_parents, all_values=up_values)
+    if up_fun is not None:
+        compute_graph_up(root, val_fun=up_fun, all_values=up_values)
+
+    schedule = root.get_schedule()
+    nodes = schedule.nodes
+    inputs = schedule.inputs
+    parents = schedule.parents
+    # Number of parent node inputs of each node for which values are missing
+    missing = list(schedule.in_degrees)
+    values = [None] * len(nodes)  # Values computed for each node by position
+    queue = deque()  # Queue of nodes with computed values, but unprocessed inputs
 
     # Add root node
     if callable(graph_input):
         graph_input = graph_input()
-    down_values[root] = down_fun(root, [graph_input])
-    if root.is_op:
-        queue.append(root)
+    values[-1] = down_values[root] = down_fun(root, [graph_input])
+    queue.append(len(nodes) - 1)
 
-    # Traverse down
+    # Traverse down, computing the value for each node once the values for all
+    # parent inputs connected to it are available
     while queue:
-        next_node = queue.popleft()
-        children = set(i.node for i in next_node.inputs if i)
-        for child in children:
-            if child not in down_values:  # Not computed yet
-                # Get all parent_vals
-                parent_vals = []
-                try:
-                    for parent_node, parent_input_nr in parents[child]:
-                        parent_vals.append(
-                            down_values[parent_node][parent_input_nr])
-                    # All parent values are available, compute value
-                    down_values[child] = down_fun(child, parent_vals)
-                    # Enqueue for further processing of children
-                    if child.is_op:
-                        queue.append(child)
-                except KeyError:
-                    # Not all parent values were available
-                    pass
+        for child in inputs[queue.popleft()]:
+            if child is not None:
+                missing[child] -= 1
+                if not missing[child]:
+                    node = nodes[child]
+                    parent_vals = [values[parent][parent_input_nr]
+                                   for parent, parent_input_nr
+                                   in parents[child]]
+                    values[child] = down_values[node] = down_fun(node,
+                                                                 parent_vals)
+                    queue.append(child)
 
 
 def traverse_graph(root, fun, skip_params=False):
     """Runs ``fun`` on descendants of ``root`` (including ``root``) by
     traversing the graph breadth-first until ``fun`` returns True.
 
+    The nodes are visited in the order stored in the cached
+    :class:`GraphSchedule` of the graph. Therefore, changes to the graph
+    structure made by ``fun`` are not reflected in the running traversal.
+
     Args:
         root (Node): The root of the SPN graph.
         fun (function): A function ``fun(node)`` executed once for every node of
@@ -172,22 +300,15 @@ def traverse_graph(root, fun, skip_params=False):
         Node: Returns the last traversed node (the one for which ``fun``
         returned True) or ``None`` if ``fun`` never returned ``True``.
     """
-    visited_nodes = set()  # Set of visited nodes
-    queue = deque()
-    queue.append(root)
-
-    while queue:
-        next_node = queue.popleft()
-        if next_node not in visited_nodes:
-            if fun(next_node):
-                return next_node
-            visited_nodes.add(next_node)
-            # OpNode?: enqueue inputs
-            if next_node.is_op:
-                for i in next_node.inputs:
-                    if (i and  # Input not empty
-                            not (skip_params and i.is_param)):
-                        queue.append(i.node)
+    schedule = root.get_schedule()
+    nodes = schedule.nodes
+    for i in schedule.breadth_first:
+        next_node = nodes[i]
+        # The root is always traversed, even if it is a param node
+        if skip_params and next_node.is_param and next_node is not root:
+            continue
+        if fun(next_node):
+            return next_node
 
     return None
 
@@ -126,6 +126,7 @@ class BaseSum(OpNode, abc.ABC):
         if weights and not isinstance(weights.node, Weights):
             raise StructureError("%s is not Weights" % weights.node)
         self._weights = weights
+        self._invalidate_schedules()
 
     def _reset_sum_sizes(self, num_sums=None, sum_sizes=None):
         """Resets the sizes and number of sums. If number of sums is specified, it will take that
@@ -154,6 +155,7 @@ class BaseSum(OpNode, abc.ABC):
             for possible values. If set to ``None``, the input is disconnected.
         """
         self._ivs, = self._parse_inputs(ivs)
+        self._invalidate_schedules()
 
     @property
     def values(self):
@@ -177,6 +179,7 @@ class BaseSum(OpNode, abc.ABC):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     def add_values(self, *values):
         """Add more inputs providing input values to this node.
@@ -186,6 +189,7 @@ class BaseSum(OpNode, abc.ABC):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values += self._parse_inputs(*values)
+        self._invalidate_schedules()
         self._reset_sum_sizes()
 
     def generate_weights(self, init_value=1, trainable=True, input_sizes=None,
@@ -422,6 +426,44 @@ class BaseSum(OpNode, abc.ABC):
         return self._compute_mpe_path_common(
                     reducible, counts, w_tensor, ivs_tensor, *input_tensors)
 
+    @utils.docinherit(OpNode)
+    @utils.lru_cache
+    def _compute_log_sample_path(self, counts, w_tensor, ivs_tensor, *input_tensors):
+        reducible = self._compute_reducible(w_tensor, ivs_tensor, *input_tensors, log=True,
+                                            weighted=True, use_ivs=True)
+        # Gumbel-max trick: the argmax of perturbed log probabilities is a sample
+        reducible += utils.gumbel_noise(tf.shape(reducible))
+        return self._compute_mpe_path_common(
+            reducible, counts, w_tensor, ivs_tensor, *input_tensors)
+
+    @utils.docinherit(OpNode)
+    @utils.lru_cache
+    def _compute_log_mpe_gaps(self, w_tensor, ivs_tensor, *input_tensors):
+        reducible = self._compute_reducible(w_tensor, ivs_tensor, *input_tensors, log=True,
+                                            weighted=True, use_ivs=True)
+        inf = tf.constant(float('inf'), dtype=reducible.dtype)
+        if self._max_sum_size < 2:
+            return tf.fill(tf.shape(reducible)[:self._reduce_axis], inf)
+        top2 = tf.nn.top_k(reducible, k=2).values
+        gaps = top2[:, :, 0] - top2[:, :, 1]
+        # The gap is NaN if all inputs have zero probability
+        return tf.where(tf.is_nan(gaps), tf.fill(tf.shape(gaps), inf), gaps)
+
+    @utils.docinherit(OpNode)
+    @utils.lru_cache
+    def _compute_log_mpe_path_deviated(self, counts, deviate, w_tensor, ivs_tensor,
+                                       *input_tensors):
+        reducible = self._compute_reducible(w_tensor, ivs_tensor, *input_tensors, log=True,
+                                            weighted=True, use_ivs=True)
+        # Exclude the best input of the deviating sums
+        best = tf.cast(tf.one_hot(self._reduce_argmax(reducible), self._max_sum_size),
+                       tf.bool)
+        excluded = tf.logical_and(best, tf.expand_dims(deviate, axis=self._reduce_axis))
+        reducible = tf.where(excluded, tf.fill(tf.shape(reducible), tf.constant(
+            -float('inf'), dtype=reducible.dtype)), reducible)
+        return self._compute_mpe_path_common(
+            reducible, counts, w_tensor, ivs_tensor, *input_tensors)
+
     @utils.lru_cache
     def _compute_log_gradient(
             self, gradients, w_tensor, ivs_tensor, *value_tensors, with_ivs=True,
@@ -54,6 +54,7 @@ class Concat(OpNode):
                 :meth:`~libspn.Input.as_input` for possible inputs.
         """
         self._inputs = self._parse_inputs(*inputs)
+        self._invalidate_schedules()
 
     def add_inputs(self, *inputs):
         """Add more inputs to this node.
@@ -63,6 +64,7 @@ class Concat(OpNode):
                 :meth:`~libspn.Input.as_input` for possible inputs.
         """
         self._inputs = self._inputs + self._parse_inputs(*inputs)
+        self._invalidate_schedules()
 
     @property
     def _const_out_size(self):
@@ -310,6 +310,18 @@ class GaussianLeaf(VarNode):
             tf.range(self._num_vars, dtype=tf.int64) * self._num_components, axis=0)
         return tf.gather(tf.reshape(self._loc_variable, (-1,)), indices=indices, axis=0)
 
+    @utils.docinherit(VarNode)
+    @utils.lru_cache
+    def _compute_sample(self, counts):
+        # Sample from the components 'selected' by the counts, unless there is evidence
+        counts_reshaped = tf.reshape(counts, (-1, self._num_vars, self._num_components))
+        indices = tf.argmax(counts_reshaped, axis=-1) + tf.expand_dims(
+            tf.range(self._num_vars, dtype=tf.int64) * self._num_components, axis=0)
+        loc = tf.gather(tf.reshape(self._dist.loc, (-1,)), indices=indices, axis=0)
+        scale = tf.gather(tf.reshape(self._dist.scale, (-1,)), indices=indices, axis=0)
+        sample = loc + scale * tf.random_normal(tf.shape(loc), dtype=conf.dtype)
+        return tf.where(self.evidence, self._feed, sample)
+
     @utils.docinherit(Node)
     @utils.lru_cache
     def _compute_hard_em_update(self, counts):
@@ -9,6 +9,7 @@ from abc import ABC, abstractmethod
 from libspn import utils
 from libspn.log import get_logger
 from libspn.graph.serialization import deserialize_graph
+import tensorflow as tf
 import os
 
 
@@ -53,12 +54,17 @@ class Loader(ABC):
 
 
 class JSONLoader(Loader):
-    """Loads an SPN from a JSON file.
+    """Loads an SPN from a JSON file. Parameter values saved into a binary
+    file by :class:`~libspn.JSONSaver` are loaded from that file.
+
+    If parameter values are loaded, but no session is given and there is no
+    default session, the values are not assigned during loading. Instead, they
+    can be assigned later, in a single run, using :meth:`initialize_params`
+    or by running :attr:`params_initializer` with :attr:`params_feed_dict`.
+    Values stored in a binary file are memory-mapped until then.
 
     Args:
         path (str): Full path to the file.
-        sess (Session): Optional. Session used to assign parameter values.
-                        If ``None``, the default session is used.
     """
 
     __logger = get_logger()
@@ -67,11 +73,47 @@ class JSONLoader(Loader):
 
     def __init__(self, path):
         super().__init__(path)
+        self._param_init = {}
+
+    @property
+    def params_initializer(self):
+        """Operation: Operation assigning loaded parameter values, if they
+        were not assigned during loading, or ``None``."""
+        return self._param_init.get('op')
+
+    @property
+    def params_feed_dict(self):
+        """dict: Feed dictionary required to run
+        :attr:`params_initializer`."""
+        return self._param_init.get('feed_dict')
+
+    def initialize_params(self, sess=None):
+        """Assign loaded parameter values, if they were not assigned during
+        loading.
+
+        Args:
+            sess (Session): Optional. Session used to assign parameter values.
+                            If ``None``, the default session is used.
+        """
+        if self.params_initializer is None:
+            return
+        if sess is None:
+            sess = tf.get_default_session()
+        sess.run(self.params_initializer, feed_dict=self.params_feed_dict)
 
     @utils.docinherit(Loader)
     def load(self, load_param_vals=True, sess=None):
         self.__info("Loading SPN graph from file '%s'" % self._path)
-        data = utils.json_load(self._path)
+        # Nodes saved one per line are decoded while the graph is created
+        data, nodes = utils.json_load_stream(self._path, 'nodes')
+        data['nodes'] = nodes
+        params_file = data.get('params_file')
+        if params_file is not None:
+            params_file = os.path.join(os.path.dirname(self._path), params_file)
+        lazy = sess is None and tf.get_default_session() is None
+        self._param_init = {}
         root = deserialize_graph(data, load_param_vals=load_param_vals,
-                                 sess=sess, nodes_by_name=self._nodes_by_name)
+                                 sess=sess, nodes_by_name=self._nodes_by_name,
+                                 params_file=params_file,
+                                 param_init=self._param_init if lazy else None)
         return root
@@ -7,29 +7,77 @@
 import abc
 from abc import ABC, abstractmethod, abstractproperty
 from collections import namedtuple, OrderedDict
+from contextlib import contextmanager
+from types import MappingProxyType
 
 import tensorflow as tf
 from libspn import utils, conf
 from libspn.inference.type import InferenceType
 from libspn.exceptions import StructureError
-from libspn.graph.algorithms import compute_graph_up, traverse_graph
+from libspn.graph.scope import ScopeVars
+from libspn.graph.algorithms import (compute_graph_up, traverse_graph,
+                                     GraphSchedule)
 
 
 class GraphData():
     """Data structure holding information common for all SPN nodes
     in the same TensorFlow graph.
 
-    Right now, we do not keep here anything, but we were, and we might in
-    the future, therefore we keep this class for now.
+    Right now, it caches the traversal schedules of the SPN graphs rooted in
+    the nodes of the TF graph and holds the registry of random variables used
+    by the scopes of these graphs.
     """
 
     def __init__(self, tf_graph):
         self._tf_graph = tf_graph
+        self._schedules = {}
+        self._scope_vars = ScopeVars()
+        self._node_scopes = {}
 
     @property
     def tf_graph(self):
         return self._tf_graph
 
+    @property
+    def scope_vars(self):
+        """ScopeVars: Registry of random variables of the scopes of nodes in
+        the TF graph."""
+        return self._scope_vars
+
+    @property
+    def node_scopes(self):
+        """dict: Dictionary indexed by the full names of TF name scopes opened
+        by :meth:`Node.inference_scope`, where each value is the name of the
+        node owning the scope."""
+        return MappingProxyType(self._node_scopes)
+
+    def register_node_scope(self, scope, node):
+        """Record that the TF name scope ``scope`` (ending with ``/``)
+        contains the ops of ``node``."""
+        self._node_scopes[scope] = node.name
+
+    def get_schedule(self, root):
+        """Get the traversal schedule of the SPN graph rooted in ``root``. The
+        schedule is compiled if it is not cached yet.
+
+        Args:
+            root (Node): The root of the SPN graph.
+
+        Returns:
+            GraphSchedule: The schedule of the graph.
+        """
+        try:
+            return self._schedules[root]
+        except KeyError:
+            schedule = GraphSchedule(root)
+            self._schedules[root] = schedule
+            return schedule
+
+    def clear_schedules(self):
+        """Drop all cached traversal schedules. Must be called whenever the
+        structure of any SPN graph in the TF graph is modified."""
+        self._schedules.clear()
+
     @staticmethod
     def get(tf_graph=None):
         """Get GraphData for the TF graph or install a new GraphData if the
@@ -209,7 +257,8 @@ class Node(ABC):
             name = "Node"
         self._name = self.tf_graph.unique_name(name)
         self.inference_type = inference_type
-        with tf.name_scope(self._name + "/"):
+        with tf.name_scope(self._name + "/") as scope:
+            self._graph_data.register_node_scope(scope, self)
             self._create()
 
     @abstractmethod
@@ -260,6 +309,17 @@ class Node(ABC):
         # Not the best oop, but avoids the need for importing .node to check
         return isinstance(self, VarNode)
 
+    def get_schedule(self):
+        """Get the traversal schedule of the SPN graph rooted in this node.
+
+        The schedule is cached and reused until inputs of any node in the same
+        TF graph are modified.
+
+        Returns:
+            GraphSchedule: The schedule of the graph.
+        """
+        return self._graph_data.get_schedule(self)
+
     def get_tf_graph_size(self):
         """Get the size of the TensorFlow graph with which this SPN graph node is associated."""
         return len(self.tf_graph.get_operations())
@@ -323,6 +383,21 @@ class Node(ABC):
         return compute_graph_up(self, (lambda node, *args:
                                        node._compute_scope(*args)))
 
+    @contextmanager
+    def inference_scope(self):
+        """Context manager opening a TF name scope named after this node,
+        inside the current name scope, for ops assembled for this node during
+        inference or learning. The scope is registered as owned by this node,
+        which allows mapping the ops back to the node, e.g. in
+        :func:`~libspn.profile_nodes`.
+
+        Yields:
+            str: The full name of the opened name scope.
+        """
+        with tf.name_scope(self._name) as scope:
+            self._graph_data.register_node_scope(scope, self)
+            yield scope
+
     def is_valid(self):
         """Check if the SPN rooted in this node is complete and decomposable.
         If a node has multiple outputs, it is considered valid if all outputs
@@ -556,6 +631,7 @@ class OpNode(Node):
             nodes_by_name (dict): Dictionary of nodes indexed by their original
                                   name.
         """
+        self._invalidate_schedules()
 
     @abstractproperty
     def inputs(self):
@@ -622,6 +698,11 @@ class OpNode(Node):
 
         return tuple(convert(i) for i in input_likes)
 
+    def _invalidate_schedules(self):
+        """Invalidate cached traversal schedules after the inputs of this node
+        were modified. Must be called by every method changing the inputs."""
+        self._graph_data.clear_schedules()
+
     def _gather_input_sizes(self, *input_out_sizes):
         """For each input, count the input values selected by the input indices.
         If the input is disconnected or ``None`` is given as input_out_size,
@@ -749,6 +830,76 @@ class OpNode(Node):
             second dimension is the size of the output of the input node.
         """
 
+    def _compute_log_sample_path(self, counts, *input_values):
+        """Assemble TF operations computing the branch counts for each input
+        of the node for a path sampled downwards through the SPN, given log
+        values computed using marginal inference.
+
+        Nodes choosing between their inputs (sums) must re-implement this in
+        order to draw the input. By default, the counts are passed as for the
+        MPE path.
+
+        Args:
+            counts (Tensor): Branch counts for each output value of this node.
+            *input_values (Tensor): For each input, a tensor containing the log
+                                    value produced by the input node. Can be
+                                    ``None`` if the input is not connected.
+
+        Returns:
+            list of Tensor: For each input, branch counts to pass to the node
+            connected to the input. Each tensor is of shape ``[None, out_size]``,
+            where the first dimension corresponds to the batch size and the
+            second dimension is the size of the output of the input node.
+        """
+        return self._compute_log_mpe_path(counts, *input_values)
+
+    def _compute_log_mpe_gaps(self, *input_values):
+        """Assemble TF operations computing, for each output of the node, the
+        difference between the log values obtained with the best and the
+        second best input in MPE inference.
+
+        Nodes choosing between their inputs (sums) must re-implement this in
+        order to support top-k MPE inference. By default, the node does not
+        choose between its inputs.
+
+        Args:
+            *input_values (Tensor): For each input, a tensor containing the log
+                                    value produced by the input node. Can be
+                                    ``None`` if the input is not connected.
+
+        Returns:
+            Tensor: A tensor of shape ``[None, out_size]``, or ``None`` if the
+            node does not choose between its inputs. The difference is
+            infinite if there is no second best input.
+        """
+        return None
+
+    def _compute_log_mpe_path_deviated(self, counts, deviate, *input_values):
+        """Assemble TF operations computing the MPE branch counts for each input
+        of the node, with the outputs marked in ``deviate`` choosing their
+        second best input instead of the best one.
+
+        Nodes choosing between their inputs (sums) must re-implement this in
+        order to support top-k MPE inference. By default, the counts are passed
+        as for the MPE path.
+
+        Args:
+            counts (Tensor): Branch counts for each output value of this node.
+            deviate (Tensor): A boolean tensor of shape ``[None, out_size]``
+                              marking the deviating outputs. Can be ``None``
+                              if the node does not choose between its inputs.
+            *input_values (Tensor): For each input, a tensor containing the log
+                                    value produced by the input node. Can be
+                                    ``None`` if the input is not connected.
+
+        Returns:
+            list of Tensor: For each input, branch counts to pass to the node
+            connected to the input. Each tensor is of shape ``[None, out_size]``,
+            where the first dimension corresponds to the batch size and the
+            second dimension is the size of the output of the input node.
+        """
+        return self._compute_log_mpe_path(counts, *input_values)
+
     # @abstractmethod
     # def _compute_gradient(self, gradients, *input_values):
     #     """Assemble TF operations computing gradients for each input of the node.
@@ -923,6 +1074,21 @@ class VarNode(Node):
             Tensor: MPE state of every variable in the node.
         """
 
+    def _compute_sample(self, counts):
+        """Assemble TF operations computing the values of the variables
+        represented by the node for a path sampled downwards through the SPN.
+
+        By default, the sampled value is the MPE state given the counts, i.e.
+        the value selected by the path.
+
+        Args:
+            counts (Tensor): Branch counts for each output value of this node.
+
+        Returns:
+            Tensor: Sampled value of every variable in the node.
+        """
+        return self._compute_mpe_state(counts)
+
     def _as_graph_element(self):
         """Used by TF to convert this class to a tensor.
 
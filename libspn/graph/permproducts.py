@@ -5,7 +5,7 @@
 # via any medium is strictly prohibited. Proprietary and confidential.
 # ------------------------------------------------------------------------
 
-from itertools import chain, combinations, product
+from itertools import chain, product
 import tensorflow as tf
 from libspn.graph.scope import Scope
 from libspn.graph.node import OpNode, Input
@@ -80,6 +80,7 @@ class PermProducts(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     def create_products(self):
         """Based on the number and size of inputs connected to this node, model
@@ -130,6 +131,7 @@ class PermProducts(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._values + self._parse_inputs(*values)
+        self._invalidate_schedules()
         self.create_products()
 
     @property
@@ -154,14 +156,13 @@ class PermProducts(OpNode):
         # If already invalid, return None
         if any(s is None for s in value_scopes_):
             return None
-        # Check product decomposability
-        permuted_value_scopes = list(product(*value_scopes_))
-        for perm_val_scope in permuted_value_scopes:
-            for s1, s2 in combinations(perm_val_scope, 2):
-                if s1 & s2:
-                    PermProducts.info("%s is not decomposable with input value "
-                                      "scopes %s", self, value_scopes_)
-                    return None
+        # Check product decomposability. Every permutation is decomposable iff
+        # no two scopes coming from different inputs overlap, i.e. iff the
+        # merged scopes of the inputs are pairwise disjoint.
+        if not Scope.disjoint(Scope.merge_scopes(s) for s in value_scopes_):
+            PermProducts.info("%s is not decomposable with input value "
+                              "scopes %s", self, value_scopes_)
+            return None
         return self._compute_scope(*value_scopes)
 
     @utils.lru_cache
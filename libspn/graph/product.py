@@ -5,7 +5,7 @@
 # via any medium is strictly prohibited. Proprietary and confidential.
 # ------------------------------------------------------------------------
 
-from itertools import chain, combinations
+from itertools import chain
 import tensorflow as tf
 from libspn.graph.scope import Scope
 from libspn.graph.node import OpNode, Input
@@ -67,6 +67,7 @@ class Product(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     def add_values(self, *values):
         """Add more inputs providing input values to this node.
@@ -76,6 +77,7 @@ class Product(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._values + self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     @property
     def _const_out_size(self):
@@ -99,11 +101,10 @@ class Product(OpNode):
             return None
         # Check product decomposability
         flat_value_scopes = list(chain.from_iterable(value_scopes_))
-        for s1, s2 in combinations(flat_value_scopes, 2):
-            if s1 & s2:
-                self.__info("%s is not decomposable with input value scopes %s",
-                            self, flat_value_scopes)
-                return None
+        if not Scope.disjoint(flat_value_scopes):
+            self.__info("%s is not decomposable with input value scopes %s",
+                        self, flat_value_scopes)
+            return None
         return self._compute_scope(*value_scopes)
 
     @utils.lru_cache
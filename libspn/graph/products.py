@@ -5,7 +5,7 @@
 # via any medium is strictly prohibited. Proprietary and confidential.
 # ------------------------------------------------------------------------
 
-from itertools import chain, combinations, repeat
+from itertools import chain, repeat
 import tensorflow as tf
 from libspn.graph.scope import Scope
 from libspn.graph.node import OpNode, Input
@@ -87,6 +87,7 @@ class Products(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     def add_values(self, *values):
         """Add more inputs providing input values to this node.
@@ -96,6 +97,7 @@ class Products(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._values + self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     @property
     def _const_out_size(self):
@@ -127,12 +129,10 @@ class Products(OpNode):
         values_per_product = int(len(flat_value_scopes) / self._num_prods)
         sub_value_scopes = [flat_value_scopes[i:(i + values_per_product)] for i in
                             range(0, len(flat_value_scopes), values_per_product)]
-        for scopes in sub_value_scopes:
-            for s1, s2 in combinations(scopes, 2):
-                if s1 & s2:
-                    Products.info("%s is not decomposable with input value scopes %s",
-                                  self, flat_value_scopes)
-                    return None
+        if not all(Scope.disjoint(scopes) for scopes in sub_value_scopes):
+            Products.info("%s is not decomposable with input value scopes %s",
+                          self, flat_value_scopes)
+            return None
         return self._compute_scope(*value_scopes)
 
     def _compute_value_common(self, *value_tensors):
@@ -8,7 +8,7 @@
 import numpy as np
 import tensorflow as tf
 from collections import OrderedDict, defaultdict
-from itertools import chain, combinations
+from itertools import chain
 from libspn.graph.scope import Scope
 from libspn.graph.node import OpNode, Input
 from libspn.inference.type import InferenceType
@@ -124,6 +124,7 @@ class ProductsLayer(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     def add_values(self, *values):
         """Add more inputs providing input values to this node.
@@ -133,6 +134,7 @@ class ProductsLayer(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._values + self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     @property
     def _const_out_size(self):
@@ -147,13 +149,9 @@ class ProductsLayer(OpNode):
         # Gather and flatten value scopes
         flat_value_scopes = list(chain.from_iterable(self._gather_input_scopes(
                                                 *value_scopes)))
-        # Divide gathered and flattened value scopes into sublists, one per
-        # modeled product op.
-        prod_input_sizes = np.cumsum(np.array(self._prod_input_sizes)).tolist()
-        prod_input_sizes.insert(0, 0)
-        value_scopes_lists = [flat_value_scopes[start:stop] for start, stop in
-                              zip(prod_input_sizes[:-1], prod_input_sizes[1:])]
-        return [Scope.merge_scopes(vsl) for vsl in value_scopes_lists]
+        # Merge the sublists of scopes of each modeled product op
+        return Scope.merge_scope_groups(flat_value_scopes,
+                                        self._prod_input_sizes)
 
     def _compute_valid(self, *value_scopes):
         if not self._values:
@@ -170,12 +168,10 @@ class ProductsLayer(OpNode):
         prod_input_sizes.insert(0, 0)
         value_scopes_lists = [flat_value_scopes[start:stop] for start, stop in
                               zip(prod_input_sizes[:-1], prod_input_sizes[1:])]
-        for scopes in value_scopes_lists:
-            for s1, s2 in combinations(scopes, 2):
-                if s1 & s2:
-                    ProductsLayer.info("%s is not decomposable with input value scopes %s",
-                                       self, flat_value_scopes)
-                    return None
+        if not all(Scope.disjoint(scopes) for scopes in value_scopes_lists):
+            ProductsLayer.info("%s is not decomposable with input value scopes %s",
+                               self, flat_value_scopes)
+            return None
         return self._compute_scope(*value_scopes)
 
     def _combine_values_and_indices(self, value_tensors):
@@ -8,6 +8,54 @@
 import collections.abc
 
 
+def _popcount(bits):
+    return bin(bits).count('1')
+
+
+class ScopeVars:
+    """Registry interning random variables as bits of scope bitmasks.
+
+    Each random variable ``(node, var_id)`` is assigned a bit the first time
+    a scope containing it is created. The variables of nodes in a TF graph are
+    interned in the registry stored in the :class:`~libspn.graph.node.GraphData`
+    of that graph, and released together with the graph.
+    """
+
+    def __init__(self):
+        self._bits = {}
+        self._vars = []
+
+    def bit(self, node, var_id):
+        """Get the bit assigned to the random variable ``(node, var_id)``."""
+        key = (node, var_id)
+        try:
+            return self._bits[key]
+        except KeyError:
+            bit = len(self._vars)
+            self._bits[key] = bit
+            self._vars.append(key)
+            return bit
+
+    def vars(self, bits):
+        """Generate the random variables of the bitmask ``bits``."""
+        while bits:
+            low = bits & -bits
+            yield self._vars[low.bit_length() - 1]
+            bits ^= low
+
+    def convert(self, bits, other):
+        """Convert the bitmask ``bits`` interned in this registry to a bitmask
+        of registry ``other``."""
+        converted = 0
+        for node, var_id in self.vars(bits):
+            converted |= 1 << other.bit(node, var_id)
+        return converted
+
+
+# Registry of variables of nodes not belonging to any TF graph
+_global_scope_vars = ScopeVars()
+
+
 class Scope(collections.abc.Set):
     """Class storing a scope of an output value in the SPN graph.
 
@@ -18,7 +66,15 @@ class Scope(collections.abc.Set):
     A scope should be seen as an immutable set. Scopes are first created in
     variable nodes and then merged in other nodes.
 
-    Scopes are hashable and can be used as keys in dictionaries.
+    Internally, a scope is an integer bitmask with one bit per random variable,
+    interned in a :class:`ScopeVars` registry shared by all nodes of a TF graph.
+    Merging scopes is therefore a bitwise OR and checking for overlap a bitwise
+    AND. Scopes of nodes in different TF graphs use different registries and
+    should not be mixed.
+
+    Scopes are hashable and can be used as keys in dictionaries. The hash is
+    computed from the set of variables rather than the bitmask, so that scopes
+    comparing equal across registries also hash equally.
 
     The constructor creates a singleton scope containing one variable.
 
@@ -29,49 +85,64 @@ class Scope(collections.abc.Set):
                       initialize the scope.
     """
 
+    __slots__ = ('__vars', '__bits', '__hash')
+
     def __init__(self, node, var_id):
-        self.__set = frozenset([(node, var_id)])
+        graph_data = getattr(node, '_graph_data', None)
+        self.__vars = (graph_data.scope_vars if graph_data is not None
+                       else _global_scope_vars)
+        self.__bits = 1 << self.__vars.bit(node, var_id)
+        self.__hash = None
 
     @classmethod
-    def __empty(cls):
-        return cls.__new__(cls)
+    def __new_scope(cls, scope_vars, bits):
+        scope = cls.__new__(cls)
+        scope.__vars = scope_vars
+        scope.__bits = bits
+        scope.__hash = None
+        return scope
+
+    def __other_bits(self, other):
+        """Get the bitmask of ``other`` in the registry of this scope."""
+        if other.__vars is self.__vars or not other.__bits:
+            return other.__bits
+        return other.__vars.convert(other.__bits, self.__vars)
 
     def __contains__(self, item):
-        return item in self.__set
+        try:
+            bit = self.__vars._bits[item]
+        except (KeyError, TypeError):
+            return False
+        return bool(self.__bits >> bit & 1)
 
     def __len__(self):
-        return self.__set.__len__()
+        return _popcount(self.__bits)
 
     def __iter__(self):
-        return self.__set.__iter__()
+        return self.__vars.vars(self.__bits)
+
+    def __bool__(self):
+        return self.__bits != 0
 
     def __or__(self, other):
         if not isinstance(other, Scope):
             return NotImplemented
-        scope = Scope.__empty()
-        scope.__set = self.__set.__or__(other.__set)
-        return scope
+        return Scope.__new_scope(self.__vars, self.__bits | self.__other_bits(other))
 
     def __and__(self, other):
         if not isinstance(other, Scope):
             return NotImplemented
-        scope = Scope.__empty()
-        scope.__set = self.__set.__and__(other.__set)
-        return scope
+        return Scope.__new_scope(self.__vars, self.__bits & self.__other_bits(other))
 
     def __sub__(self, other):
         if not isinstance(other, Scope):
             return NotImplemented
-        scope = Scope.__empty()
-        scope.__set = self.__set.__sub__(other.__set)
-        return scope
+        return Scope.__new_scope(self.__vars, self.__bits & ~self.__other_bits(other))
 
     def __xor__(self, other):
         if not isinstance(other, Scope):
             return NotImplemented
-        scope = Scope.__empty()
-        scope.__set = self.__set.__xor__(other.__set)
-        return scope
+        return Scope.__new_scope(self.__vars, self.__bits ^ self.__other_bits(other))
 
     def __ror__(self, other):
         return NotImplemented
@@ -86,65 +157,57 @@ class Scope(collections.abc.Set):
         return NotImplemented
 
     def difference(self, other):
-        if not isinstance(other, Scope):
-            return NotImplemented
-        scope = Scope.__empty()
-        scope.__set = self.__set.difference(other.__set)
-        return scope
+        return self.__sub__(other)
 
     def intersection(self, other):
-        if not isinstance(other, Scope):
-            return NotImplemented
-        scope = Scope.__empty()
-        scope.__set = self.__set.intersection(other.__set)
-        return scope
+        return self.__and__(other)
 
     def symmetric_difference(self, other):
-        if not isinstance(other, Scope):
-            return NotImplemented
-        scope = Scope.__empty()
-        scope.__set = self.__set.symmetric_difference(other.__set)
-        return scope
+        return self.__xor__(other)
 
     def union(self, other):
-        if not isinstance(other, Scope):
-            return NotImplemented
-        scope = Scope.__empty()
-        scope.__set = self.__set.union(other.__set)
-        return scope
+        return self.__or__(other)
 
     def isdisjoint(self, other):
         if not isinstance(other, Scope):
             return NotImplemented
-        return self.__set.isdisjoint(other.__set)
+        return not self.__bits & self.__other_bits(other)
 
     def issubset(self, other):
         if not isinstance(other, Scope):
             return NotImplemented
-        return self.__set.issubset(other.__set)
+        return not self.__bits & ~self.__other_bits(other)
 
     def issuperset(self, other):
         if not isinstance(other, Scope):
             return NotImplemented
-        return self.__set.issuperset(other.__set)
+        return not self.__other_bits(other) & ~self.__bits
 
     def __eq__(self, other):
-        return self.__set.__eq__(other.__set)
+        if not isinstance(other, Scope):
+            return NotImplemented
+        return self.__bits == self.__other_bits(other)
 
     def __ne__(self, other):
-        return self.__set.__ne__(other.__set)
+        if not isinstance(other, Scope):
+            return NotImplemented
+        return self.__bits != self.__other_bits(other)
 
     def __ge__(self, other):
-        return self.__set.__ge__(other.__set)
+        return self.issuperset(other)
 
     def __gt__(self, other):
-        return self.__set.__gt__(other.__set)
+        if not isinstance(other, Scope):
+            return NotImplemented
+        return self.issuperset(other) and self != other
 
     def __le__(self, other):
-        return self.__set.__le__(other.__set)
+        return self.issubset(other)
 
     def __lt__(self, other):
-        return self.__set.__lt__(other.__set)
+        if not isinstance(other, Scope):
+            return NotImplemented
+        return self.issubset(other) and self != other
 
     def __reduce__(self):
         raise NotImplementedError
@@ -153,7 +216,10 @@ class Scope(collections.abc.Set):
         raise NotImplementedError
 
     def __hash__(self):
-        return self.__set.__hash__()
+        # Bit positions are registry-local, hash the variables themselves
+        if self.__hash is None:
+            self.__hash = hash(frozenset(self))
+        return self.__hash
 
     @staticmethod
     def merge_scopes(scopes):
@@ -165,10 +231,51 @@ class Scope(collections.abc.Set):
         Returns:
             Scope: Merged scope.
         """
-        scope = Scope.__empty()
-        scope.__set = frozenset([v for s in scopes for v in s])
-        return scope
+        scope_vars = None
+        bits = 0
+        for s in scopes:
+            if scope_vars is None:
+                scope_vars = s.__vars
+            bits |= s.__bits if s.__vars is scope_vars else s.__vars.convert(
+                s.__bits, scope_vars)
+        return Scope.__new_scope(scope_vars or _global_scope_vars, bits)
+
+    @staticmethod
+    def merge_scope_groups(scopes, sizes):
+        """Merge consecutive groups of scopes in ``scopes`` into single scopes,
+        e.g. to compute the scopes of all outputs of a layer node at once.
+
+        Args:
+            scopes (list of Scope): List of scopes to merge.
+            sizes (list of int): Number of consecutive scopes in each group.
+
+        Returns:
+            list of Scope: Merged scope of each group.
+        """
+        merged = []
+        start = 0
+        for size in sizes:
+            merged.append(Scope.merge_scopes(scopes[start:start + size]))
+            start += size
+        return merged
+
+    @staticmethod
+    def disjoint(scopes):
+        """Check if the scopes in ``scopes`` are pairwise disjoint. This is
+        the decomposability check of product nodes, performed in linear time
+        by comparing the size of the merged scope with the total size of the
+        scopes.
+
+        Args:
+            scopes (iterable of Scope): List or iterator of scopes to check.
+
+        Returns:
+            bool: ``True`` if no two scopes share a random variable.
+        """
+        scopes = list(scopes)
+        return (len(Scope.merge_scopes(scopes))
+                == sum(_popcount(s.__bits) for s in scopes))
 
     def __repr__(self):
         return ("Scope({%s})" % ', '.join(
-            ("%s:%s" % (v[0], v[1])) for v in self.__set))
+            ("%s:%s" % (v[0], v[1])) for v in self))
@@ -9,13 +9,61 @@
 
 from libspn.log import get_logger
 from libspn import utils
-from libspn.graph.algorithms import traverse_graph
+import numpy as np
 import tensorflow as tf
 
 logger = get_logger()
 
+PARAM_REF = '__param__'
+"""Key of dictionaries referencing parameter values stored in a binary file."""
 
-def serialize_graph(root, save_param_vals=True, sess=None):
+_PARAM_ALIGNMENT = 64
+"""Alignment of parameter arrays in a binary file, in bytes."""
+
+
+def _write_params(path, values):
+    """Write parameter arrays into a raw binary file.
+
+    Args:
+        path (str): Path to the file.
+        values (list of array): The arrays.
+
+    Returns:
+        list of dict: References to the arrays in the file.
+    """
+    refs = []
+    with open(path, 'wb') as f:
+        for v in values:
+            v = np.ascontiguousarray(v)
+            offset = -f.tell() % _PARAM_ALIGNMENT
+            f.write(b'\0' * offset)
+            refs.append({PARAM_REF: {'offset': f.tell(),
+                                     'dtype': v.dtype.str,
+                                     'shape': list(v.shape)}})
+            f.write(v.tobytes())
+    return refs
+
+
+def _read_param(path, ref):
+    """Get a read-only memory map of a parameter array referenced by ``ref``
+    in the binary file ``path``."""
+    ref = ref[PARAM_REF]
+    return np.memmap(path, dtype=np.dtype(ref['dtype']), mode='r',
+                     offset=ref['offset'], shape=tuple(ref['shape']))
+
+
+def _is_param_ref(value):
+    return isinstance(value, dict) and PARAM_REF in value
+
+
+def _param_variables(node):
+    """Get the TF variables of a parameter node, indexed by the keys of
+    serialized data in which the variables are stored."""
+    return {k: v for k, v in node.serialize().items()
+            if isinstance(v, tf.Variable)}
+
+
+def serialize_graph(root, save_param_vals=True, sess=None, params_file=None):
     """Convert an SPN graph rooted in ``root`` into a dictionary for serialization.
 
     The graph is converted to a dict here rather than a collection of Node since
@@ -30,14 +78,31 @@ def serialize_graph(root, save_param_vals=True, sess=None):
             found, the parameter values will not be retrieved.
         sess (Session): Optional. Session used to retrieve parameter values.
                         If ``None``, the default session is used.
+        params_file (str): Optional. If given, parameter values are written as
+                           raw arrays to this binary file, and the dictionary
+                           contains references to the arrays in the file.
+                           Otherwise, the values are stored as lists.
 
     Returns:
-        dict: Dictionary with all the data to be serialized.
+        dict: Dictionary with all the data to be serialized. The nodes are
+        stored in topological order, i.e. every node is preceded by the nodes
+        connected to its inputs, which is marked by the ``topological`` entry.
+        If parameter values were written to ``params_file``, its path is
+        stored in the ``params_file`` entry.
     """
+    # Check session
+    if sess is None:
+        sess = tf.get_default_session()
+    if save_param_vals and sess is None:
+        logger.debug1("No valid session found, "
+                      "parameter values will not be saved!")
+        save_param_vals = False
+
+    # Serialize all nodes in topological order, so that the inputs of every
+    # node are deserialized before the node
     node_datas = []
     param_vars = {}
-
-    def fun(node):
+    for node in root.get_schedule().nodes:
         data = node.serialize()
         # The nodes will not be deserialized automatically during JSON
         # decoding since they do not use the __type__ data field.
@@ -57,30 +122,72 @@ def serialize_graph(root, save_param_vals=True, sess=None):
                     if isinstance(v, tf.Variable):
                         data[k] = None
 
-    # Check session
-    if sess is None:
-        sess = tf.get_default_session()
-    if save_param_vals and sess is None:
-        logger.debug1("No valid session found, "
-                      "parameter values will not be saved!")
-        save_param_vals = False
-
-    # Serialize all nodes
-    traverse_graph(root, fun=fun, skip_params=False)
-
     # Get and fill values of all variables
     if save_param_vals:
         param_vals = sess.run(param_vars)
-        for (i, k), v in param_vals.items():
-            node_datas[i][k] = v.tolist()
+        if params_file is None:
+            for (i, k), v in param_vals.items():
+                node_datas[i][k] = v.tolist()
+        else:
+            keys = sorted(param_vals.keys())
+            refs = _write_params(params_file, [param_vals[k] for k in keys])
+            for (i, k), ref in zip(keys, refs):
+                node_datas[i][k] = ref
+            return {'root': root.name, 'topological': True,
+                    'nodes': node_datas, 'params_file': params_file}
+
+    return {'root': root.name, 'topological': True, 'nodes': node_datas}
 
-    return {'root': root.name, 'nodes': node_datas}
+
+def _param_assign_ops(node, data, params_file, feed_dict, refs_only=False):
+    """Create ops assigning saved values to the variables of a parameter node
+    through placeholders, and add the values to ``feed_dict``.
+
+    Args:
+        node (ParamNode): The deserialized parameter node.
+        data (dict): Serialized data of the node.
+        params_file (str): Path to the binary file with parameter values.
+        feed_dict (dict): Feed dictionary filled with the values.
+        refs_only (bool): Only assign values stored in the binary file.
+
+    Returns:
+        list of Operation: The assignment ops.
+    """
+    ops = []
+    with tf.name_scope(node.name + "/"):
+        for k, variable in sorted(_param_variables(node).items()):
+            value = data.get(k)
+            if value is None or (refs_only and not _is_param_ref(value)):
+                continue
+            if _is_param_ref(value):
+                if params_file is None:
+                    raise ValueError("params_file must be given to load "
+                                     "parameter values stored in a binary file")
+                value = _read_param(params_file, value)
+            else:
+                value = np.asarray(
+                    value, dtype=variable.dtype.base_dtype.as_numpy_dtype)
+            placeholder = tf.placeholder(variable.dtype.base_dtype,
+                                         shape=value.shape, name=k)
+            ops.append(tf.assign(variable, placeholder))
+            feed_dict[placeholder] = value
+    return ops
 
 
 def deserialize_graph(data, load_param_vals=True, sess=None,
-                      nodes_by_name=None):
+                      nodes_by_name=None, params_file=None, param_init=None):
     """Create an SPN graph based on the ``data`` dict during deserialization.
 
+    If the nodes are stored in topological order (see :func:`serialize_graph`),
+    the graph is created in a single pass, linking every node to its inputs as
+    soon as it is created. Therefore, ``data['nodes']`` can be any iterable,
+    e.g. one decoding the nodes incrementally from a file.
+
+    Parameter values are assigned to the variables through placeholders fed in
+    a single run, so that the values are never embedded in the TF graph.
+    Values stored in a binary file (see :func:`serialize_graph`) are
+    memory-mapped and read only when fed.
+
     Args:
         data (dict): Dictionary with all the data to be deserialized.
         load_param_vals (bool): If ``True``, saved values of parameters will
@@ -93,6 +200,14 @@ def deserialize_graph(data, load_param_vals=True, sess=None,
                               that the current name of a node might be different
                               if another node of the same name existed when the
                               nodes were loaded.
+        params_file (str): Path to the binary file with parameter values
+                           referenced in ``data``.
+        param_init (dict): Optional. If given, parameter values are not
+                           assigned in a session. Instead, the dictionary is
+                           filled with the operation assigning the values under
+                           ``'op'`` and the feed dictionary with the values
+                           required to run it under ``'feed_dict'``. This way,
+                           a session is not needed during loading.
 
     Returns:
         Node: The root of the SPN graph.
@@ -103,32 +218,50 @@ def deserialize_graph(data, load_param_vals=True, sess=None,
     # Check session
     if sess is None:
         sess = tf.get_default_session()
-    if load_param_vals and sess is None:
+    if load_param_vals and sess is None and param_init is None:
         logger.debug1("No valid session found, "
                       "parameter values will not be loaded!")
         load_param_vals = False
 
     # Deserialize all nodes
-    node_datas = data['nodes']
-    nodes = [None] * len(node_datas)
+    # Nodes stored in topological order are linked right away, since all their
+    # inputs already exist, otherwise linking is deferred until all nodes exist
+    topological = data.get('topological', False)
+    unlinked = []
     ops = []
-    for ni, d in enumerate(node_datas):
+    feed_dict = {}
+    for d in data['nodes']:
         node_type = utils.str2type(d['node_type'])
         node_instance = node_type.__new__(node_type)
-        op = node_instance.deserialize(d)
-        if node_instance.is_param and op is not None:
-            ops.append(op)
+        # Values stored in a binary file are assigned below
+        refs = [k for k, v in d.items() if _is_param_ref(v)]
+        op = node_instance.deserialize(
+            dict(d, **{k: None for k in refs}) if refs else d)
+        if node_instance.is_param and load_param_vals:
+            # Nodes returning their own deserialization op assign values
+            # stored in the data themselves
+            if op is not None:
+                ops.append(op)
+            ops.extend(_param_assign_ops(node_instance, d, params_file,
+                                         feed_dict, refs_only=op is not None))
         nodes_by_name[d['name']] = node_instance
-        nodes[ni] = node_instance
+        if node_instance.is_op:
+            if topological:
+                node_instance.deserialize_inputs(d, nodes_by_name)
+            else:
+                unlinked.append((node_instance, d))
 
     # Run any deserialization ops for parameter values
     if load_param_vals and ops:
-        sess.run(ops)
+        if param_init is not None:
+            param_init['op'] = tf.group(*ops, name="LoadParams")
+            param_init['feed_dict'] = feed_dict
+        else:
+            sess.run(ops, feed_dict=feed_dict)
 
     # Link nodes  ## WARNING: use sorted since we want to visit Concat node before PermProducts
-    for n, nd in sorted(zip(nodes, node_datas), key=lambda x:x[1]['node_type']):
-        if n.is_op:
-            n.deserialize_inputs(nd, nodes_by_name)
+    for n, nd in sorted(unlinked, key=lambda x: x[1]['node_type']):
+        n.deserialize_inputs(nd, nodes_by_name)
 
     # Retrieve root
     root = nodes_by_name[data['root']]
@@ -126,6 +126,7 @@ class Sums(OpNode):
         if weights and not isinstance(weights.node, Weights):
             raise StructureError("%s is not Weights" % weights.node)
         self._weights = weights
+        self._invalidate_schedules()
 
     @property
     def ivs(self):
@@ -140,6 +141,7 @@ class Sums(OpNode):
             for possible values. If set to ``None``, the input is disconnected.
         """
         self._ivs, = self._parse_inputs(ivs)
+        self._invalidate_schedules()
 
     @property
     def values(self):
@@ -155,6 +157,7 @@ class Sums(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     def add_values(self, *values):
         """Add more inputs providing input values to this node.
@@ -164,6 +167,7 @@ class Sums(OpNode):
                 See :meth:`~libspn.Input.as_input` for possible values.
         """
         self._values = self._values + self._parse_inputs(*values)
+        self._invalidate_schedules()
 
     def generate_weights(self, init_value=1, trainable=True,
                          input_sizes=None, name=None):
@@ -433,3 +437,53 @@ class Sums(OpNode):
 
         return self._compute_mpe_path_common(
             values_weighted, counts, weight_value, ivs_value, *value_values)
+
+    def _compute_log_values_weighted(self, weight_value, ivs_value, *value_values):
+        """Compute the weighted, IV selected log values of the inputs of
+        shape ``(Batch X num_sums X num_feat)``, together with the processed
+        weight and IVs values."""
+        weight_value, ivs_value, values = self._compute_value_common(
+            weight_value, ivs_value, *value_values)
+        if self._ivs:
+            values_selected = values + ivs_value
+        else:
+            values_selected = values
+        reshape = (-1, self._num_sums, int(values.shape[1].value / self._num_sums))
+        values_weighted = tf.reshape(values_selected, shape=reshape) + weight_value
+        return weight_value, ivs_value, values_weighted
+
+    @utils.docinherit(OpNode)
+    def _compute_log_sample_path(self, counts, weight_value, ivs_value,
+                                 *value_values):
+        weight_value, ivs_value, values_weighted = self._compute_log_values_weighted(
+            weight_value, ivs_value, *value_values)
+        # Gumbel-max trick: the argmax of perturbed log probabilities is a sample
+        values_weighted += utils.gumbel_noise(tf.shape(values_weighted))
+        return self._compute_mpe_path_common(
+            values_weighted, counts, weight_value, ivs_value, *value_values)
+
+    @utils.docinherit(OpNode)
+    def _compute_log_mpe_gaps(self, weight_value, ivs_value, *value_values):
+        _, _, values_weighted = self._compute_log_values_weighted(
+            weight_value, ivs_value, *value_values)
+        inf = tf.constant(float('inf'), dtype=values_weighted.dtype)
+        if values_weighted.shape[2].value < 2:
+            return tf.fill(tf.shape(values_weighted)[:2], inf)
+        top2 = tf.nn.top_k(values_weighted, k=2).values
+        gaps = top2[:, :, 0] - top2[:, :, 1]
+        # The gap is NaN if all inputs have zero probability
+        return tf.where(tf.is_nan(gaps), tf.fill(tf.shape(gaps), inf), gaps)
+
+    @utils.docinherit(OpNode)
+    def _compute_log_mpe_path_deviated(self, counts, deviate, weight_value,
+                                       ivs_value, *value_values):
+        weight_value, ivs_value, values_weighted = self._compute_log_values_weighted(
+            weight_value, ivs_value, *value_values)
+        # Exclude the best input of the deviating sums
+        best = tf.cast(tf.one_hot(tf.argmax(values_weighted, axis=2),
+                                  values_weighted.shape[2].value), tf.bool)
+        excluded = tf.logical_and(best, tf.expand_dims(deviate, axis=2))
+        values_weighted = tf.where(excluded, tf.fill(tf.shape(values_weighted), tf.constant(
+            -float('inf'), dtype=values_weighted.dtype)), values_weighted)
+        return self._compute_mpe_path_common(
+            values_weighted, counts, weight_value, ivs_value, *value_values)
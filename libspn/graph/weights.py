@@ -69,13 +69,8 @@ class Weights(ParamNode):
         self._trainable = data['trainable']
         self._mask = data['mask']
         super().deserialize(data)
-        # Create an op for deserializing value
-        v = data['value']
-        if v is not None:
-            with tf.name_scope(self._name + "/"):
-                return tf.assign(self._variable, v)
-        else:
-            return None
+        # The saved value is assigned by deserialize_graph
+        return None
 
     @property
     def log(self):
@@ -0,0 +1,598 @@
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+"""Compilation of SPN graphs into NumPy programs for TF-free inference."""
+
+from itertools import chain
+import numpy as np
+import tensorflow as tf
+from libspn import conf
+from libspn import utils
+from libspn.inference.type import InferenceType
+from libspn.graph.ivs import IVs
+from libspn.graph.contvars import ContVars
+from libspn.graph.distribution import GaussianLeaf
+from libspn.graph.weights import Weights
+from libspn.graph.concat import Concat
+from libspn.graph.basesum import BaseSum
+from libspn.graph.sums import Sums
+from libspn.graph.product import Product
+from libspn.graph.products import Products
+from libspn.graph.permproducts import PermProducts
+from libspn.graph.productslayer import ProductsLayer
+from libspn.graph.serialization import (deserialize_graph, _is_param_ref,
+                                        _read_param)
+from libspn.exceptions import StructureError
+
+# Columns of the value buffer holding constant log values, used for padding
+_ZERO_PROB_COL = 0
+_ONE_PROB_COL = 1
+_NUM_CONST_COLS = 2
+
+
+class CompiledSPN:
+    """An SPN lowered into a flat list of vectorized NumPy kernels, computing
+    log values and MPE states without TensorFlow.
+
+    The outputs of all nodes are stored as columns of a single, preallocated
+    value buffer of shape ``[batch, num_columns]``. Each op node is compiled
+    into a kernel gathering its inputs from the buffer using precomputed
+    column indices and reducing them into its own columns, while ``Concat``
+    nodes are resolved at compile time and cost nothing. Parameters are
+    read once during compilation and stored as constants of the kernels.
+    Buffers are reallocated only when a larger batch than any seen before is
+    processed.
+
+    The compiled SPN does not reference the TF graph and can be pickled,
+    e.g. to be shipped to worker processes.
+
+    Args:
+        root (Node): Root of the SPN to compile.
+        sess (Session): Session used to retrieve parameter values. If ``None``
+            and ``param_values`` is not given, the default session is used.
+        param_values (dict): Optional. Parameter values indexed by node or
+            node name. The value of a :class:`~libspn.Weights` node is the
+            value of its variable, the value of a :class:`~libspn.GaussianLeaf`
+            is a tuple ``(loc, scale)``. If given, no session is used.
+        dtype: NumPy data type of the computed values. If ``None``,
+            ``conf.dtype`` is used.
+    """
+
+    def __init__(self, root, sess=None, param_values=None, dtype=None):
+        if dtype is None:
+            dtype = tf.as_dtype(conf.dtype).as_numpy_dtype
+        self._dtype = np.dtype(dtype)
+        self._root_name = root.name
+        schedule = root.get_schedule()
+        if param_values is None:
+            param_values = self._read_param_values(schedule.nodes, sess)
+        else:
+            param_values = {k if isinstance(k, str) else k.name: v
+                            for k, v in param_values.items()}
+        self._compile(schedule.nodes, param_values)
+        self._capacity = 0
+        self._buf = None
+        self._counts = None
+        self._row_offsets = None
+
+    @classmethod
+    def from_serialized(cls, data, dtype=None, params_file=None):
+        """Compile an SPN from the output of
+        :meth:`~libspn.serialize_graph`, taking parameter values from
+        ``data`` rather than from a session.
+
+        The learned parameters of :class:`~libspn.GaussianLeaf` nodes are not
+        stored by :meth:`~libspn.serialize_graph`, therefore SPNs containing
+        such leaves must be compiled from the graph, using a session.
+
+        Args:
+            data (dict): Serialized SPN graph, including parameter values.
+            dtype: NumPy data type of the computed values.
+            params_file (str): Path to the binary file with parameter values
+                referenced by ``data``. If ``None``, the path stored in
+                ``data`` is used.
+
+        Returns:
+            CompiledSPN: The compiled SPN.
+
+        Raises:
+            StructureError: If the SPN contains a :class:`~libspn.GaussianLeaf`.
+        """
+        if params_file is None:
+            params_file = data.get('params_file')
+        # The nodes are read twice
+        data = dict(data, nodes=list(data['nodes']))
+        # Reject nodes without serialized parameter values before building
+        # anything
+        leaf_type = utils.type2str(GaussianLeaf)
+        for d in data['nodes']:
+            if d['node_type'] == leaf_type:
+                raise StructureError(
+                    "%s: parameters of %s are not serialized, compile the SPN "
+                    "from the graph using a session instead"
+                    % (d['name'], leaf_type))
+        with tf.Graph().as_default():
+            nodes_by_name = {}
+            root = deserialize_graph(data, load_param_vals=False,
+                                     nodes_by_name=nodes_by_name)
+            param_values = {}
+            for d in data['nodes']:
+                value = d.get('value', None)
+                if value is None:
+                    continue
+                if _is_param_ref(value):
+                    if params_file is None:
+                        raise ValueError("params_file must be given to load "
+                                         "parameter values stored in a "
+                                         "binary file")
+                    value = np.array(_read_param(params_file, value))
+                param_values[nodes_by_name[d['name']].name] = value
+            return cls(root, param_values=param_values, dtype=dtype)
+
+    @property
+    def root_name(self):
+        """str: Name of the root node of the compiled SPN."""
+        return self._root_name
+
+    @property
+    def var_names(self):
+        """list of str: Names of the variable nodes that must be fed."""
+        return [k.name for k in self._var_kernels]
+
+    @property
+    def out_size(self):
+        """int: Size of the output of the root node."""
+        return len(self._root_cols)
+
+    @property
+    def dtype(self):
+        """numpy.dtype: Data type of the computed values."""
+        return self._dtype
+
+    def log_value(self, feed, inference_type=None, out=None):
+        """Compute the log value of the root of the SPN.
+
+        Args:
+            feed: A dictionary mapping variable nodes (or their names) to
+                arrays of shape ``[batch, num_vars]``. If the SPN contains a
+                single variable node, the array can be given directly. Lack
+                of evidence is marked with negative values for
+                :class:`~libspn.IVs` and with ``NaN`` for
+                :class:`~libspn.GaussianLeaf`.
+            inference_type (InferenceType): Type of inference used for sum
+                nodes. If ``None``, the ``inference_type`` flag of each node
+                at compile time is used.
+            out (numpy.ndarray): Optional. Array of shape ``[batch, out_size]``
+                to store the result in.
+
+        Returns:
+            numpy.ndarray: Log value of shape ``[batch, out_size]``.
+        """
+        batch_size = self._compute_values(feed, inference_type)
+        return np.take(self._buf[:batch_size], self._root_cols, axis=1,
+                       out=out, mode='clip')
+
+    def mpe_state(self, feed, *var_nodes, inference_type=None):
+        """Compute the MPE state of variables of the SPN. Mirrors
+        :class:`~libspn.MPEState` with log values.
+
+        Args:
+            feed: Values of the variables, see :meth:`log_value`.
+            *var_nodes (VarNode): Variable nodes (or their names) for which
+                the state should be computed. If not given, states of all
+                variable nodes are returned in the order of :obj:`var_names`.
+            inference_type (InferenceType): Type of inference used for sum
+                nodes during the upwards pass, see :meth:`log_value`.
+
+        Returns:
+            tuple of numpy.ndarray: The MPE states of the variable nodes.
+        """
+        kernels = {k.name: k for k in self._var_kernels}
+        try:
+            var_kernels = [kernels[v if isinstance(v, str) else v.name]
+                           for v in var_nodes] or self._var_kernels
+        except KeyError as e:
+            raise StructureError("%s is not a variable of the compiled SPN"
+                                 % e.args[0])
+        batch_size = self._compute_values(feed, inference_type)
+        buf = self._buf[:batch_size]
+        counts = self._counts[:batch_size]
+        counts_flat = counts.reshape(-1)
+        counts.fill(0)
+        np.add.at(counts_flat, self._row_offsets[:batch_size] + self._root_cols, 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for k in reversed(self._op_kernels):
+                k.backward(buf, counts, counts_flat)
+        return tuple(k.state(counts) for k in var_kernels)
+
+    def _compute_values(self, feed, inference_type):
+        """Run all kernels for the given feed and return the batch size."""
+        if not isinstance(feed, dict):
+            if len(self._var_kernels) != 1:
+                raise ValueError("A feed dictionary is required for SPNs with "
+                                 "multiple variable nodes")
+            feed = {self._var_kernels[0].name: feed}
+        feed = {k if isinstance(k, str) else k.name: v for k, v in feed.items()}
+        inputs = []
+        for k in self._var_kernels:
+            try:
+                x = np.asarray(feed[k.name])
+            except KeyError:
+                raise ValueError("No value fed for %s" % k.name)
+            if x.ndim != 2 or x.shape[1] != k.num_vars:
+                raise ValueError("Value fed for %s should be of shape "
+                                 "[batch, %s], got %s"
+                                 % (k.name, k.num_vars, x.shape))
+            if inputs and x.shape[0] != inputs[0].shape[0]:
+                raise ValueError("Values fed for %s and %s differ in batch "
+                                 "size" % (self._var_kernels[0].name, k.name))
+            inputs.append(x)
+        batch_size = inputs[0].shape[0]
+        self._reserve(batch_size)
+        marginal = (None if inference_type is None
+                    else inference_type == InferenceType.MARGINAL)
+        buf = self._buf[:batch_size]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for k, x in zip(self._var_kernels, inputs):
+                k.forward(buf, x)
+            for k in self._op_kernels:
+                k.forward(buf, marginal)
+        return batch_size
+
+    def _reserve(self, batch_size):
+        """Make sure the buffers can hold a batch of size ``batch_size``."""
+        if batch_size <= self._capacity:
+            return
+        self._capacity = batch_size
+        self._buf = np.empty((batch_size, self._num_cols), dtype=self._dtype)
+        self._buf[:, _ZERO_PROB_COL] = -np.inf
+        self._buf[:, _ONE_PROB_COL] = 0
+        self._counts = np.empty_like(self._buf)
+        self._row_offsets = np.arange(batch_size)[:, None] * self._num_cols
+        for k in chain(self._var_kernels, self._op_kernels):
+            k.allocate(batch_size, self._dtype, self._row_offsets)
+
+    def _read_param_values(self, nodes, sess):
+        """Retrieve the values of all parameters of the SPN in one run."""
+        fetches = {}
+        for node in nodes:
+            if isinstance(node, Weights):
+                fetches[node.name] = node.variable
+            elif isinstance(node, GaussianLeaf):
+                fetches[node.name] = (node._dist.loc, node._dist.scale)
+        if not fetches:
+            return {}
+        if sess is None:
+            sess = tf.get_default_session()
+        if sess is None:
+            raise ValueError("No session found to retrieve parameter values")
+        return sess.run(fetches)
+
+    def _compile(self, nodes, param_values):
+        """Lower the nodes, given in topological order, into kernels."""
+        def param(node):
+            try:
+                return param_values[node.name]
+            except KeyError:
+                raise StructureError("No parameter value for %s" % node)
+
+        def input_cols(inpt):
+            if not inpt:
+                return None
+            cols = node_cols[inpt.node]
+            return cols if inpt.indices is None else cols[inpt.indices]
+
+        node_cols = {}
+        self._var_kernels = []
+        self._op_kernels = []
+        self._num_cols = _NUM_CONST_COLS
+        for node in nodes:
+            if node.is_param:
+                continue
+            if isinstance(node, Concat):
+                node_cols[node] = np.concatenate(
+                    [input_cols(i) for i in node.inputs])
+                continue
+            if isinstance(node, IVs):
+                kernel = _IVsKernel(node.name, self._num_cols,
+                                    node.num_vars, node.num_vals)
+                self._var_kernels.append(kernel)
+            elif isinstance(node, ContVars):
+                kernel = _ContVarsKernel(node.name, self._num_cols, node.num_vars)
+                self._var_kernels.append(kernel)
+            elif isinstance(node, GaussianLeaf):
+                loc, scale = param(node)
+                kernel = _GaussianKernel(node.name, self._num_cols,
+                                         np.asarray(loc, dtype=self._dtype),
+                                         np.asarray(scale, dtype=self._dtype))
+                self._var_kernels.append(kernel)
+            elif isinstance(node, (BaseSum, Sums)):
+                kernel = self._lower_sums(node, param, input_cols)
+                self._op_kernels.append(kernel)
+            elif isinstance(node, (Product, Products, PermProducts, ProductsLayer)):
+                kernel = self._lower_products(node, input_cols)
+                self._op_kernels.append(kernel)
+            else:
+                raise StructureError("%s is not supported by %s"
+                                     % (node, type(self).__name__))
+            node_cols[node] = np.arange(kernel.start, kernel.stop)
+            self._num_cols = kernel.stop
+        self._root_cols = node_cols[nodes[-1]]
+
+    def _lower_sums(self, node, param, input_cols):
+        """Lower a node modeling sums into a :class:`_SumsKernel`."""
+        if not node.values:
+            raise StructureError("%s is missing input values" % node)
+        if not node.weights:
+            raise StructureError("%s is missing weights" % node)
+        if node.weights.indices is not None:
+            raise StructureError("%s: weights with indices are not supported"
+                                 % node)
+        value_cols = [input_cols(v) for v in node.values]
+        flat_cols = np.concatenate(value_cols)
+        num_sums = node.num_sums
+        if isinstance(node, Sums):
+            # Consecutive, equally sized blocks of values
+            sum_cols = flat_cols.reshape(num_sums, -1)
+        elif sum(node.sum_sizes) == flat_cols.size:
+            # Consecutive blocks of values, padded to the size of the largest
+            sum_cols = np.full((num_sums, max(node.sum_sizes)), _ZERO_PROB_COL)
+            for i, block in enumerate(
+                    np.split(flat_cols, np.cumsum(node.sum_sizes)[:-1])):
+                sum_cols[i, :block.size] = block
+        else:
+            # All values shared by each sum
+            sum_cols = np.tile(flat_cols, (num_sums, 1))
+        weights = np.asarray(param(node.weights.node), dtype=self._dtype)
+        log_weights = weights if node.weights.node.log else np.log(weights)
+        if log_weights.size != sum_cols.size:
+            raise StructureError("%s: number of weights %s does not match "
+                                 "number of values %s"
+                                 % (node, log_weights.size, sum_cols.size))
+        ivs_cols = input_cols(node.ivs)
+        if ivs_cols is not None and ivs_cols.size != sum_cols.size:
+            raise StructureError("%s: number of IVs %s does not match "
+                                 "number of values %s"
+                                 % (node, ivs_cols.size, sum_cols.size))
+        return _SumsKernel(node.name, self._num_cols, sum_cols,
+                           log_weights.reshape(sum_cols.shape), ivs_cols,
+                           node.inference_type == InferenceType.MARGINAL)
+
+    def _lower_products(self, node, input_cols):
+        """Lower a node modeling products into a :class:`_ProductsKernel`."""
+        if not node.values:
+            raise StructureError("%s is missing input values" % node)
+        value_cols = [input_cols(v) for v in node.values]
+        flat_cols = np.concatenate(value_cols)
+        if isinstance(node, Products):
+            prod_sizes = [flat_cols.size // node.num_prods] * node.num_prods
+        elif isinstance(node, PermProducts) and len(value_cols) > 1:
+            sizes = [c.size for c in value_cols]
+            flat_cols = flat_cols[node.permute_indices(sizes)]
+            prod_sizes = [len(value_cols)] * int(np.prod(sizes))
+        elif isinstance(node, ProductsLayer):
+            num_or_size_prods = node.num_or_size_prods
+            if isinstance(num_or_size_prods, int):
+                prod_sizes = [flat_cols.size // num_or_size_prods] * num_or_size_prods
+            else:
+                prod_sizes = list(num_or_size_prods)
+        else:
+            prod_sizes = [flat_cols.size]
+        if sum(prod_sizes) != flat_cols.size:
+            raise StructureError("%s: product sizes %s do not match number "
+                                 "of values %s"
+                                 % (node, prod_sizes, flat_cols.size))
+        return _ProductsKernel(node.name, self._num_cols, flat_cols, prod_sizes)
+
+    def __getstate__(self):
+        # Buffers are not pickled, but reallocated on first use
+        state = self.__dict__.copy()
+        state.update(_capacity=0, _buf=None, _counts=None, _row_offsets=None)
+        return state
+
+
+class _Kernel:
+    """Base of kernels computing the value of a node into the columns
+    ``[start, stop)`` of the value buffer.
+
+    Args:
+        name (str): Name of the compiled node.
+        start (int): First column of the output of the kernel.
+        out_size (int): Size of the output of the kernel.
+    """
+
+    def __init__(self, name, start, out_size):
+        self.name = name
+        self.start = start
+        self.stop = start + out_size
+        self._scratch = {}
+
+    def allocate(self, capacity, dtype, row_offsets):
+        """Allocate scratch buffers for batches of up to ``capacity``
+        samples. ``row_offsets`` holds the offset of each row in the
+        flattened value buffer."""
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_scratch'] = {}
+        return state
+
+
+class _IVsKernel(_Kernel):
+
+    def __init__(self, name, start, num_vars, num_vals):
+        super().__init__(name, start, num_vars * num_vals)
+        self.num_vars = num_vars
+        self._vals = np.arange(num_vals)
+
+    def allocate(self, capacity, dtype, row_offsets):
+        self._scratch = {
+            'ind': np.empty((capacity, self.num_vars, self._vals.size), dtype=bool),
+            'neg': np.empty((capacity, self.num_vars), dtype=bool)}
+
+    def forward(self, buf, x):
+        n = x.shape[0]
+        ind = self._scratch['ind'][:n]
+        neg = self._scratch['neg'][:n]
+        np.equal(x[:, :, None], self._vals, out=ind)
+        # Negative values mark lack of evidence and set all indicators
+        np.less(x, 0, out=neg)
+        ind |= neg[:, :, None]
+        out = buf[:, self.start:self.stop].reshape(ind.shape)
+        out.fill(-np.inf)
+        np.copyto(out, 0, where=ind)
+
+    def state(self, counts):
+        return np.argmax(
+            counts[:, self.start:self.stop].reshape(-1, self.num_vars, self._vals.size),
+            axis=2)
+
+
+class _ContVarsKernel(_Kernel):
+
+    def __init__(self, name, start, num_vars):
+        super().__init__(name, start, num_vars)
+        self.num_vars = num_vars
+
+    def forward(self, buf, x):
+        np.log(x, out=buf[:, self.start:self.stop])
+
+    def state(self, counts):
+        return counts[:, self.start:self.stop].copy()
+
+
+class _GaussianKernel(_Kernel):
+
+    def __init__(self, name, start, loc, scale):
+        super().__init__(name, start, loc.size)
+        self.num_vars, self._num_components = loc.shape
+        self._loc = loc
+        self._inv_scale = 1 / scale
+        self._log_norm = -np.log(scale) - 0.5 * np.log(2 * np.pi).astype(loc.dtype)
+
+    def allocate(self, capacity, dtype, row_offsets):
+        self._scratch = {'nan': np.empty((capacity, self.num_vars), dtype=bool)}
+
+    def forward(self, buf, x):
+        n = x.shape[0]
+        out = buf[:, self.start:self.stop].reshape(n, self.num_vars, -1)
+        np.subtract(x[:, :, None], self._loc, out=out)
+        out *= self._inv_scale
+        np.square(out, out=out)
+        out *= -0.5
+        out += self._log_norm
+        # NaN values mark lack of evidence
+        nan = self._scratch['nan'][:n]
+        np.isnan(x, out=nan)
+        np.copyto(out, 0, where=nan[:, :, None])
+
+    def state(self, counts):
+        components = np.argmax(
+            counts[:, self.start:self.stop].reshape(
+                -1, self.num_vars, self._num_components), axis=2)
+        return self._loc[np.arange(self.num_vars), components]
+
+
+class _SumsKernel(_Kernel):
+    """Computes ``num_sums`` weighted sums, each over a row of ``sum_cols``,
+    a matrix of value buffer columns of shape ``[num_sums, max_sum_size]``."""
+
+    def __init__(self, name, start, sum_cols, log_weights, ivs_cols, marginal):
+        num_sums, self._max_sum_size = sum_cols.shape
+        super().__init__(name, start, num_sums)
+        self._sum_cols = sum_cols.ravel()
+        self._ivs_cols = ivs_cols
+        self._log_weights = log_weights.ravel()
+        self._marginal = marginal
+        self._sum_offsets = np.arange(num_sums) * self._max_sum_size
+
+    def allocate(self, capacity, dtype, row_offsets):
+        num_sums = self.stop - self.start
+        self._scratch = {
+            'reducible': np.empty((capacity, self._sum_cols.size), dtype=dtype),
+            'ivs': (np.empty((capacity, self._ivs_cols.size), dtype=dtype)
+                    if self._ivs_cols is not None else None),
+            'max': np.empty((capacity, num_sums), dtype=dtype),
+            'sum': np.empty((capacity, num_sums), dtype=dtype),
+            'argmax': np.empty((capacity, num_sums), dtype=np.intp),
+            'index': np.empty((capacity, num_sums), dtype=np.intp),
+            'row_offsets': row_offsets,
+            'min': np.finfo(dtype).min}
+
+    def _reducible(self, buf):
+        """Gather weighted values of shape ``[batch, num_sums, max_sum_size]``."""
+        n = buf.shape[0]
+        reducible = self._scratch['reducible'][:n]
+        np.take(buf, self._sum_cols, axis=1, out=reducible, mode='clip')
+        if self._ivs_cols is not None:
+            ivs = self._scratch['ivs'][:n]
+            np.take(buf, self._ivs_cols, axis=1, out=ivs, mode='clip')
+            reducible += ivs
+        reducible += self._log_weights
+        return reducible.reshape(n, -1, self._max_sum_size)
+
+    def forward(self, buf, marginal):
+        reducible = self._reducible(buf)
+        out = buf[:, self.start:self.stop]
+        if marginal is None:
+            marginal = self._marginal
+        if not marginal:
+            np.max(reducible, axis=2, out=out)
+            return
+        # log-sum-exp, guarding against sums of zero probability
+        n = buf.shape[0]
+        max_val = self._scratch['max'][:n]
+        sum_val = self._scratch['sum'][:n]
+        np.max(reducible, axis=2, out=max_val)
+        np.maximum(max_val, self._scratch['min'], out=max_val)
+        reducible -= max_val[:, :, None]
+        np.exp(reducible, out=reducible)
+        np.sum(reducible, axis=2, out=sum_val)
+        np.log(sum_val, out=sum_val)
+        np.add(sum_val, max_val, out=out)
+
+    def backward(self, buf, counts, counts_flat):
+        n = buf.shape[0]
+        argmax = self._scratch['argmax'][:n]
+        index = self._scratch['index'][:n]
+        row_offsets = self._scratch['row_offsets'][:n]
+        np.argmax(self._reducible(buf), axis=2, out=argmax)
+        argmax += self._sum_offsets
+        sum_counts = counts[:, self.start:self.stop]
+        for cols in (self._sum_cols, self._ivs_cols):
+            if cols is not None:
+                np.take(cols, argmax, out=index, mode='clip')
+                index += row_offsets
+                np.add.at(counts_flat, index, sum_counts)
+
+
+class _ProductsKernel(_Kernel):
+    """Computes products over consecutive groups of value buffer columns
+    ``prod_cols`` of sizes ``prod_sizes``."""
+
+    def __init__(self, name, start, prod_cols, prod_sizes):
+        super().__init__(name, start, len(prod_sizes))
+        self._prod_cols = prod_cols
+        self._prod_starts = np.cumsum([0] + prod_sizes[:-1])
+        self._prod_out_cols = start + np.repeat(np.arange(len(prod_sizes)), prod_sizes)
+
+    def allocate(self, capacity, dtype, row_offsets):
+        self._scratch = {
+            'gathered': np.empty((capacity, self._prod_cols.size), dtype=dtype),
+            'index': row_offsets + self._prod_cols}
+
+    def forward(self, buf, marginal):
+        gathered = self._scratch['gathered'][:buf.shape[0]]
+        np.take(buf, self._prod_cols, axis=1, out=gathered, mode='clip')
+        np.add.reduceat(gathered, self._prod_starts, axis=1,
+                        out=buf[:, self.start:self.stop])
+
+    def backward(self, buf, counts, counts_flat):
+        n = buf.shape[0]
+        gathered = self._scratch['gathered'][:n]
+        np.take(counts, self._prod_out_cols, axis=1, out=gathered, mode='clip')
+        np.add.at(counts_flat, self._scratch['index'][:n], gathered)
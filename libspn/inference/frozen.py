@@ -0,0 +1,196 @@
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+"""Export of SPN inference into self-contained frozen TF graphs."""
+
+import json
+import os
+import numpy as np
+import tensorflow as tf
+from libspn.inference.mpe_state import MPEState
+# Registers the custom ops, which exported graphs may contain
+from libspn.ops import ops  # noqa: F401
+
+FORMAT_NAME = "libspn-frozen"
+FORMAT_VERSION = 1
+
+SIGNATURE_NAME = "signature"
+"""Name of the constant storing the signature of an exported graph."""
+
+_IMPORT_SCOPE = "spn"
+"""Name scope of the frozen SPN operations in an exported graph."""
+
+
+def export_frozen_graph(root, path, var_nodes=None, sess=None,
+                        inference_type=None):
+    """Export operations computing the log value and the MPE state of the SPN
+    rooted in ``root`` into a frozen TF ``GraphDef`` file, which can be loaded
+    using :class:`FrozenSPN`.
+
+    The values of all parameters are folded into the graph as constants and
+    only the operations needed for the inference are kept, so the exported
+    graph is self-contained. The names of the input and output tensors are
+    stored in the graph as well.
+
+    Args:
+        root (Node): Root of the SPN to export.
+        path (str): Path to the file.
+        var_nodes (list of VarNode): Variable nodes fed in the exported graph,
+            through their placeholders. If ``None``, all variable nodes of the
+            SPN are used.
+        sess (Session): Session used to retrieve parameter values. If
+            ``None``, the default session is used. The TF variables of
+            parameter nodes must already be initialized.
+        inference_type (InferenceType): Type of inference used for sum nodes.
+            If ``None``, the ``inference_type`` flag of each node is used.
+    """
+    if var_nodes is None:
+        var_nodes = [n for n in root.get_schedule().nodes if n.is_var]
+    if sess is None:
+        sess = tf.get_default_session()
+    if sess is None:
+        raise ValueError("No session found to retrieve parameter values")
+
+    # Assemble inference in the graph of the SPN and freeze it
+    with root.tf_graph.as_default():
+        log_value = root.get_log_value(inference_type=inference_type)
+        mpe_state = MPEState(value_inference_type=inference_type).get_state(
+            root, *var_nodes)
+    outputs = [log_value] + list(mpe_state)
+    frozen = tf.graph_util.convert_variables_to_constants(
+        sess, root.tf_graph.as_graph_def(),
+        list(set(t.op.name for t in outputs)))
+
+    # Name the outputs and store the signature in a separate graph
+    inputs = [n.feed for n in var_nodes]
+    with tf.Graph().as_default() as graph:
+        imported = tf.import_graph_def(
+            frozen, return_elements=[t.name for t in inputs + outputs],
+            name=_IMPORT_SCOPE)
+        imported_inputs = imported[:len(inputs)]
+        imported_outputs = imported[len(inputs):]
+        log_value = tf.identity(imported_outputs[0], name="log_value")
+        mpe_state = [tf.identity(t, name="mpe_state_%d" % i)
+                     for i, t in enumerate(imported_outputs[1:])]
+        signature = {
+            'format': FORMAT_NAME,
+            'version': FORMAT_VERSION,
+            'root': root.name,
+            'var_names': [n.name for n in var_nodes],
+            'inputs': [t.name for t in imported_inputs],
+            'log_value': log_value.name,
+            'mpe_state': [t.name for t in mpe_state]}
+        tf.constant(json.dumps(signature), name=SIGNATURE_NAME)
+
+    with open(os.path.expanduser(path), 'wb') as f:
+        f.write(graph.as_graph_def().SerializeToString())
+
+
+class FrozenSPN:
+    """An SPN inference graph loaded from a file written by
+    :func:`export_frozen_graph`.
+
+    The frozen graph is imported into its own TF graph and run in its own
+    session, without creating any SPN nodes or variables, which makes loading
+    much faster than rebuilding the SPN using :class:`~libspn.JSONLoader`.
+    The libspn custom ops used in the graph are registered on import of this
+    module.
+
+    Args:
+        path (str): Path to the file.
+        config (ConfigProto): Optional. Configuration of the session.
+    """
+
+    def __init__(self, path, config=None):
+        graph_def = tf.GraphDef()
+        with open(os.path.expanduser(path), 'rb') as f:
+            graph_def.ParseFromString(f.read())
+        signature = None
+        for node in graph_def.node:
+            if node.name == SIGNATURE_NAME:
+                signature = json.loads(
+                    node.attr['value'].tensor.string_val[0].decode('utf-8'))
+                break
+        if signature is None or signature.get('format') != FORMAT_NAME:
+            raise ValueError("'%s' is not an exported SPN graph" % path)
+        if signature.get('version') != FORMAT_VERSION:
+            raise ValueError("Unsupported exported SPN graph version %s"
+                             % signature.get('version'))
+        self._root_name = signature['root']
+        self._var_names = signature['var_names']
+        self._graph = tf.Graph()
+        with self._graph.as_default():
+            tf.import_graph_def(graph_def, name="")
+        get = self._graph.get_tensor_by_name
+        self._inputs = [get(n) for n in signature['inputs']]
+        self._log_value = get(signature['log_value'])
+        self._mpe_state = [get(n) for n in signature['mpe_state']]
+        self._sess = tf.Session(graph=self._graph, config=config)
+
+    @property
+    def root_name(self):
+        """str: Name of the root node of the exported SPN."""
+        return self._root_name
+
+    @property
+    def var_names(self):
+        """list of str: Names of the variable nodes that must be fed."""
+        return list(self._var_names)
+
+    @property
+    def graph(self):
+        """Graph: TF graph containing the imported inference."""
+        return self._graph
+
+    def log_value(self, feed):
+        """Compute the log value of the root of the SPN.
+
+        Args:
+            feed: A dictionary mapping variable node names to arrays of shape
+                ``[batch, num_vars]``. If the SPN contains a single variable
+                node, the array can be given directly.
+
+        Returns:
+            numpy.ndarray: Log value of shape ``[batch, out_size]``.
+        """
+        return self._sess.run(self._log_value, feed_dict=self._feed_dict(feed))
+
+    def mpe_state(self, feed, *var_names):
+        """Compute the MPE state of variables of the SPN.
+
+        Args:
+            feed: Values of the variables, see :meth:`log_value`.
+            *var_names (str): Names of variable nodes for which the state
+                should be computed. If not given, states of all variable nodes
+                are returned in the order of :obj:`var_names`.
+
+        Returns:
+            tuple of numpy.ndarray: The MPE states of the variable nodes.
+        """
+        for n in var_names:
+            if n not in self._var_names:
+                raise ValueError("%s is not a variable of the exported SPN" % n)
+        fetches = [self._mpe_state[self._var_names.index(n)]
+                   for n in var_names] or self._mpe_state
+        return tuple(self._sess.run(fetches, feed_dict=self._feed_dict(feed)))
+
+    def close(self):
+        """Close the session running the graph."""
+        self._sess.close()
+
+    def _feed_dict(self, feed):
+        """Map the values of variables in ``feed`` to the input tensors."""
+        if not isinstance(feed, dict):
+            if len(self._inputs) != 1:
+                raise ValueError("A feed dictionary is required for SPNs with "
+                                 "multiple variable nodes")
+            return {self._inputs[0]: np.asarray(feed)}
+        try:
+            return {t: np.asarray(feed[n])
+                    for n, t in zip(self._var_names, self._inputs)}
+        except KeyError as e:
+            raise ValueError("No value fed for %s" % e.args[0])
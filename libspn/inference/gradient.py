@@ -7,7 +7,7 @@
 
 from types import MappingProxyType
 import tensorflow as tf
-from libspn.inference.value import Value, LogValue
+from libspn.inference.value import Value, LogValue, check_unfolded
 from libspn.graph.algorithms import compute_graph_up_down
 
 
@@ -16,7 +16,8 @@ class Gradient:
     backpropagation, in a downward pass through the network.
 
     Args:
-        value (Value or LogValue): Pre-computed SPN values.
+        value (Value or LogValue): Pre-computed SPN values. Must not be
+            computed with marginalized variables.
         value_inference_type (InferenceType): The inference type used during the
             upwards pass through the SPN. Ignored if ``value`` is given.
         log (bool): If ``True``, calculate the value in the log space. Ignored
@@ -34,6 +35,7 @@ class Gradient:
             else:
                 self._value = Value(value_inference_type)
         else:
+            check_unfolded(value)
             self._value = value
             self._log = value.log()
 
@@ -75,7 +77,7 @@ class Gradient:
             self._true_gradients[node] = summed
             if node.is_op:
                 # Compute for inputs
-                with tf.name_scope(node.name):
+                with node.inference_scope():
                     if self._log:
                         return node._compute_log_gradient(
                             summed, *[self._value.values[i.node]
@@ -116,7 +118,7 @@ class Gradient:
             self._actual_gradients[node] = summed
             if node.is_op:
                 # Compute for inputs
-                with tf.name_scope(node.name):
+                with node.inference_scope():
                     if self._log:
                         return node._compute_log_gradient(
                             summed, *[self._value.values[i.node]
@@ -5,18 +5,240 @@
 # via any medium is strictly prohibited. Proprietary and confidential.
 # ------------------------------------------------------------------------
 
+from types import MappingProxyType
+import numpy as np
+import tensorflow as tf
+from libspn.inference.type import InferenceType
+from libspn.inference.value import LogValue
+from libspn.inference.gradient import Gradient
+from libspn.graph.ivs import IVs
+from libspn.graph.distribution import GaussianLeaf
+from libspn.exceptions import StructureError
+
 
 class MarginalInferencer():
-    """Performs marginal inference for latent variables."""
+    """Assembles TF operations computing posterior marginals of variables of
+    an SPN given the evidence.
+
+    The marginals of all variables are computed at once, in a single upward
+    and a single downward pass, from the gradients of the log value of the
+    root computed by :class:`~libspn.Gradient`. The gradient of the log value
+    with respect to the log value of an indicator is the probability of the
+    evidence with the indicator set, relative to the probability of the
+    evidence. Therefore, for every value of a :class:`~libspn.IVs` variable
+    (including latent variables of sum nodes) and every component of a
+    :class:`~libspn.GaussianLeaf` variable, it is the posterior probability
+    of that value or component. For observed variables, the posterior is
+    concentrated on the observed value.
+
+    The SPN must be valid and its root must have a single output.
+
+    Args:
+        gradient (Gradient): Pre-computed gradients. Must be computed in log
+            space, with marginal inference for all sum nodes.
+    """
+
+    def __init__(self, gradient=None):
+        # Create internal gradient generator
+        if gradient is None:
+            self._gradient = Gradient(
+                value_inference_type=InferenceType.MARGINAL, log=True)
+        else:
+            self._gradient = gradient
+        self._marginals = {}
+
+    @property
+    def gradient(self):
+        """Gradient: Computed SPN gradients."""
+        return self._gradient
+
+    @property
+    def marginals(self):
+        """dict: Dictionary indexed by variable node, where each value is a
+        tensor computing the posterior marginals of the node."""
+        return MappingProxyType(self._marginals)
+
+    def infer(self, root, *var_nodes):
+        """Assemble TF operations computing the posterior marginals of the
+        given SPN variables for the SPN rooted in ``root``.
+
+        Args:
+            root (Node): The root node of the SPN graph.
+            *var_nodes (IVs or GaussianLeaf): Variable nodes for which the
+                marginals should be computed. If not given, the marginals of
+                all ``IVs`` and ``GaussianLeaf`` nodes in the SPN are computed,
+                in the order in which the nodes appear in the schedule of the
+                graph.
+
+        Returns:
+            tuple of Tensor: Tensors containing the marginals for the
+            variable nodes, each of shape ``[batch, num_vars, num_vals]`` for
+            ``IVs`` and ``[batch, num_vars, num_components]`` for
+            ``GaussianLeaf``.
+        """
+        if not var_nodes:
+            var_nodes = [n for n in root.get_schedule().nodes
+                         if isinstance(n, (IVs, GaussianLeaf))]
+
+        # Generate gradients if not yet generated
+        if not self._gradient.gradients:
+            self._gradient.get_gradients(root)
+
+        with tf.name_scope("Marginals"):
+            for var_node in var_nodes:
+                if var_node in self._marginals:
+                    continue
+                if isinstance(var_node, IVs):
+                    num_vals = var_node.num_vals
+                elif isinstance(var_node, GaussianLeaf):
+                    num_vals = var_node.num_components
+                else:
+                    raise StructureError("%s is not an IVs or GaussianLeaf "
+                                         "node" % var_node)
+                try:
+                    gradient = self._gradient.gradients[var_node]
+                except KeyError:
+                    raise StructureError("%s is not in the SPN rooted in %s"
+                                         % (var_node, root))
+                gradient = tf.reshape(
+                    gradient, [-1, var_node.num_vars, num_vals])
+                # Normalize to remove numerical errors of the downward pass
+                self._marginals[var_node] = gradient / tf.reduce_sum(
+                    gradient, axis=-1, keepdims=True)
+        return tuple(self._marginals[var_node] for var_node in var_nodes)
+
 
-    def __init__(self):
-        pass
+class MarginalQueries():
+    """Assembles TF operations answering many marginal queries about a single
+    row of evidence in one run.
 
-    def infer(self, root):
+    Each query marginalizes a different subset of the variables. The queries
+    are given by a boolean matrix of marginalization masks fed to
+    :attr:`masks`, of shape ``[num_queries, num_vars]``, where ``num_vars`` is
+    the total number of variables of the given nodes, in the order of the
+    nodes. The row of evidence is fed to :attr:`evidence` and expanded into a
+    batch of evidence with one row per query inside the TF graph. Marginalized
+    variables of :class:`~libspn.IVs` nodes are set to ``-1``, while for
+    :class:`~libspn.GaussianLeaf` nodes, their evidence indicators are
+    cleared.
+
+    If ``attach`` is ``True``, the constructor attaches the expanded evidence
+    as the feeds (and evidence indicators) of the variable nodes, which
+    therefore must not be fed directly, and must be created before any
+    operations computing values of the SPN. Otherwise, the variable nodes are
+    not modified and the expanded evidence is available in :attr:`feeds` and
+    :attr:`evidence_indicators`, e.g. to be attached to the variables of a
+    separate copy of the SPN. All variable nodes of the SPN must be given.
+
+    Args:
+        *var_nodes (IVs or GaussianLeaf): Variable nodes of the SPN.
+        value (Value or LogValue): Value generator computing the answers. If
+            ``None``, log values are computed with marginal inference.
+        attach (bool): If ``True``, attach the expanded evidence to the
+            variable nodes.
+    """
+
+    def __init__(self, *var_nodes, value=None, attach=True):
+        for node in var_nodes:
+            if not isinstance(node, (IVs, GaussianLeaf)):
+                raise StructureError("%s is not an IVs or GaussianLeaf "
+                                     "node" % node)
+        if value is None:
+            self._value = LogValue(InferenceType.MARGINAL)
+        else:
+            self._value = value
+        self._evidence = {}
+        self._feeds = {}
+        self._evidence_indicators = {}
+        with tf.name_scope("MarginalQueries"):
+            self._masks = tf.placeholder(
+                tf.bool, [None, sum(n.num_vars for n in var_nodes)],
+                name="Masks")
+            num_queries = tf.shape(self._masks)[0]
+            offset = 0
+            for node in var_nodes:
+                row = tf.placeholder(node.feed.dtype, [1, node.num_vars],
+                                     name=node.name + "_Evidence")
+                mask = self._masks[:, offset:offset + node.num_vars]
+                offset += node.num_vars
+                feed = tf.tile(row, [num_queries, 1])
+                if isinstance(node, IVs):
+                    self._feeds[node] = tf.where(mask, -tf.ones_like(feed), feed)
+                else:
+                    self._feeds[node] = feed
+                    self._evidence_indicators[node] = tf.logical_not(mask)
+                self._evidence[node] = row
+        if attach:
+            self.attach()
+
+    def attach(self):
+        """Attach the expanded evidence as the feeds (and evidence indicators)
+        of the variable nodes."""
+        for node, feed in self._feeds.items():
+            node.attach_feed(feed)
+        for node, indicator in self._evidence_indicators.items():
+            node.attach_evidence_indicator(indicator)
+
+    @property
+    def value(self):
+        """Value or LogValue: Computed SPN values."""
+        return self._value
+
+    @property
+    def evidence(self):
+        """dict: Dictionary indexed by variable node, where each value is a
+        placeholder of shape ``[1, num_vars]`` fed with the row of evidence
+        for the node."""
+        return MappingProxyType(self._evidence)
+
+    @property
+    def feeds(self):
+        """dict: Dictionary indexed by variable node, where each value is a
+        tensor with the expanded evidence for the node, with one row per
+        query."""
+        return MappingProxyType(self._feeds)
+
+    @property
+    def evidence_indicators(self):
+        """dict: Dictionary indexed by ``GaussianLeaf`` node, where each value
+        is a tensor with the expanded evidence indicators for the node, with
+        one row per query."""
+        return MappingProxyType(self._evidence_indicators)
+
+    @property
+    def masks(self):
+        """Tensor: Placeholder of shape ``[num_queries, num_vars]`` fed with
+        the marginalization masks of the queries, ``True`` for marginalized
+        variables."""
+        return self._masks
+
+    def feed_dict(self, evidence, masks):
+        """Create a feed dictionary for a row of evidence and queries.
+
+        Args:
+            evidence (dict): Dictionary indexed by variable node, where each
+                value is an array of shape ``[num_vars]`` or
+                ``[1, num_vars]`` with the evidence for the node.
+            masks (array): Marginalization masks of the queries.
+
+        Returns:
+            dict: Feed dictionary for a TF session.
         """
-        Run the inference.
+        feed = {self._evidence[node]: np.reshape(row, [1, node.num_vars])
+                for node, row in evidence.items()}
+        feed[self._masks] = masks
+        return feed
+
+    def get_value(self, root):
+        """Assemble TF operations answering the queries for the SPN rooted in
+        ``root``.
 
         Args:
-            root: Root of the SPN
+            root (Node): The root node of the SPN graph.
+
+        Returns:
+            Tensor: A tensor of shape ``[num_queries]`` containing the value
+            (or log value) of the SPN for each query.
         """
-        pass
+        with tf.name_scope("MarginalQueries"):
+            return tf.reshape(self._value.get_value(root), [-1])
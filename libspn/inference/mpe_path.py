@@ -7,7 +7,7 @@
 
 from types import MappingProxyType
 import tensorflow as tf
-from libspn.inference.value import Value, LogValue
+from libspn.inference.value import Value, LogValue, check_unfolded
 from libspn.graph.algorithms import compute_graph_up_down
 
 
@@ -18,7 +18,8 @@ class MPEPath:
     variables in the model.
 
     Args:
-        value (Value or LogValue): Pre-computed SPN values.
+        value (Value or LogValue): Pre-computed SPN values. Must not be
+            computed with marginalized variables.
         value_inference_type (InferenceType): The inference type used during the
             upwards pass through the SPN. Ignored if ``value`` is given.
         log (bool): If ``True``, calculate the value in the log space. Ignored
@@ -39,6 +40,7 @@ class MPEPath:
             else:
                 self._value = Value(value_inference_type)
         else:
+            check_unfolded(value)
             self._value = value
             self._log = value.log()
 
@@ -65,58 +67,37 @@ class MPEPath:
     def log(self):
         return self._log
 
-    def get_mpe_path(self, root):
+    def get_mpe_path(self, root, counts_fun=None):
         """Assemble TF operations computing the true branch counts for the MPE
         downward path through the SPN rooted in ``root``.
 
+        If the SPN values were not yet computed, the operations computing them
+        are assembled in the same pass.
+
         Args:
             root (Node): The root node of the SPN graph.
+            counts_fun (function): Optional. A function ``counts_fun(node,
+                counts)`` called for each node as soon as the tensor ``counts``
+                with its branch counts is assembled, e.g. to assemble
+                operations consuming the counts in the same pass.
         """
-        def down_fun(node, parent_vals):
-            # Sum up all parent vals
-            parent_vals = [pv for pv in parent_vals if pv is not None]
-            if len(parent_vals) > 1:
-                summed = tf.add_n(parent_vals, name=node.name + "_add")
-            else:
-                summed = parent_vals[0]
-            self._true_counts[node] = summed
-            if node.is_op:
-                # Compute for inputs
-                with tf.name_scope(node.name):
-                    if self._log:
-                        return node._compute_log_mpe_path(
-                            summed, *[self._value.values[i.node]
-                                      if i else None
-                                      for i in node.inputs],
-                            add_random=self._add_random,
-                            use_unweighted=self._use_unweighted)
-                    else:
-                        return node._compute_mpe_path(
-                            summed, *[self._value.values[i.node]
-                                      if i else None
-                                      for i in node.inputs],
-                            add_random=self._add_random,
-                            use_unweighted=self._use_unweighted)
-
-        # Generate values if not yet generated
-        if not self._value.values:
-            self._value.get_value(root)
-
-        with tf.name_scope("TrueMPEPath"):
-            # Compute the tensor to feed to the root node
-            graph_input = tf.ones_like(self._value.values[root])
-
-            # Traverse the graph computing counts
-            self._true_counts = {}
-            compute_graph_up_down(root, down_fun=down_fun, graph_input=graph_input)
+        self._true_counts = {}
+        self._compute_mpe_path(root, self._true_counts, counts_fun, "TrueMPEPath")
 
-    def get_mpe_path_actual(self, root):
+    def get_mpe_path_actual(self, root, counts_fun=None):
         """Assemble TF operations computing the actual branch counts for the MPE
         downward path through the SPN rooted in ``root``.
 
         Args:
             root (Node): The root node of the SPN graph.
+            counts_fun (function): Optional. See :meth:`get_mpe_path`.
         """
+        self._actual_counts = {}
+        self._compute_mpe_path(root, self._actual_counts, counts_fun, "ActualMPEPath")
+
+    def _compute_mpe_path(self, root, counts, counts_fun, name):
+        """Assemble the operations computing the branch counts, and the values
+        if not yet computed, in a single pass over the graph."""
         def down_fun(node, parent_vals):
             # Sum up all parent vals
             parent_vals = [pv for pv in parent_vals if pv is not None]
@@ -124,32 +105,37 @@ class MPEPath:
                 summed = tf.add_n(parent_vals, name=node.name + "_add")
             else:
                 summed = parent_vals[0]
-            self._actual_counts[node] = summed
+            counts[node] = summed
+            if counts_fun is not None:
+                counts_fun(node, summed)
             if node.is_op:
                 # Compute for inputs
-                with tf.name_scope(node.name):
+                with node.inference_scope():
+                    input_vals = [values[i.node] if i else None
+                                  for i in node.inputs]
                     if self._log:
                         return node._compute_log_mpe_path(
-                            summed, *[self._value.values[i.node]
-                                      if i else None
-                                      for i in node.inputs],
+                            summed, *input_vals,
                             add_random=self._add_random,
                             use_unweighted=self._use_unweighted)
                     else:
                         return node._compute_mpe_path(
-                            summed, *[self._value.values[i.node]
-                                      if i else None
-                                      for i in node.inputs],
+                            summed, *input_vals,
                             add_random=self._add_random,
                             use_unweighted=self._use_unweighted)
 
-        # Generate values if not yet generated
+        # Generate values if not yet generated, during the same traversal
+        up_fun = None
+        up_values = None
         if not self._value.values:
-            self._value.get_value(root)
-
-        with tf.name_scope("ActualMPEPath"):
-            graph_input = tf.ones_like(self._value.values[root])
-
-            # Traverse the graph computing counts
-            self._actual_counts = {}
-            compute_graph_up_down(root, down_fun=down_fun, graph_input=graph_input)
+            self._value.reset(root)
+            up_fun = self._value.add_node_value
+            # Values replaced by constants are not computed
+            up_values = dict(self._value.values)
+        values = self._value.values
+
+        # Traverse the graph computing counts, feeding ones to the root node
+        with tf.name_scope(name):
+            compute_graph_up_down(
+                root, down_fun=down_fun, up_fun=up_fun, up_values=up_values,
+                graph_input=lambda: tf.ones_like(values[root]))
@@ -5,8 +5,11 @@
 # via any medium is strictly prohibited. Proprietary and confidential.
 # ------------------------------------------------------------------------
 
+from types import MappingProxyType
 import tensorflow as tf
+from libspn.inference.type import InferenceType
 from libspn.inference.mpe_path import MPEPath
+from libspn.graph.algorithms import compute_graph_up_down
 
 
 class MPEState():
@@ -55,3 +58,170 @@ class MPEState():
             return tuple(var_node._compute_mpe_state(
                 self._mpe_path.counts[var_node])
                 for var_node in var_nodes)
+
+
+class TopKMPEState():
+    """Assembles TF operations computing approximate top-k MPE states for an
+    SPN, i.e. the ``k`` most probable explanations of each sample together
+    with their log scores.
+
+    The states are computed in a single upward pass and two downward passes,
+    independently of ``k``. The first downward pass computes the MPE path,
+    along which the difference between the log values of the best and the
+    second best input is computed for every sum. Each of the ``k - 1``
+    further explanations follows the MPE path, except for a single sum on it,
+    which chooses its second best input. A sum reached several times by the
+    MPE path deviates at all its occurrences, so its difference is scaled by
+    its MPE branch count. The sums with the smallest scaled differences are
+    selected, and the paths of all ``k`` explanations are computed at once in
+    the second downward pass, over a batch of ``k`` copies of each sample.
+    If every sum is reached at most once by the MPE path, which holds in
+    decomposable SPNs, the second explanation is the exact second most
+    probable explanation. The further explanations are the best ones
+    deviating from the MPE path at a single sum.
+
+    The root of the SPN must have a single output.
+
+    Args:
+        k (int): Number of explanations computed for each sample.
+        mpe_path (MPEPath): Pre-computed MPE path. Must be computed in log
+            space, with MPE inference for all sum nodes.
+    """
+
+    def __init__(self, k, mpe_path=None):
+        if k < 1:
+            raise ValueError("k must be a positive integer")
+        self._k = k
+        # Create internal MPE path generator
+        if mpe_path is None:
+            self._mpe_path = MPEPath(log=True,
+                                     value_inference_type=InferenceType.MPE)
+        else:
+            self._mpe_path = mpe_path
+        self._counts = {}
+        self._scores = None
+
+    @property
+    def k(self):
+        """int: Number of explanations computed for each sample."""
+        return self._k
+
+    @property
+    def mpe_path(self):
+        """MPEPath: Computed MPE path."""
+        return self._mpe_path
+
+    @property
+    def counts(self):
+        """dict: Dictionary indexed by node, where each value is a tensor
+        computing the branch counts of the paths of all explanations for the
+        node, of shape ``[batch * k, out_size]``."""
+        return MappingProxyType(self._counts)
+
+    def get_state(self, root, *var_nodes):
+        """Assemble TF operations computing the top-k MPE states of the given
+        SPN variables for the SPN rooted in ``root``.
+
+        Args:
+            root (Node): The root node of the SPN graph.
+            *var_nodes (VarNode): Variable nodes for which the states should
+                                  be computed.
+
+        Returns:
+            tuple: A tuple ``(states, scores)``, where ``states`` is a tuple of
+            tensors containing the states for the variable nodes, each of
+            shape ``[batch, k, num_vars]``, and ``scores`` is a tensor of shape
+            ``[batch, k]`` containing the log values of the SPN for the
+            explanations, in descending order. If there are fewer than ``k``
+            explanations, the remaining ones repeat the MPE state and have a
+            score of ``-inf``.
+        """
+        # Generate paths if not yet generated
+        if not self._counts:
+            self._compute_top_k_path(root)
+
+        with tf.name_scope("TopKMPEState"):
+            states = tuple(tf.reshape(
+                var_node._compute_mpe_state(self._counts[var_node]),
+                [-1, self._k, var_node.num_vars])
+                for var_node in var_nodes)
+            return states, self._scores
+
+    def _compute_top_k_path(self, root):
+        """Assemble the operations computing the branch counts of the paths
+        of all explanations and their scores."""
+        k = self._k
+
+        # Generate MPE path if not yet generated
+        if not self._mpe_path.counts:
+            self._mpe_path.get_mpe_path(root)
+        values = self._mpe_path.value.values
+        mpe_counts = self._mpe_path.counts
+        root_value = values[root]
+
+        def tile(value):
+            # Repeat each row k times, keeping the copies of a sample adjacent
+            return tf.reshape(tf.tile(value, [1, k]), [-1, value.shape[1].value])
+
+        def input_values(node, vals):
+            return [vals[i.node] if i else None for i in node.inputs]
+
+        with tf.name_scope("TopKMPEPath"):
+            # Gaps of the sums on the MPE path, scaled by the number of times
+            # the path reaches them, infinite for sums off the path
+            nodes = []
+            gaps = []
+            inf = tf.constant(float('inf'), dtype=root_value.dtype)
+            for node in root.get_schedule().nodes:
+                if not node.is_op:
+                    continue
+                with node.inference_scope():
+                    gap = node._compute_log_mpe_gaps(*input_values(node, values))
+                    if gap is not None:
+                        nodes.append(node)
+                        counts = mpe_counts[node]
+                        gaps.append(tf.where(
+                            counts > 0, gap * tf.cast(counts, gap.dtype),
+                            tf.fill(tf.shape(gap), inf)))
+
+            if k > 1:
+                # Pad with infinite gaps in case there are fewer than k - 1 sums
+                gaps.append(tf.fill([tf.shape(root_value)[0], k - 1], inf))
+                sizes = [node.get_out_size() for node in nodes] + [k - 1]
+                neg_gaps, positions = tf.nn.top_k(-tf.concat(gaps, axis=1), k=k - 1)
+                self._scores = tf.concat([root_value, root_value + neg_gaps], axis=1)
+                # Masks of the deviating sums of each explanation, the first
+                # explanation is the MPE one
+                deviate = tf.logical_and(
+                    tf.cast(tf.one_hot(positions, sum(sizes)), tf.bool),
+                    tf.expand_dims(tf.is_finite(neg_gaps), axis=2))
+                deviate = tf.concat([tf.zeros_like(deviate[:, :1]), deviate], axis=1)
+                deviate = tf.split(tf.reshape(deviate, [-1, sum(sizes)]), sizes, axis=1)
+                deviate = dict(zip(nodes, deviate))
+            else:
+                self._scores = root_value
+                deviate = {node: tf.zeros_like(mpe_counts[node], dtype=tf.bool)
+                           for node in nodes}
+
+            # Values of the k copies of each sample, parameters are shared
+            tiled = {node: value if node.is_param else tile(value)
+                     for node, value in values.items()}
+
+            def down_fun(node, parent_vals):
+                # Sum up all parent vals
+                parent_vals = [pv for pv in parent_vals if pv is not None]
+                if len(parent_vals) > 1:
+                    summed = tf.add_n(parent_vals, name=node.name + "_add")
+                else:
+                    summed = parent_vals[0]
+                self._counts[node] = summed
+                if node.is_op:
+                    # Compute for inputs
+                    with node.inference_scope():
+                        return node._compute_log_mpe_path_deviated(
+                            summed, deviate.get(node), *input_values(node, tiled))
+
+            # Traverse the graph computing counts
+            self._counts = {}
+            compute_graph_up_down(root, down_fun=down_fun,
+                                  graph_input=tf.ones_like(tiled[root]))
@@ -0,0 +1,89 @@
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+"""Batch inference sharded over a pool of worker processes."""
+
+import multiprocessing
+import os
+import numpy as np
+from libspn.inference.compiled import CompiledSPN
+
+# State of a worker process, set by _init_worker
+_worker_spn = None
+_worker_source = None
+
+
+def _init_worker(compiled, source):
+    global _worker_spn, _worker_source
+    _worker_spn = compiled
+    _worker_source = source
+
+
+def _shard_feed(source, start, stop):
+    if isinstance(source, dict):
+        return {k: v[start:stop] for k, v in source.items()}
+    return source[start:stop]
+
+
+def _log_value_shard(shard):
+    start, stop = shard
+    return start, _worker_spn.log_value(_shard_feed(_worker_source, start, stop))
+
+
+def batch_log_likelihood(root, source, num_workers=None, batch_size=1000,
+                         sess=None):
+    """Compute the log value of the SPN rooted in ``root`` for all samples in
+    ``source``, sharding the samples over a pool of worker processes.
+
+    The SPN is compiled into a :class:`~libspn.CompiledSPN`, so that workers
+    do not use TensorFlow. Each worker holds a read-only copy of the compiled
+    SPN and of ``source``, which are inherited without copying if processes
+    are forked, and computes the log values of a range of ``batch_size``
+    samples at a time.
+
+    Args:
+        root (Node or CompiledSPN): Root of the SPN or an already compiled SPN.
+        source: Values of the variables of the SPN. Either an array of shape
+            ``[num_samples, num_vars]`` if the SPN contains a single variable
+            node, or a dictionary mapping variable nodes (or their names) to
+            such arrays.
+        num_workers (int): Number of worker processes. If ``None``, the number
+            of CPUs is used. If ``1``, values are computed in this process.
+        batch_size (int): Number of samples processed by a worker at a time.
+        sess (Session): Session used to retrieve parameter values when
+            compiling ``root``. If ``None``, the default session is used.
+
+    Returns:
+        numpy.ndarray: Log values of shape ``[num_samples, out_size]``, in the
+        order of the samples in ``source``.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be a positive integer")
+    compiled = root if isinstance(root, CompiledSPN) else CompiledSPN(root, sess=sess)
+    if isinstance(source, dict):
+        source = {k if isinstance(k, str) else k.name: np.asarray(v)
+                  for k, v in source.items()}
+        num_samples = len(next(iter(source.values())))
+    else:
+        source = np.asarray(source)
+        num_samples = len(source)
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    shards = [(start, min(start + batch_size, num_samples))
+              for start in range(0, num_samples, batch_size)]
+    out = np.empty((num_samples, compiled.out_size), dtype=compiled.dtype)
+
+    if num_workers == 1 or len(shards) < 2:
+        for start, stop in shards:
+            compiled.log_value(_shard_feed(source, start, stop), out=out[start:stop])
+        return out
+
+    with multiprocessing.Pool(min(num_workers, len(shards)), initializer=_init_worker,
+                              initargs=(compiled, source)) as pool:
+        for start, value in pool.imap_unordered(_log_value_shard, shards):
+            out[start:start + len(value)] = value
+    return out
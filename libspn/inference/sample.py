@@ -0,0 +1,110 @@
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+from types import MappingProxyType
+import tensorflow as tf
+from libspn.inference.type import InferenceType
+from libspn.inference.value import LogValue, check_unfolded
+from libspn.graph.algorithms import compute_graph_up_down
+
+
+class Sample:
+    """Assembles TF operations drawing samples of the variables of an SPN by
+    ancestral sampling, conditioned on the evidence.
+
+    The samples are drawn in a downward pass through the SPN. Each sum node
+    draws one of its inputs, with probabilities proportional to the weighted
+    marginal values of the inputs given the evidence, using the Gumbel-max
+    trick. Product nodes pass the path to all their inputs. Finally, each
+    variable takes the value selected by the path, or for
+    :class:`~libspn.GaussianLeaf` nodes, a value drawn from the selected
+    component. Observed variables keep their values.
+
+    One sample is drawn for each row of the evidence fed to the variables, so
+    that many samples are drawn in a single run by feeding a batch of
+    repeated evidence, e.g. a batch of ``-1`` for unconditional samples of
+    :class:`~libspn.IVs`. Lack of evidence for ``GaussianLeaf`` nodes is
+    indicated by feeding :attr:`~libspn.GaussianLeaf.evidence`.
+
+    The root of the SPN must have a single output.
+
+    Args:
+        value (LogValue): Pre-computed SPN log values. Must be computed with
+            marginal inference for all sum nodes and without marginalized
+            variables.
+    """
+
+    def __init__(self, value=None):
+        self._counts = {}
+        # Create internal value generator
+        if value is None:
+            self._value = LogValue(InferenceType.MARGINAL)
+        else:
+            check_unfolded(value)
+            self._value = value
+
+    @property
+    def value(self):
+        """LogValue: Computed SPN log values."""
+        return self._value
+
+    @property
+    def counts(self):
+        """dict: Dictionary indexed by node, where each value is a tensor
+        computing the branch counts of the sampled paths for the node."""
+        return MappingProxyType(self._counts)
+
+    def get_sample(self, root, *var_nodes):
+        """Assemble TF operations drawing samples of the given SPN variables
+        for the SPN rooted in ``root``.
+
+        Args:
+            root (Node): The root node of the SPN graph.
+            *var_nodes (VarNode): Variable nodes for which the samples should
+                                  be drawn.
+
+        Returns:
+            tuple of Tensor: Tensors containing the samples for the variable
+            nodes, each of shape ``[batch, num_vars]``.
+        """
+        # Sample path if not yet sampled
+        if not self._counts:
+            self._compute_sample_path(root)
+
+        with tf.name_scope("Sample"):
+            return tuple(var_node._compute_sample(self._counts[var_node])
+                         for var_node in var_nodes)
+
+    def _compute_sample_path(self, root):
+        """Assemble the operations computing the branch counts of the sampled
+        paths."""
+        def down_fun(node, parent_vals):
+            # Sum up all parent vals
+            parent_vals = [pv for pv in parent_vals if pv is not None]
+            if len(parent_vals) > 1:
+                summed = tf.add_n(parent_vals, name=node.name + "_add")
+            else:
+                summed = parent_vals[0]
+            self._counts[node] = summed
+            if node.is_op:
+                # Compute for inputs
+                with node.inference_scope():
+                    return node._compute_log_sample_path(
+                        summed, *[self._value.values[i.node] if i else None
+                                  for i in node.inputs])
+
+        # Generate values if not yet generated
+        if not self._value.values:
+            self._value.get_value(root)
+
+        with tf.name_scope("SamplePath"):
+            # Compute the tensor to feed to the root node
+            graph_input = tf.ones_like(self._value.values[root])
+
+            # Traverse the graph computing counts
+            self._counts = {}
+            compute_graph_up_down(root, down_fun=down_fun, graph_input=graph_input)
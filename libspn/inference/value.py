@@ -6,8 +6,11 @@
 # ------------------------------------------------------------------------
 
 import tensorflow as tf
+from itertools import chain
 from types import MappingProxyType
+from libspn import conf
 from libspn.graph.algorithms import compute_graph_up
+from libspn.graph.scope import Scope
 from libspn.inference.type import InferenceType
 
 
@@ -22,10 +25,19 @@ class Value:
             by the ``inference_type`` flag of the node. If set to ``MARGINAL``,
             marginal inference will be used for all nodes. If set to ``MPE``,
             MPE inference will be used for all nodes.
+        marginalized (iterable): Variables marginalized in all evaluated
+            queries, given as variable nodes (all variables of the node) or
+            pairs ``(node, var_id)``. The values of nodes with only these
+            variables in the scopes of all outputs are replaced by constants,
+            if computed with marginal inference. This assumes normalized
+            weights. The values of nodes below them are not computed, so such
+            values cannot be used by the downward passes of :class:`MPEPath`,
+            :class:`Gradient` or :class:`Sample`.
     """
 
-    def __init__(self, inference_type=None):
+    def __init__(self, inference_type=None, marginalized=None):
         self._inference_type = inference_type
+        self._marginalized = tuple(marginalized or ())
         self._values = {}
 
     @property
@@ -34,6 +46,13 @@ class Value:
         operations computing value for each node."""
         return MappingProxyType(self._values)
 
+    @property
+    def marginalized(self):
+        """tuple: Variables marginalized in all evaluated queries. The values
+        of nodes below the nodes replaced by constants are not computed, so
+        the values cannot be used in a downward pass if not empty."""
+        return self._marginalized
+
     def log(self):
         return False
 
@@ -51,20 +70,57 @@ class Value:
             Tensor: A tensor of shape ``[None, num_outputs]``, where the first
             dimension corresponds to the batch size.
         """
-        def fun(node, *args):
-            with tf.name_scope(node.name):
-                if (self._inference_type == InferenceType.MARGINAL
-                    or (self._inference_type is None and
-                        node.inference_type == InferenceType.MARGINAL)):
-                    return node._compute_value(*args)
-                else:
-                    return node._compute_mpe_value(*args)
-
-        self._values = {}
         with tf.name_scope("Value"):
-            return compute_graph_up(root, val_fun=fun,
+            self.reset(root)
+            return compute_graph_up(root, val_fun=self.add_node_value,
                                     all_values=self._values)
 
+    def reset(self, root):
+        """Drop all computed values and prepare for computing the values of
+        nodes of the SPN rooted in ``root`` one by one using
+        :meth:`add_node_value`, e.g. during a traversal of the graph performing
+        another computation. The constant values of nodes with only
+        marginalized variables are assembled here and stored in :obj:`values`.
+
+        Args:
+            root (Node): The root node of the SPN graph.
+        """
+        self._values = {}
+        if self._marginalized:
+            self._values.update(_fold_marginalized(
+                root, self._marginalized, self._inference_type, log=False))
+
+    def add_node_value(self, node, *args):
+        """Assemble TF operations computing the value of ``node`` from the
+        values ``args`` of its inputs, in the name scope of the node, and
+        store them in :obj:`values`. If the value of ``node`` is already
+        stored, e.g. replaced by a constant, it is returned instead.
+
+        Args:
+            node (Node): The node.
+            *args (Tensor): For each input of ``node``, the value of the
+                            input node, or ``None`` if the input is empty.
+
+        Returns:
+            Tensor: The value of ``node``.
+        """
+        try:
+            return self._values[node]
+        except KeyError:
+            value = self._values[node] = self._compute_node_value(node, *args)
+            return value
+
+    def _compute_node_value(self, node, *args):
+        """Assemble TF operations computing the value of ``node`` from the
+        values ``args`` of its inputs."""
+        with node.inference_scope():
+            if (self._inference_type == InferenceType.MARGINAL
+                or (self._inference_type is None and
+                    node.inference_type == InferenceType.MARGINAL)):
+                return node._compute_value(*args)
+            else:
+                return node._compute_mpe_value(*args)
+
 
 class LogValue:
     """Assembles a TF operation computing the log values of nodes of the SPN
@@ -77,10 +133,19 @@ class LogValue:
             by the ``inference_type`` flag of the node. If set to ``MARGINAL``,
             marginal inference will be used for all nodes. If set to ``MPE``,
             MPE inference will be used for all nodes.
+        marginalized (iterable): Variables marginalized in all evaluated
+            queries, given as variable nodes (all variables of the node) or
+            pairs ``(node, var_id)``. The values of nodes with only these
+            variables in the scopes of all outputs are replaced by constants,
+            if computed with marginal inference. This assumes normalized
+            weights. The values of nodes below them are not computed, so such
+            values cannot be used by the downward passes of :class:`MPEPath`,
+            :class:`Gradient` or :class:`Sample`.
     """
 
-    def __init__(self, inference_type=None):
+    def __init__(self, inference_type=None, marginalized=None):
         self._inference_type = inference_type
+        self._marginalized = tuple(marginalized or ())
         self._values = {}
 
     @property
@@ -89,6 +154,13 @@ class LogValue:
         operations computing log value for each node."""
         return MappingProxyType(self._values)
 
+    @property
+    def marginalized(self):
+        """tuple: Variables marginalized in all evaluated queries. The values
+        of nodes below the nodes replaced by constants are not computed, so
+        the values cannot be used in a downward pass if not empty."""
+        return self._marginalized
+
     def log(self):
         return True
 
@@ -107,16 +179,125 @@ class LogValue:
             Tensor: A tensor of shape ``[None, num_outputs]``, where the first
             dimension corresponds to the batch size.
         """
-        def fun(node, *args):
-            with tf.name_scope(node.name):
-                if (self._inference_type == InferenceType.MARGINAL
-                    or (self._inference_type is None and
-                        node.inference_type == InferenceType.MARGINAL)):
-                    return node._compute_log_value(*args)
-                else:
-                    return node._compute_log_mpe_value(*args)
-
-        self._values = {}
         with tf.name_scope("LogValue"):
-            return compute_graph_up(root, val_fun=fun,
+            self.reset(root)
+            return compute_graph_up(root, val_fun=self.add_node_value,
                                     all_values=self._values)
+
+    def reset(self, root):
+        """Drop all computed log values and prepare for computing the log values of
+        nodes of the SPN rooted in ``root`` one by one using
+        :meth:`add_node_value`, e.g. during a traversal of the graph performing
+        another computation. The constant log values of nodes with only
+        marginalized variables are assembled here and stored in :obj:`values`.
+
+        Args:
+            root (Node): The root node of the SPN graph.
+        """
+        self._values = {}
+        if self._marginalized:
+            self._values.update(_fold_marginalized(
+                root, self._marginalized, self._inference_type, log=True))
+
+    def add_node_value(self, node, *args):
+        """Assemble TF operations computing the log value of ``node`` from the
+        log values ``args`` of its inputs, in the name scope of the node, and
+        store them in :obj:`values`. If the log value of ``node`` is already
+        stored, e.g. replaced by a constant, it is returned instead.
+
+        Args:
+            node (Node): The node.
+            *args (Tensor): For each input of ``node``, the log value of the
+                            input node, or ``None`` if the input is empty.
+
+        Returns:
+            Tensor: The log value of ``node``.
+        """
+        try:
+            return self._values[node]
+        except KeyError:
+            value = self._values[node] = self._compute_node_value(node, *args)
+            return value
+
+    def _compute_node_value(self, node, *args):
+        """Assemble TF operations computing the log value of ``node`` from the
+        log values ``args`` of its inputs."""
+        with node.inference_scope():
+            if (self._inference_type == InferenceType.MARGINAL
+                or (self._inference_type is None and
+                    node.inference_type == InferenceType.MARGINAL)):
+                return node._compute_log_value(*args)
+            else:
+                return node._compute_log_mpe_value(*args)
+
+
+def _fold_marginalized(root, marginalized, inference_type, log):
+    """Create constant (log) values for the nodes of the SPN rooted in ``root``
+    evaluating to one, since the scopes of all their outputs contain only the
+    ``marginalized`` variables and they are computed with marginal inference,
+    as are all nodes below them.
+
+    Returns:
+        dict: Dictionary indexed by the topmost such nodes, containing tensors
+        with their constant values.
+    """
+    marginalized = Scope.merge_scopes(chain.from_iterable(
+        v.get_scope() if getattr(v, 'is_var', False) else [Scope(*v)]
+        for v in marginalized))
+
+    def is_marginal(node):
+        return (inference_type == InferenceType.MARGINAL or
+                (inference_type is None and
+                 node.inference_type == InferenceType.MARGINAL))
+
+    # Find nodes evaluating to one, together with the scopes of all nodes
+    folded = set()
+
+    def fold_fun(node, *args):
+        if node.is_param:
+            return None, True
+        if node.is_op:
+            scopes = node._compute_scope(
+                *[None if a is None else a[0] for a in args])
+            marginal = is_marginal(node) and all(
+                a[1] for a in args if a is not None)
+        else:
+            scopes = node._compute_scope()
+            marginal = True
+        if marginal and all(s and s <= marginalized for s in scopes):
+            folded.add(node)
+        return scopes, marginal
+
+    compute_graph_up(root, val_fun=fold_fun)
+    if not folded:
+        return {}
+
+    # Only the topmost folded nodes are used for computing the root value
+    schedule = root.get_schedule()
+    topmost = {root} & folded
+    for node, children in zip(schedule.nodes, schedule.inputs):
+        if node not in folded:
+            topmost.update(schedule.nodes[c] for c in children
+                           if c is not None and schedule.nodes[c] in folded)
+    var_nodes = [n for n in schedule.nodes if n.is_var]
+    batch_size = tf.shape(next(
+        (n for n in var_nodes if n not in folded), var_nodes[0]).feed)[0]
+    value = tf.constant(0.0 if log else 1.0, dtype=conf.dtype)
+    constants = {}
+    for node in topmost:
+        with node.inference_scope():
+            constants[node] = tf.fill(
+                tf.stack([batch_size, node.get_out_size()]), value)
+    return constants
+
+
+def check_unfolded(value):
+    """Check that the values computed by ``value`` can be used in a downward
+    pass through the SPN, i.e. that no nodes are replaced by constants.
+
+    Raises:
+        ValueError: If ``value`` was created with marginalized variables.
+    """
+    if value.marginalized:
+        raise ValueError("Values computed with marginalized variables cannot "
+                         "be used in a downward pass")
@@ -6,6 +6,7 @@
 # ------------------------------------------------------------------------
 
 from collections import namedtuple
+from itertools import chain
 import tensorflow as tf
 
 from libspn.graph.distribution import GaussianLeaf
@@ -78,26 +79,26 @@ class EMLearning():
                             name="reset_accumulators")
 
     def accumulate_updates(self):
-        # Generate path if not yet generated
-        if not self._mpe_path.counts:
-            self._mpe_path.get_mpe_path(self._root)
+        """Assemble TF operations accumulating the hard EM counts.
 
-        # Generate all accumulate operations
-        with tf.name_scope(self._name_scope):
-            assign_ops = []
-            for pn in self._param_nodes:
+        If the MPE path was not yet generated, the values, the MPE path and
+        the accumulate operations are assembled in a single pass over the
+        graph, with each accumulate operation added as soon as the counts of
+        its node are available.
+        """
+        param_nodes = {pn.node: pn for pn in self._param_nodes}
+        gaussian_leaf_nodes = {dn.node: dn for dn in self._gaussian_leaf_nodes}
+        assign_ops = []
+
+        def accumulate(node, counts):
+            pn = param_nodes.get(node)
+            if pn is not None:
                 with tf.name_scope(pn.name_scope):
-                    # counts = self._mpe_path.counts[pn.node]
-                    # update_value = pn.node._compute_hard_em_update(counts)
-                    # with tf.control_dependencies([update_value]):
-                    # op = tf.assign_add(pn.accum, self._mpe_path.counts[pn.node])
-                    counts_summed_batch = pn.node._compute_hard_em_update(
-                        self._mpe_path.counts[pn.node])
+                    counts_summed_batch = pn.node._compute_hard_em_update(counts)
                     assign_ops.append(tf.assign_add(pn.accum, counts_summed_batch))
-
-            for dn in self._gaussian_leaf_nodes:
+            dn = gaussian_leaf_nodes.get(node)
+            if dn is not None:
                 with tf.name_scope(dn.name_scope):
-                    counts = self._mpe_path.counts[dn.node]
                     update_value = dn.node._compute_hard_em_update(counts)
                     with tf.control_dependencies(update_value.values()):
                         assign_ops.append(tf.assign_add(dn.accum, update_value['accum']))
@@ -105,6 +106,14 @@ class EMLearning():
                         assign_ops.append(tf.assign_add(
                             dn.sum_data_squared, update_value['sum_data_squared']))
 
+        # Generate path if not yet generated, accumulating during the same pass
+        if not self._mpe_path.counts:
+            self._mpe_path.get_mpe_path(self._root, counts_fun=accumulate)
+        else:
+            for node in chain(param_nodes, gaussian_leaf_nodes):
+                accumulate(node, self._mpe_path.counts[node])
+
+        with tf.name_scope(self._name_scope):
             return tf.group(*assign_ops, name="accumulate_updates")
 
     def update_spn(self):
@@ -134,7 +143,7 @@ class EMLearning():
     def _create_accumulators(self):
         def fun(node):
             if node.is_param:
-                with tf.name_scope(node.name) as scope:
+                with node.inference_scope() as scope:
                     if self._initial_accum_value is not None:
                         if node.mask and not all(node.mask):
                             accum = tf.Variable(tf.cast(tf.reshape(node.mask,
@@ -158,7 +167,7 @@ class EMLearning():
                                                       name_scope=scope)
                     self._param_nodes.append(param_node)
             if isinstance(node, GaussianLeaf) and node.learn_distribution_parameters:
-                with tf.name_scope(node.name) as scope:
+                with node.inference_scope() as scope:
                     if self._initial_accum_value is not None:
                         accum = tf.Variable(tf.ones_like(node.loc_variable, dtype=conf.dtype) *
                                             self._initial_accum_value,
@@ -185,7 +185,7 @@ class GDLearning:
     def _create_accumulators(self):
         def fun(node):
             if node.is_param:
-                with tf.name_scope(node.name) as scope:
+                with node.inference_scope() as scope:
                     accum = tf.Variable(tf.zeros_like(node.variable, dtype=conf.dtype),
                                         dtype=conf.dtype, collections=['gd_accumulators'])
                     param_node = GDLearning.ParamNode(node=node, accum=accum,
@@ -194,7 +194,7 @@ class GDLearning:
                     self._grads_and_vars.append((accum, node.variable))
 
             if isinstance(node, GaussianLeaf) and node.learn_distribution_parameters:
-                with tf.name_scope(node.name) as scope:
+                with node.inference_scope() as scope:
                     mean_grad_accum = tf.Variable(
                         tf.zeros_like(node.loc_variable, dtype=conf.dtype),
                         dtype=conf.dtype, collections=['gd_accumulators'])
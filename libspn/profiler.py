@@ -0,0 +1,238 @@
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+"""Profiling of the run time and memory of SPN nodes."""
+
+from collections import namedtuple, OrderedDict
+import tensorflow as tf
+from libspn.graph.algorithms import traverse_graph
+from libspn.graph.node import GraphData
+from libspn.utils.serialization import json_dump, json_dumps
+
+
+class NodeProfile(namedtuple("NodeProfile",
+                             ["name", "type", "time_micros", "bytes", "num_ops"])):
+    """Run time and memory aggregated over the TF ops of an SPN node, or over
+    all nodes of a type.
+
+    Attributes:
+        name (str): Name of the node, or ``None`` for ops that could not be
+                    mapped to any node, or for profiles of node types.
+        type (str): Name of the class of the node, or ``None`` for unmapped
+                    ops.
+        time_micros (float): Total run time of the ops in microseconds,
+                             averaged over the profiled runs.
+        bytes (float): Total memory allocated by the ops in bytes, averaged
+                       over the profiled runs.
+        num_ops (int): Number of executed ops.
+    """
+
+    __slots__ = ()
+
+
+class ProfileReport:
+    """Results of :func:`profile_nodes`. Profiles are sorted by decreasing
+    run time.
+
+    Args:
+        nodes (list of NodeProfile): Profiles of the SPN nodes. Ops that could
+            not be mapped to any node are aggregated into a profile with name
+            and type ``None``.
+        num_runs (int): Number of profiled runs.
+    """
+
+    _COLUMNS = NodeProfile._fields
+
+    def __init__(self, nodes, num_runs=1):
+        self._nodes = sorted(nodes, key=lambda p: p.time_micros, reverse=True)
+        self._num_runs = num_runs
+
+    @property
+    def nodes(self):
+        """list of NodeProfile: Profiles of the SPN nodes."""
+        return self._nodes
+
+    @property
+    def num_runs(self):
+        """int: Number of profiled runs."""
+        return self._num_runs
+
+    @property
+    def total_time_micros(self):
+        """float: Total run time of all ops in microseconds."""
+        return sum(p.time_micros for p in self._nodes)
+
+    def by_type(self):
+        """Aggregate the profiles of the nodes per node type.
+
+        Returns:
+            list of NodeProfile: Profiles of the node types, with name ``None``,
+            sorted by decreasing run time.
+        """
+        types = OrderedDict()
+        for p in self._nodes:
+            t = types.get(p.type)
+            types[p.type] = (p._replace(name=None) if t is None else
+                             t._replace(time_micros=t.time_micros + p.time_micros,
+                                        bytes=t.bytes + p.bytes,
+                                        num_ops=t.num_ops + p.num_ops))
+        return sorted(types.values(), key=lambda p: p.time_micros, reverse=True)
+
+    def _profiles(self, by_type):
+        return self.by_type() if by_type else self._nodes
+
+    def to_dataframe(self, by_type=False):
+        """Get the profiles as a pandas DataFrame with one row per node.
+
+        Args:
+            by_type (bool): If ``True``, return one row per node type.
+
+        Returns:
+            pandas.DataFrame: The profiles.
+        """
+        import pandas as pd
+        return pd.DataFrame([p._asdict() for p in self._profiles(by_type)],
+                            columns=self._COLUMNS)
+
+    def to_table(self, by_type=False, max_rows=None):
+        """Format the profiles as a text table with one row per node.
+
+        Args:
+            by_type (bool): If ``True``, print one row per node type.
+            max_rows (int): Maximum number of rows printed. If ``None``, all
+                            rows are printed.
+
+        Returns:
+            str: The table.
+        """
+        total = self.total_time_micros or 1.0
+        rows = [("Node", "Type", "Time [us]", "Time [%]", "Bytes", "Ops")]
+        for p in self._profiles(by_type)[:max_rows]:
+            rows.append(("-" if p.name is None else p.name,
+                         "-" if p.type is None else p.type,
+                         "%.1f" % p.time_micros,
+                         "%.1f" % (100.0 * p.time_micros / total),
+                         "%d" % p.bytes, "%d" % p.num_ops))
+        if by_type:
+            rows = [r[1:] for r in rows]
+        widths = [max(len(r[i]) for r in rows) for i in range(len(rows[0]))]
+        return "\n".join("  ".join(c.ljust(w) if i < len(widths) - 4 else c.rjust(w)
+                                   for i, (c, w) in enumerate(zip(r, widths)))
+                         for r in rows)
+
+    def to_json(self, path=None, pretty=False):
+        """Export the profiles of the nodes and of the node types to JSON.
+
+        Args:
+            path (str): Path to the output file. If ``None``, the JSON is
+                        returned as a string.
+            pretty (bool): Use indentation when formatting JSON.
+
+        Returns:
+            str: The JSON if ``path`` is ``None``.
+        """
+        data = {'num_runs': self._num_runs,
+                'total_time_micros': self.total_time_micros,
+                'nodes': [p._asdict() for p in self._nodes],
+                'types': [p._asdict() for p in self.by_type()]}
+        if path is None:
+            return json_dumps(data, pretty=pretty)
+        json_dump(path, data, pretty=pretty)
+
+    def __str__(self):
+        return self.to_table()
+
+
+def _op_node_name(op_name, node_scopes):
+    """Find the name of the SPN node owning the TF op ``op_name``, i.e. the
+    owner of the innermost name scope of the op registered by the node."""
+    parts = op_name.split("/")[:-1]
+    for i in range(len(parts), 0, -1):
+        try:
+            return node_scopes["/".join(parts[:i]) + "/"]
+        except KeyError:
+            pass
+    return None
+
+
+def _is_duplicate_device(device):
+    # GPU ops are reported once per stream and once in total
+    return "/stream:" in device and not device.endswith("/stream:all")
+
+
+def profile_nodes(root, fetches, feed_dict=None, sess=None, num_runs=1):
+    """Profile the run time and memory of the SPN nodes when computing
+    ``fetches``.
+
+    ``fetches`` is computed ``num_runs`` times with full tracing and the TF ops
+    executed in each run are mapped back to the SPN nodes in the graph rooted
+    in ``root``. An op belongs to a node if it was created in a name scope
+    registered by the node, i.e. the scope of the node's own variables and
+    placeholders, or a scope opened with :meth:`~libspn.Node.inference_scope`
+    by inference of the node (e.g. :class:`~libspn.LogValue` or
+    :class:`~libspn.MPEPath`).
+
+    Args:
+        root (Node): Root of the SPN graph whose nodes are profiled.
+        fetches: Fetches passed to ``Session.run``.
+        feed_dict (dict): Feed dictionary passed to ``Session.run``.
+        sess (Session): Session used to run ``fetches``. If ``None``, the
+                        default session is used.
+        num_runs (int): Number of profiled runs. Results are averaged over the
+                        runs. It is recommended to run ``fetches`` once before
+                        profiling to exclude one-time initialization costs.
+
+    Returns:
+        ProfileReport: The profiles of the nodes.
+    """
+    if sess is None:
+        sess = tf.get_default_session()
+        if sess is None:
+            raise ValueError("sess must be given if there is no default session")
+    if num_runs < 1:
+        raise ValueError("num_runs must be a positive integer")
+
+    node_types = {}
+
+    def add_node(node):
+        node_types[node.name] = type(node).__name__
+    traverse_graph(root, add_node, skip_params=False)
+
+    node_scopes = GraphData.get(sess.graph).node_scopes
+
+    # Accumulate [time, bytes, ops] per node name, None for unmapped ops
+    stats = {}
+    op_names = {}
+    options = tf.RunOptions(trace_level=tf.RunOptions.FULL_TRACE)
+    for _ in range(num_runs):
+        run_metadata = tf.RunMetadata()
+        sess.run(fetches, feed_dict=feed_dict, options=options,
+                 run_metadata=run_metadata)
+        for dev_stats in run_metadata.step_stats.dev_stats:
+            if _is_duplicate_device(dev_stats.device):
+                continue
+            for node_stats in dev_stats.node_stats:
+                # GPU stream ops are reported as "name:type"
+                op_name = node_stats.node_name.split(":")[0]
+                try:
+                    name = op_names[op_name]
+                except KeyError:
+                    name = _op_node_name(op_name, node_scopes)
+                    if name not in node_types:
+                        name = None
+                    op_names[op_name] = name
+                s = stats.setdefault(name, [0, 0, 0])
+                s[0] += node_stats.all_end_rel_micros
+                s[1] += sum(m.total_bytes for m in node_stats.memory)
+                s[2] += 1
+
+    return ProfileReport(
+        [NodeProfile(name=name, type=node_types.get(name),
+                     time_micros=s[0] / num_runs, bytes=s[1] / num_runs,
+                     num_ops=s[2] // num_runs)
+         for name, s in stats.items()],
+        num_runs=num_runs)
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+"""Benchmark suite running the main SPN workloads on the CPU, storing the
+results as JSON and comparing them against the results of a baseline run.
+
+Example::
+
+    # Store a baseline
+    ./perf_benchmark.py --run-name base --json base.json
+    # Compare against the baseline, exits with status 1 on regressions
+    ./perf_benchmark.py --run-name new --json new.json --baseline base.json
+
+The peak resident set size is a property of the whole process, therefore it
+is reported once per run rather than for each unit, and it is not compared
+against the baseline.
+"""
+
+import abc
+import json
+import os
+import random
+import sys
+from collections import namedtuple, OrderedDict
+import numpy as np
+import tensorflow as tf
+from context import libspn as spn
+
+from libspn.tests.abstract_performance_test import AbstractPerformanceTest, \
+    AbstractPerformanceUnit, PerformanceTestArgs, ConfigGenerator, peak_rss
+
+BenchmarkInput = namedtuple("BenchmarkInput", ["values", "num_nodes"])
+
+# Fields identifying a result when comparing runs
+RESULT_KEY = ('benchmark', 'unit_name', 'inf_type', 'log', 'gpu')
+
+
+class ContVarsUnit(AbstractPerformanceUnit, abc.ABC):
+    """ Unit computing the value of nodes connected to a single ContVars """
+
+    def _build_placeholders(self, inputs):
+        return [spn.ContVars(num_vars=inputs.values[0].shape[1])]
+
+    def _build_op(self, inputs, placeholders, conf):
+        nodes = self._build_nodes(placeholders[0], inputs.num_nodes)
+        root = nodes[0] if len(nodes) == 1 else spn.Concat(*nodes)
+        if conf.log:
+            op = root.get_log_value(inference_type=conf.inf_type)
+        else:
+            op = root.get_value(inference_type=conf.inf_type)
+        return op, self._initialize_from(root)
+
+    @abc.abstractmethod
+    def _build_nodes(self, cont_vars, num_nodes):
+        """ Builds the benchmarked nodes modeling ``num_nodes`` operations """
+
+
+class SumsValueUnit(ContVarsUnit):
+    """ Sums with uniform weights, each over a block of the inputs """
+
+    def __init__(self, name, dtype, layer_fun):
+        super().__init__(name, dtype)
+        self._layer_fun = layer_fun
+
+    def _build_nodes(self, cont_vars, num_nodes):
+        nodes = self._layer_fun(cont_vars, num_nodes)
+        for n in nodes:
+            self._generate_weights(n)
+        return nodes
+
+    def true_out(self, inputs, conf):
+        blocks = np.split(inputs.values[0], inputs.num_nodes, axis=1)
+        if conf.inf_type == spn.InferenceType.MARGINAL:
+            out = np.stack([np.mean(b, axis=1) for b in blocks], axis=1)
+        else:
+            out = np.stack([np.max(b, axis=1) / b.shape[1] for b in blocks], axis=1)
+        return np.log(out) if conf.log else out
+
+
+class ProductsValueUnit(ContVarsUnit):
+    """ Products, each over a block of the inputs """
+
+    def __init__(self, name, dtype, layer_fun):
+        super().__init__(name, dtype)
+        self._layer_fun = layer_fun
+
+    def _build_nodes(self, cont_vars, num_nodes):
+        return self._layer_fun(cont_vars, num_nodes)
+
+    def true_out(self, inputs, conf):
+        blocks = np.split(inputs.values[0], inputs.num_nodes, axis=1)
+        out = np.stack([np.prod(b, axis=1) for b in blocks], axis=1)
+        return np.log(out) if conf.log else out
+
+
+def _blocks(cont_vars, num_nodes):
+    size = cont_vars.num_vars // num_nodes
+    return [(cont_vars, list(range(i * size, (i + 1) * size)))
+            for i in range(num_nodes)]
+
+
+class GatherColsUnit(AbstractPerformanceUnit):
+
+    def _build_placeholders(self, inputs):
+        return [tf.placeholder(self._dtype, shape=inputs.values[0].shape)]
+
+    def _indices(self, inputs):
+        return np.random.RandomState(AbstractPerformanceTest.seed()).randint(
+            inputs.values[0].shape[1], size=inputs.values[0].shape[1])
+
+    def _build_op(self, inputs, placeholders, conf):
+        return spn.utils.gather_cols(placeholders[0], self._indices(inputs)), None
+
+    def true_out(self, inputs, conf):
+        return inputs.values[0][:, self._indices(inputs)]
+
+
+class ScatterColsUnit(GatherColsUnit):
+
+    def _indices(self, inputs):
+        num_cols = inputs.values[0].shape[1]
+        return np.random.RandomState(AbstractPerformanceTest.seed()).permutation(
+            2 * num_cols)[:num_cols]
+
+    def _build_op(self, inputs, placeholders, conf):
+        return spn.utils.scatter_cols(placeholders[0], self._indices(inputs),
+                                      2 * inputs.values[0].shape[1]), None
+
+    def true_out(self, inputs, conf):
+        out = np.zeros((inputs.values[0].shape[0], 2 * inputs.values[0].shape[1]))
+        out[:, self._indices(inputs)] = inputs.values[0]
+        return out
+
+
+class DenseSPNUnit(AbstractPerformanceUnit):
+    """ Value or MPE path of an SPN generated by DenseSPNGeneratorLayerNodes.
+    The output is not checked, correctness is covered by the unit tests. """
+
+    def __init__(self, name, dtype, node_type, path=False):
+        super().__init__(name, dtype)
+        self._node_type = node_type
+        self._path = path
+
+    def _build_placeholders(self, inputs):
+        return [spn.IVs(num_vars=inputs.values[0].shape[1], num_vals=inputs.num_nodes)]
+
+    def _build_op(self, inputs, placeholders, conf):
+        gen = spn.DenseSPNGeneratorLayerNodes(
+            num_decomps=1, num_subsets=2, num_mixtures=2,
+            input_dist=spn.DenseSPNGeneratorLayerNodes.InputDist.MIXTURE,
+            num_input_mixtures=inputs.num_nodes, node_type=self._node_type)
+        root = gen.generate(placeholders[0], rnd=random.Random(AbstractPerformanceTest.seed()))
+        with tf.control_dependencies(None):
+            spn.generate_weights(root, init_value=spn.ValueType.RANDOM_UNIFORM())
+        if self._path:
+            mpe_path_gen = spn.MPEPath(value_inference_type=conf.inf_type, log=conf.log)
+            mpe_path_gen.get_mpe_path(root)
+            op = mpe_path_gen.counts[placeholders[0]]
+        elif conf.log:
+            op = root.get_log_value(inference_type=conf.inf_type)
+        else:
+            op = root.get_value(inference_type=conf.inf_type)
+        return op, self._initialize_from(root)
+
+    def true_out(self, inputs, conf):
+        return None
+
+
+class DenseEMUnit(AbstractPerformanceUnit):
+    """ A step of hard EM learning of an SPN generated by
+    DenseSPNGeneratorLayerNodes, the workload of perf_mnist_training.py on
+    synthetic data. The output is not checked, correctness is covered by the
+    unit tests. """
+
+    def __init__(self, name, dtype, node_type):
+        super().__init__(name, dtype)
+        self._node_type = node_type
+
+    def _build_placeholders(self, inputs):
+        return [spn.IVs(num_vars=inputs.values[0].shape[1], num_vals=inputs.num_nodes)]
+
+    def _build_op(self, inputs, placeholders, conf):
+        gen = spn.DenseSPNGeneratorLayerNodes(
+            num_decomps=1, num_subsets=2, num_mixtures=2,
+            input_dist=spn.DenseSPNGeneratorLayerNodes.InputDist.MIXTURE,
+            num_input_mixtures=inputs.num_nodes, node_type=self._node_type)
+        root = gen.generate(placeholders[0], rnd=random.Random(AbstractPerformanceTest.seed()))
+        with tf.control_dependencies(None):
+            spn.generate_weights(root, init_value=spn.ValueType.RANDOM_UNIFORM(10, 11))
+            learning = spn.EMLearning(root, log=conf.log, value_inference_type=conf.inf_type,
+                                      additive_smoothing=1.0)
+            init = tf.group(self._initialize_from(root), learning.reset_accumulators())
+        accumulate = learning.accumulate_updates()
+        with tf.control_dependencies([accumulate]):
+            update = learning.update_spn()
+        return update, init
+
+    def true_out(self, inputs, conf):
+        return None
+
+
+class Benchmark(AbstractPerformanceTest):
+    """ A group of units run on the same input """
+
+    def __init__(self, name, performance_units, test_args, config_generator,
+                 input_fun):
+        super().__init__(name, performance_units, test_args, config_generator)
+        self._input_fun = input_fun
+
+    def description(self):
+        return self.name
+
+    def generate_input(self):
+        return self._input_fun(self)
+
+
+def _cont_input(test):
+    rows, cols = test._shape
+    num_nodes = max(cols // 10, 1)
+    # Values away from 0 to keep products and logs well conditioned
+    values = 0.5 + 0.5 * test.random_numpy_tensor((rows, num_nodes * 10))
+    return BenchmarkInput(values=[values], num_nodes=num_nodes)
+
+
+def _ivs_input(test):
+    rows, cols = test._shape
+    num_vals = 2
+    rnd = np.random.RandomState(test.seed())
+    return BenchmarkInput(values=[rnd.randint(-1, num_vals, size=(rows, max(cols // 10, 2)))],
+                          num_nodes=num_vals)
+
+
+def _benchmarks(dtype):
+    """ Returns a dict of the benchmarks, each given as a tuple
+    (units, input_fun, inference types, log values). """
+    NodeType = spn.DenseSPNGeneratorLayerNodes.NodeType
+    both = [spn.InferenceType.MARGINAL, spn.InferenceType.MPE]
+    return OrderedDict([
+        ('sum_value', ([
+            SumsValueUnit("Sum", dtype, lambda x, n: [spn.Sum(b) for b in _blocks(x, n)]),
+            SumsValueUnit("Sums", dtype, lambda x, n: [spn.Sums(x, num_sums=n)]),
+            SumsValueUnit("SumsLayer", dtype,
+                          lambda x, n: [spn.SumsLayer(x, num_or_size_sums=n)])],
+            _cont_input, both, [False, True])),
+        ('product_value', ([
+            ProductsValueUnit("Product", dtype,
+                              lambda x, n: [spn.Product(b) for b in _blocks(x, n)]),
+            ProductsValueUnit("Products", dtype, lambda x, n: [spn.Products(x, num_prods=n)]),
+            ProductsValueUnit("ProductsLayer", dtype,
+                              lambda x, n: [spn.ProductsLayer(x, num_or_size_prods=n)])],
+            _cont_input, [spn.InferenceType.MARGINAL], [False, True])),
+        ('cols', ([
+            GatherColsUnit("GatherCols", dtype),
+            ScatterColsUnit("ScatterCols", dtype)],
+            _cont_input, [spn.InferenceType.MARGINAL], [False])),
+        ('dense_value', (
+            [DenseSPNUnit(t.name, dtype, t) for t in NodeType],
+            _ivs_input, both, [True])),
+        ('dense_path', (
+            [DenseSPNUnit(t.name, dtype, t, path=True) for t in NodeType],
+            _ivs_input, both, [True])),
+        ('dense_em', (
+            [DenseEMUnit(t.name, dtype, t) for t in NodeType],
+            _ivs_input, both, [True])),
+    ])
+
+
+def _key(result):
+    return tuple(str(result[k]) for k in RESULT_KEY)
+
+
+def compare_results(results, baseline, tolerance, metric='rest_run_time'):
+    """ Compares results with baseline results.
+
+    Returns:
+        list of tuple: ``(key, baseline value, value)`` for every result whose
+        ``metric`` exceeds the baseline by more than ``tolerance`` (relative).
+    """
+    baseline = {_key(r): r for r in baseline}
+    regressions = []
+    for r in results:
+        base = baseline.get(_key(r))
+        if base is not None and r[metric] > base[metric] * (1.0 + tolerance):
+            regressions.append((_key(r), base[metric], r[metric]))
+    return regressions
+
+
+def main():
+    parser = PerformanceTestArgs()
+    parser.set_defaults(num_runs=20, num_stack=10, rows=1000, cols=200,
+                        write_mode='overwrite')
+    benchmark_names = list(_benchmarks(tf.float32).keys())
+    parser.add_argument('--benchmarks', nargs='+', default=benchmark_names,
+                        choices=benchmark_names, help="Benchmarks to run")
+    parser.add_argument('--with-gpu', action='store_true',
+                        help="Also run the benchmarks on the GPU")
+    parser.add_argument('--json', default=None, type=str,
+                        help="Path to the JSON results, by default "
+                             "<logdir>/benchmark/<run-name>.json")
+    parser.add_argument('--baseline', default=None, type=str,
+                        help="JSON results of a baseline run to compare with")
+    parser.add_argument('--tolerance', default=0.1, type=float,
+                        help="Relative increase of run time reported as regression")
+    args = parser.parse_args()
+
+    gpu = [False] if not args.without_cpu else []
+    if args.with_gpu and not args.without_gpu:
+        gpu.append(True)
+    if not gpu:
+        parser.error("No device selected")
+
+    results = []
+    for name, (units, input_fun, inf_types, log) in _benchmarks(tf.float32).items():
+        if name not in args.benchmarks:
+            continue
+        benchmark = Benchmark(
+            name, units, args, ConfigGenerator(inference_types=inf_types, log=log, gpu=gpu),
+            input_fun)
+        results.extend(dict(r, benchmark=name) for r in benchmark.run())
+
+    json_path = args.json or os.path.join(args.logdir, 'benchmark', args.run_name + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+    with open(json_path, 'w') as f:
+        json.dump({'run_name': args.run_name, 'cpu_name': args.cpu_name,
+                   'gpu_name': args.gpu_name, 'num_runs': args.num_runs,
+                   'num_stack': args.num_stack, 'peak_rss': peak_rss(),
+                   'results': results},
+                  f, indent=2, default=float)
+    print("Results written to %s" % json_path)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_results(results, baseline['results'], args.tolerance)
+        for key, base, value in regressions:
+            print("Regression %s: %.6fs -> %.6fs (%+.1f%%)" %
+                  ('/'.join(key), base, value, 100.0 * (value / base - 1.0)))
+        if regressions:
+            sys.exit(1)
+        print("No regressions w.r.t. %s" % baseline['run_name'])
+
+
+if __name__ == '__main__':
+    main()
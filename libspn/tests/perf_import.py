@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+"""Benchmark measuring the time of importing LibSPN in a new interpreter,
+optionally followed by accessing some of its public names.
+
+Example::
+
+    # Fails with status 1 if a plain import takes more than 0.5s on average
+    ./perf_import.py --max-time 0.5
+    # Time of importing the library and building the graph nodes
+    ./perf_import.py --names IVs Sum Product
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+CODE = """
+import time
+t = time.perf_counter()
+import libspn
+for name in %r:
+    getattr(libspn, name)
+print(time.perf_counter() - t)
+"""
+
+
+def measure(names, num_runs):
+    """Measure the import time in ``num_runs`` new interpreters.
+
+    Returns:
+        list of float: Import times in seconds.
+    """
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(
+        os.path.join(os.path.dirname(__file__), os.pardir, os.pardir)))
+    times = []
+    for _ in range(num_runs):
+        out = subprocess.check_output(
+            [sys.executable, '-c', CODE % (list(names),)], env=env)
+        times.append(float(out.decode('utf-8').splitlines()[-1]))
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--num-runs', default=10, type=int,
+                        help="Number of measured imports")
+    parser.add_argument('--names', nargs='*', default=[],
+                        help="Public names accessed after the import")
+    parser.add_argument('--max-time', default=None, type=float,
+                        help="Max average time in seconds, exit with status 1 "
+                             "if exceeded")
+    args = parser.parse_args()
+
+    times = measure(args.names, args.num_runs)
+    avg = sum(times) / len(times)
+    print("Import of libspn%s: avg %.3fs, min %.3fs, max %.3fs (%d runs)"
+          % (" and %s" % ", ".join(args.names) if args.names else "",
+             avg, min(times), max(times), len(times)))
+    if args.max_time is not None and avg > args.max_time:
+        print("Average import time exceeds %.3fs" % args.max_time)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
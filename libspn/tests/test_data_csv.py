@@ -11,6 +11,8 @@ from context import libspn as spn
 from test import TestCase
 import tensorflow as tf
 import numpy as np
+import tempfile
+import os
 
 
 class TestCSVFileDataset(TestCase):
@@ -393,6 +395,147 @@ class TestCSVFileDataset(TestCase):
                                                 [41, 42],
                                                 [46, 47]], dtype=np.int32))
 
+    def test_csv_file_dataset_tf_data(self):
+        """Batch generation using a tf.data pipeline and an epoch iterator
+        for CSV file with 2 labels"""
+        dataset = spn.CSVFileDataset(self.data_path(["data_int1.csv",
+                                                     "data_int2.csv"]),
+                                     num_vals=[255] * 3,
+                                     defaults=[[101], [102], [103], [104], [105]],
+                                     num_epochs=2,
+                                     batch_size=3,
+                                     shuffle=False,
+                                     num_labels=2,
+                                     min_after_dequeue=1000,
+                                     num_threads=2,
+                                     allow_smaller_final_batch=True)
+        # Queue runners and tf.data produce the same data
+        correct = dataset.read_all()
+        tf_data_pipeline = spn.conf.tf_data_pipeline
+        spn.conf.tf_data_pipeline = True
+        try:
+            data = dataset.read_all()
+        finally:
+            spn.conf.tf_data_pipeline = tf_data_pipeline
+        np.testing.assert_array_equal(data[0], correct[0])
+        np.testing.assert_array_equal(data[1], correct[1])
+
+        # Explicit epochs
+        iterator = dataset.get_iterator(num_epochs=1)
+        batch = iterator.get_next()
+        with self.test_session() as sess:
+            for _ in range(2):
+                sess.run(iterator.initializer)
+                samples = []
+                try:
+                    while True:
+                        samples.append(sess.run(batch)[0])
+                except tf.errors.OutOfRangeError:
+                    pass
+                np.testing.assert_array_equal(np.concatenate(samples),
+                                              correct[0][:10])
+
+
+    def test_csv_file_dataset_in_memory(self):
+        """Batch generation for CSV file with custom data parsed with NumPy
+        and served from the cache"""
+        class CustomCSVFileDataset(spn.CSVFileDataset):
+            """Our custom dataset."""
+
+            def process_data(self, data):
+                return [tf.stack(data[0:1]), tf.stack(data[1:3]), tf.stack(data[3:])]
+
+        def get_dataset(in_memory, shuffle=False):
+            return CustomCSVFileDataset(self.data_path("data_mix.csv"),
+                                        num_vals=[255, None, None],
+                                        defaults=[[101.0], [102], [103],
+                                                  [104.0], [105.0]],
+                                        num_epochs=2,
+                                        batch_size=3,
+                                        shuffle=shuffle,
+                                        num_labels=2,
+                                        min_after_dequeue=1000,
+                                        num_threads=1,
+                                        allow_smaller_final_batch=True,
+                                        seed=1,
+                                        in_memory=in_memory)
+
+        data_cache_dir = spn.conf.data_cache_dir
+        tf_data_pipeline = spn.conf.tf_data_pipeline
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spn.conf.data_cache_dir = tmp_dir
+            try:
+                correct = get_dataset(in_memory=False).read_all()
+                # Parsed and cached, then read from the cache
+                for _ in range(2):
+                    data = get_dataset(in_memory=True).read_all()
+                    for d, c in zip(data, correct):
+                        np.testing.assert_array_equal(d, c)
+                self.assertEqual(len(os.listdir(tmp_dir)), 1)
+                spn.conf.tf_data_pipeline = True
+                data = get_dataset(in_memory=True).read_all()
+                for d, c in zip(data, correct):
+                    np.testing.assert_array_equal(d, c)
+                # Shuffled samples of each epoch
+                data = get_dataset(in_memory=True, shuffle=True).read_all()
+                for d, c in zip(data, correct):
+                    np.testing.assert_array_equal(np.sort(d[:5], axis=0),
+                                                  np.sort(c[:5], axis=0))
+            finally:
+                spn.conf.data_cache_dir = data_cache_dir
+                spn.conf.tf_data_pipeline = tf_data_pipeline
+
+    def test_csv_file_dataset_in_memory_batch_reads(self):
+        """Cached columns are read once per batch in queue mode"""
+        class CountingArray(np.ndarray):
+            num_reads = 0
+
+            def __getitem__(self, index):
+                CountingArray.num_reads += 1
+                return np.asarray(super().__getitem__(index))
+
+        data_cache_dir = spn.conf.data_cache_dir
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spn.conf.data_cache_dir = tmp_dir
+            try:
+                dataset = spn.CSVFileDataset(self.data_path("data_mix.csv"),
+                                             num_vals=[255, None, None],
+                                             defaults=[[101.0], [102], [103],
+                                                       [104.0], [105.0]],
+                                             num_epochs=2, batch_size=3,
+                                             shuffle=False, num_labels=2,
+                                             allow_smaller_final_batch=True,
+                                             in_memory=True)
+                columns = dataset._load_columns()
+                dataset._columns = [c.view(CountingArray) for c in columns]
+                data = dataset.read_all()
+                num_samples = len(columns[0]) * 2
+                self.assertEqual(len(data[0]), num_samples)
+                self.assertEqual(CountingArray.num_reads,
+                                 len(columns) * -(-num_samples // 3))
+            finally:
+                spn.conf.data_cache_dir = data_cache_dir
+
+
+    def test_csv_file_dataset_in_memory_empty(self):
+        """Parsing an empty CSV file with NumPy"""
+        data_cache_dir = spn.conf.data_cache_dir
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spn.conf.data_cache_dir = tmp_dir
+            try:
+                path = os.path.join(tmp_dir, "empty.csv")
+                open(path, 'w').close()
+                dataset = spn.CSVFileDataset(path, num_vals=[None, 10],
+                                             defaults=[[1.0], [1], [1]],
+                                             num_epochs=1, batch_size=3,
+                                             shuffle=False, num_labels=1,
+                                             in_memory=True)
+                self.assertEqual(dataset.num_samples, 0)
+                columns = dataset._load_columns()
+                self.assertEqual([c.dtype for c in columns],
+                                 [np.float32, np.int32, np.int32])
+            finally:
+                spn.conf.data_cache_dir = data_cache_dir
 
 if __name__ == '__main__':
     tf.test.main()
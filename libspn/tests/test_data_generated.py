@@ -262,6 +262,71 @@ class TestDataGenerated(TestCase):
                                                       [2, 1],
                                                       [2, 2]], dtype=np.int32))
 
+    def test_iter_batches_int_grid_dataset(self):
+        """Streaming batches and preallocated read_all"""
+        def get_dataset(allow_smaller_final_batch):
+            return spn.IntGridDataset(
+                num_dims=2, num_vals=3, num_epochs=2, batch_size=4,
+                shuffle=False, num_threads=1,
+                allow_smaller_final_batch=allow_smaller_final_batch)
+
+        dataset = get_dataset(allow_smaller_final_batch=True)
+        self.assertEqual(dataset.num_samples, 9)
+        batches = list(dataset.iter_batches())
+        self.assertListEqual([len(b) for b in batches], [4, 4, 4, 4, 2])
+        np.testing.assert_array_equal(np.concatenate(batches),
+                                      dataset.read_all())
+        # Incomplete final batch is omitted
+        data = get_dataset(allow_smaller_final_batch=False).read_all()
+        np.testing.assert_array_equal(data, np.concatenate(batches)[:16])
+
+    def test_iter_batches_keeps_default_graph(self):
+        """The caller's default graph and session are used between batches"""
+        dataset = spn.IntGridDataset(num_dims=2, num_vals=3, num_epochs=1,
+                                     batch_size=4, shuffle=False, num_threads=1,
+                                     allow_smaller_final_batch=True)
+        with tf.Graph().as_default() as graph:
+            x = tf.constant(1)
+            with tf.Session() as sess:
+                num_batches = 0
+                for _ in dataset.iter_batches():
+                    self.assertIs(tf.get_default_graph(), graph)
+                    self.assertIs(tf.get_default_session(), sess)
+                    self.assertEqual(x.eval(), 1)
+                    num_batches += 1
+        self.assertEqual(num_batches, 3)
+        # Leaving the caller's contexts while iterating is allowed
+        with tf.Graph().as_default():
+            batches = dataset.iter_batches()
+            next(batches)
+        self.assertEqual(len(list(batches)), 2)
+
+    def test_int_grid_dataset_tf_data_shuffle(self):
+        """Deterministic shuffling in tf.data pipelines"""
+        def read_all(seed):
+            dataset = spn.IntGridDataset(num_dims=2, num_vals=3, num_epochs=2,
+                                         batch_size=4, shuffle=True,
+                                         num_threads=2,
+                                         allow_smaller_final_batch=True,
+                                         seed=seed)
+            with tf.Graph().as_default():
+                data = dataset.get_tf_dataset().make_one_shot_iterator().get_next()
+                batches = []
+                with tf.Session() as sess:
+                    try:
+                        while True:
+                            batches.append(sess.run(data)[0])
+                    except tf.errors.OutOfRangeError:
+                        pass
+            return np.concatenate(batches)
+
+        data = read_all(seed=100)
+        self.assertEqual(data.shape, (18, 2))
+        # Each epoch contains all points
+        for epoch in (data[:9], data[9:]):
+            self.assertEqual(len(set(map(tuple, epoch))), 9)
+        np.testing.assert_array_equal(data, read_all(seed=100))
+
 
 if __name__ == '__main__':
     tf.test.main()
@@ -11,6 +11,8 @@ from context import libspn as spn
 from test import TestCase
 import tensorflow as tf
 import numpy as np
+import tempfile
+import os
 
 
 class TestImageDataset(TestCase):
@@ -1115,5 +1117,38 @@ class TestImageDataset(TestCase):
         self.generic_dataset_test(dataset, batches)
 
 
+    def test_pngrgb_rgbint_ratiocrop_cached(self):
+        """Processed images served from the cache"""
+        def get_dataset(cached, shuffle=False):
+            return spn.ImageDataset(
+                image_files=self.data_path("img_dir4/*-{*}.png"),
+                format=spn.ImageFormat.RGB_INT,
+                num_epochs=2, batch_size=2, shuffle=shuffle,
+                ratio=2, crop=1, accurate=True,
+                allow_smaller_final_batch=True, seed=1, cached=cached)
+
+        data_cache_dir = spn.conf.data_cache_dir
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spn.conf.data_cache_dir = tmp_dir
+            try:
+                correct = get_dataset(cached=False).read_all()
+                # Processed samples are written to a memory-mapped entry
+                samples, _ = get_dataset(cached=True).load_data()
+                self.assertIsInstance(samples, np.memmap)
+                # Read from the cache
+                for _ in range(2):
+                    data = get_dataset(cached=True).read_all()
+                    np.testing.assert_array_equal(data[0], correct[0])
+                    np.testing.assert_array_equal(data[1], correct[1])
+                self.assertEqual(len(os.listdir(tmp_dir)), 2)
+                # Shuffled labels still match samples
+                data = get_dataset(cached=True, shuffle=True).read_all()
+                for sample, label in zip(*data):
+                    i = list(correct[1][:, 0]).index(label[0])
+                    np.testing.assert_array_equal(sample, correct[0][i])
+            finally:
+                spn.conf.data_cache_dir = data_cache_dir
+
+
 if __name__ == '__main__':
     tf.test.main()
@@ -11,6 +11,8 @@ from context import libspn as spn
 from test import TestCase
 import tensorflow as tf
 import numpy as np
+import tempfile
+import os
 
 
 class TestMNISTDataset(TestCase):
@@ -368,18 +370,69 @@ class TestMNISTDataset(TestCase):
         img, label = self.generic_dataset_test(dataset)
 
         true_img = np.array(
-            [[11, 4, 2, 7, 9, 9, 9, 9, 10, 11, 13, 93, 110,
-              56, 26, 25, 25, 24, 15, 11, 19, 164, 192, 218, 217, 222,
-              220, 223, 162, 13, 11, 11, 11, 31, 51, 62, 54, 189, 173,
-              8, 11, 10, 10, 9, 7, 0, 62, 244, 59, 6, 11, 11,
-              11, 11, 10, 7, 192, 156, 5, 11, 11, 11, 11, 12, 4,
-              64, 226, 40, 7, 11, 11, 11, 11, 8, 24, 218, 141, 3,
-              11, 11, 11, 11, 11, 2, 148, 220, 25, 8, 11, 11, 11,
-              11, 6, 67, 255, 74, 3, 12, 11, 11]], dtype=np.uint8)
+            [[0, 0, 0, 0, 0, 0, 0, 0, 0, 0,
+              0, 70, 80, 25, 0, 0, 0, 0, 0, 0,
+              0, 170, 179, 229, 226, 234, 233, 227, 159, 0,
+              0, 0, 0, 4, 21, 35, 33, 153, 152, 0,
+              0, 0, 0, 0, 0, 0, 39, 253, 33, 0,
+              0, 0, 0, 0, 0, 0, 180, 131, 0, 0,
+              0, 0, 0, 0, 0, 35, 230, 15, 0, 0,
+              0, 0, 0, 0, 5, 207, 120, 0, 0, 0,
+              0, 0, 0, 0, 129, 208, 9, 0, 0, 0,
+              0, 0, 0, 42, 255, 43, 0, 0, 0, 0]], dtype=np.uint8)
         true_label = np.array([[7]], dtype=np.int)
         np.testing.assert_array_equal(img, true_img)
         np.testing.assert_array_equal(label, true_label)
 
+    def test_cache(self):
+        """Processed data is cached and memory-mapped"""
+        data_cache_dir = spn.conf.data_cache_dir
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            spn.conf.data_cache_dir = tmp_dir
+            try:
+                def load(ratio):
+                    dataset = spn.MNISTDataset(
+                        subset=spn.MNISTDataset.Subset.TEST,
+                        format=spn.ImageFormat.FLOAT, num_epochs=1,
+                        batch_size=100, shuffle=False, ratio=ratio, crop=1,
+                        classes=[1, 3], cached=True)
+                    dataset.load_data()
+                    return dataset
+                processed = load(ratio=2)
+                self.assertNotIsInstance(processed.samples, np.memmap)
+                cached = load(ratio=2)
+                self.assertIsInstance(cached.samples, np.memmap)
+                np.testing.assert_array_equal(cached.samples, processed.samples)
+                np.testing.assert_array_equal(cached.labels, processed.labels)
+                # Different processing is not served from the cache
+                self.assertEqual(load(ratio=4).samples.shape,
+                                 (processed.samples.shape[0], 25))
+                # Nothing is cached by default
+                num_entries = len(os.listdir(tmp_dir))
+                dataset = spn.MNISTDataset(
+                    subset=spn.MNISTDataset.Subset.TEST,
+                    format=spn.ImageFormat.BINARY, num_epochs=1,
+                    batch_size=100, shuffle=False)
+                dataset.load_data()
+                self.assertEqual(len(os.listdir(tmp_dir)), num_entries)
+            finally:
+                spn.conf.data_cache_dir = data_cache_dir
+
+    def test_samples_not_in_graph(self):
+        """Samples are read by index instead of being embedded in the graph"""
+        dataset = spn.MNISTDataset(subset=spn.MNISTDataset.Subset.TEST,
+                                   format=spn.ImageFormat.FLOAT, num_epochs=1,
+                                   batch_size=100, shuffle=False)
+        for tf_data_pipeline in [False, True]:
+            with tf.Graph().as_default() as graph:
+                spn.conf.tf_data_pipeline = tf_data_pipeline
+                try:
+                    dataset.get_data()
+                finally:
+                    spn.conf.tf_data_pipeline = False
+                self.assertLess(graph.as_graph_def().ByteSize(),
+                                dataset.samples.nbytes // 100)
+
 
 if __name__ == '__main__':
     tf.test.main()
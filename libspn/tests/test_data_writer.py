@@ -117,6 +117,104 @@ class TestDataWriter(TestCase):
         np.testing.assert_array_almost_equal(data1[0], data2[0])
         np.testing.assert_array_equal(data1[1], data2[1])
 
+    def test_binary_shard_data_writer(self):
+        # Write, with wider string labels in the second write
+        path = self.out_path(self.cid())
+        writer = spn.BinaryShardDataWriter(path, shard_size=3)
+        arr1 = np.arange(10, dtype=np.float32).reshape(5, 2)
+        arr2 = arr1 + 10
+        labels1 = np.array([b'a', b'b', b'c', b'd', b'e'], dtype=object)
+        labels2 = np.array([b'long label'] * 5, dtype=object)
+        writer.write(arr1, labels1)
+        writer.write(arr2, labels2)
+
+        # Read
+        dataset = spn.BinaryShardDataset(path, num_vals=[None] * 2,
+                                         num_epochs=1, batch_size=4,
+                                         shuffle=False,
+                                         allow_smaller_final_batch=True)
+        self.assertEqual(dataset.num_vars, 2)
+        self.assertEqual(dataset.num_labels, 1)
+        self.assertEqual(dataset.num_samples, 10)
+        data = dataset.read_all()
+        np.testing.assert_array_equal(data[0], np.concatenate((arr1, arr2)))
+        np.testing.assert_array_equal(
+            data[1].flatten(), np.concatenate((labels1, labels2)).astype(bytes))
+
+        # Random access, shuffled across shards
+        samples, labels = dataset.read_rows([9, 0, 4])
+        np.testing.assert_array_equal(samples, [[18, 19], [0, 1], [8, 9]])
+        np.testing.assert_array_equal(labels.flatten(),
+                                      [b'long label', b'a', b'e'])
+        dataset = spn.BinaryShardDataset(path, num_vals=[None] * 2,
+                                         num_epochs=2, batch_size=5,
+                                         shuffle=True, seed=10)
+        tf_data_pipeline = spn.conf.tf_data_pipeline
+        spn.conf.tf_data_pipeline = True
+        try:
+            data = dataset.read_all()
+        finally:
+            spn.conf.tf_data_pipeline = tf_data_pipeline
+        self.assertEqual(data[0].shape, (20, 2))
+        np.testing.assert_array_equal(np.sort(data[0][:10], axis=0),
+                                      np.concatenate((arr1, arr2)))
+        self.assertFalse(np.array_equal(data[0][:10],
+                                        np.concatenate((arr1, arr2))))
+        # Labels are shuffled together with samples
+        np.testing.assert_array_equal(data[1].flatten() == b'long label',
+                                      data[0][:, 0] >= 10)
+
+    def test_binary_shard_data_writer_stale_shards(self):
+        """Shard files not listed in the index are overwritten"""
+        path = self.out_path(self.cid())
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, "index.json")):
+            os.remove(os.path.join(path, "index.json"))
+        # Leftovers of an interrupted run, which did not write the index
+        for name in ["shard-00000.samples", "shard-00000.labels"]:
+            with open(os.path.join(path, name), 'wb') as f:
+                f.write(b'stale data')
+        writer = spn.BinaryShardDataWriter(path, shard_size=3)
+        arr = np.arange(10, dtype=np.float32).reshape(5, 2)
+        labels = np.array([1, 2, 3, 4, 5])
+        writer.write(arr[:2], labels[:2])
+        writer.write(arr[2:], labels[2:])
+        dataset = spn.BinaryShardDataset(path, num_vals=[None] * 2,
+                                         num_epochs=1, batch_size=5,
+                                         shuffle=False)
+        samples, out_labels = dataset.read_rows(np.arange(5))
+        np.testing.assert_array_equal(samples, arr)
+        np.testing.assert_array_equal(out_labels.flatten(), labels)
+
+    def test_csv_binary_writeall(self):
+        # Read&write
+        dataset1 = spn.CSVFileDataset(self.data_path("data_int1.csv"),
+                                      num_vals=[None] * 3,
+                                      defaults=[[101], [102], [103.0],
+                                                [104.0], [105.0]],
+                                      num_epochs=1,
+                                      batch_size=4,
+                                      shuffle=False,
+                                      num_labels=2,
+                                      min_after_dequeue=1000,
+                                      num_threads=1,
+                                      allow_smaller_final_batch=True)
+        path = self.out_path(self.cid())
+        writer = spn.BinaryShardDataWriter(path, shard_size=5)
+        data1 = dataset1.read_all()
+        dataset1.write_all(writer)
+
+        # Read again
+        dataset2 = spn.BinaryShardDataset(path, num_vals=[None] * 3,
+                                          num_epochs=1, batch_size=4,
+                                          shuffle=False,
+                                          allow_smaller_final_batch=True)
+        data2 = dataset2.read_all()
+
+        # Compare
+        np.testing.assert_array_almost_equal(data1[0], data2[0])
+        np.testing.assert_array_equal(data1[1], data2[1])
+
     def test_image_gray_float_image_gray_writeall(self):
         # Read and write
         dataset1 = spn.ImageDataset(
@@ -374,6 +374,39 @@ class TestGraph(TestCase):
         self.assertEqual(len(spn.Scope("a", 1) & spn.Scope("b", 1)), 0)
         self.assertEqual(len(spn.Scope("a", 1) | spn.Scope("b", 1)), 2)
 
+    def test_scope_bitset(self):
+        """Scopes of a graph share a registry and merge in groups"""
+        v = spn.IVs(num_vars=3, num_vals=2)
+        s0, s1, s2 = spn.Scope(v, 0), spn.Scope(v, 1), spn.Scope(v, 2)
+        self.assertEqual(sorted(v_id for _, v_id in s2 | s0), [0, 2])
+        self.assertTrue(spn.Scope.disjoint([s0, s1, s2]))
+        self.assertTrue(spn.Scope.disjoint([]))
+        self.assertFalse(spn.Scope.disjoint([s0 | s1, s2, s1]))
+        self.assertListEqual(
+            spn.Scope.merge_scope_groups([s0, s1, s2, s0], [1, 3]),
+            [s0, s0 | s1 | s2])
+        # Registry is held by the graph
+        self.assertIn((v, 1), v._graph_data.scope_vars._bits)
+
+    def test_scope_hash_across_registries(self):
+        """Equal scopes from different registries hash equally"""
+        from libspn.graph.scope import ScopeVars
+
+        class MockNode:
+            pass
+
+        n = MockNode()
+        s_global = spn.Scope(n, 0)
+        # Shift the bit positions in the second registry
+        scope_vars = ScopeVars()
+        scope_vars.bit("pad", 0)
+        n._graph_data = type('MockGraphData', (), {'scope_vars': scope_vars})()
+        s_graph = spn.Scope(n, 0)
+        self.assertEqual(s_global, s_graph)
+        self.assertEqual(hash(s_global), hash(s_graph))
+        self.assertEqual({s_global: 1}[s_graph], 1)
+        self.assertEqual(len({s_global, s_graph}), 1)
+
     def test_gather_input_scopes(self):
         v12 = spn.IVs(num_vars=2, num_vals=4, name="V12")
         v34 = spn.ContVars(num_vars=2, name="V34")
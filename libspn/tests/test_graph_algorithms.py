@@ -280,6 +280,42 @@ class TestGraphAlgorithms(TestCase):
         self.assertIs(nodes[7], None)
         self.assertIs(nodes[8], None)
 
+    def test_schedule_cached_and_invalidated(self):
+        """Schedule is reused until the graph structure changes"""
+        v1 = spn.ContVars(num_vars=1)
+        v2 = spn.ContVars(num_vars=1)
+        v3 = spn.ContVars(num_vars=1)
+        s1 = spn.Sum(v1, v2)
+        s2 = spn.Sum(s1, v3, v3)  # v3 included twice
+
+        schedule1 = s2.get_schedule()
+        self.assertIs(s2.get_schedule(), schedule1)
+        self.assertEqual(len(schedule1), 5)
+        self.assertIs(schedule1.nodes[-1], s2)
+        self.assertLess(schedule1.index[s1], schedule1.index[s2])
+        self.assertLess(schedule1.index[v1], schedule1.index[s1])
+        self.assertEqual(schedule1.parents[schedule1.index[s1]],
+                         [(schedule1.index[s2], 2)])
+        self.assertEqual(schedule1.inputs[schedule1.index[s2]],
+                         (None, None, schedule1.index[s1],
+                          schedule1.index[v3], schedule1.index[v3]))
+        self.assertEqual(schedule1.in_degrees[schedule1.index[v3]], 2)
+        self.assertEqual(schedule1.in_degrees[schedule1.index[s2]], 0)
+
+        # Adding values invalidates the schedule
+        v4 = spn.ContVars(num_vars=1)
+        s1.add_values(v4)
+        schedule2 = s2.get_schedule()
+        self.assertIsNot(schedule2, schedule1)
+        self.assertIn(v4, schedule2.index)
+        self.assertEqual(s2.get_num_nodes(), 6)
+
+        # Setting weights invalidates the schedule
+        spn.generate_weights(s2)
+        self.assertIsNot(s2.get_schedule(), schedule2)
+        self.assertEqual(s2.get_num_nodes(), 8)
+        self.assertEqual(s2.get_num_nodes(skip_params=True), 6)
+
     def test_traversing_on_dense(self):
         """Compare traversal algs on dense SPN"""
         def fun1(node, *args):
@@ -12,6 +12,8 @@ from test import TestCase
 import tensorflow as tf
 import numpy as np
 import itertools
+import json
+import os
 
 
 class TestGraphSaving(TestCase):
@@ -153,5 +155,153 @@ class TestGraphSaving(TestCase):
             self.write_tf_graph(sess, self.sid(), self.cid())
 
 
+    def test_withparams_binary(self):
+        # Build an SPN
+        feed = np.array(list(itertools.product(range(2), repeat=6)))
+        model = spn.DiscreteDenseModel(
+            num_classes=1, num_decomps=1, num_subsets=3,
+            num_mixtures=2, weight_init_value=spn.ValueType.RANDOM_UNIFORM(0, 1))
+        root1 = model.build(num_vars=6, num_vals=2)
+        init1 = spn.initialize_weights(root1)
+        val_marginal1 = root1.get_value(inference_type=spn.InferenceType.MARGINAL)
+
+        with tf.Session() as sess:
+            # Initialize
+            init1.run()
+            out_marginal1 = sess.run(val_marginal1,
+                                     feed_dict={model.sample_ivs: feed})
+
+            # Save
+            path = self.out_path(self.cid() + ".spn")
+            saver = spn.JSONSaver(path, pretty=True, binary_params=True)
+            saver.save(root1, save_param_vals=True)
+
+        # Values are stored in the binary file
+        self.assertTrue(os.path.isfile(path + spn.JSONSaver.PARAMS_SUFFIX))
+        with open(path) as f:
+            data = json.load(f)
+        weights = [d for d in data['nodes'] if d['node_type'] == 'Weights']
+        self.assertTrue(weights)
+        for d in weights:
+            self.assertIn(spn.graph.serialization.PARAM_REF, d['value'])
+
+        # Reset graph
+        tf.reset_default_graph()
+
+        with tf.Session() as sess:
+            # Load
+            loader = spn.JSONLoader(path)
+            root2 = loader.load(load_param_vals=True)
+            ivs2 = loader.find_node('SampleIVs')
+            val_marginal2 = root2.get_value(inference_type=spn.InferenceType.MARGINAL)
+
+            # Check model after loading
+            self.assertTrue(root2.is_valid())
+            out_marginal2 = sess.run(val_marginal2, feed_dict={ivs2: feed})
+            np.testing.assert_array_almost_equal(out_marginal2, out_marginal1)
+
+
+    def test_withparams_lazy(self):
+        # Build an SPN
+        feed = np.array(list(itertools.product(range(2), repeat=6)))
+        model = spn.DiscreteDenseModel(
+            num_classes=1, num_decomps=1, num_subsets=3,
+            num_mixtures=2, weight_init_value=spn.ValueType.RANDOM_UNIFORM(0, 1))
+        root1 = model.build(num_vars=6, num_vals=2)
+        init1 = spn.initialize_weights(root1)
+        val_marginal1 = root1.get_value(inference_type=spn.InferenceType.MARGINAL)
+        weights1 = []
+        spn.traverse_graph(root1, lambda n: weights1.append(n.variable)
+                           if isinstance(n, spn.Weights) else None,
+                           skip_params=False)
+
+        for binary_params in [False, True]:
+            with tf.Session() as sess:
+                init1.run()
+                out_marginal1, weight_vals1 = sess.run(
+                    [val_marginal1, weights1], feed_dict={model.sample_ivs: feed})
+                path = self.out_path(self.cid() + str(binary_params) + ".spn")
+                saver = spn.JSONSaver(path, binary_params=binary_params)
+                saver.save(root1, save_param_vals=True)
+
+            with tf.Graph().as_default() as graph:
+                # Load without a session
+                loader = spn.JSONLoader(path)
+                root2 = loader.load(load_param_vals=True)
+                self.assertIsNotNone(loader.params_initializer)
+                self.assertEqual(len(loader.params_feed_dict), len(weights1))
+                # Values are fed, not embedded as constants
+                for op in graph.get_operations():
+                    if op.type == 'Const':
+                        const = tf.make_ndarray(op.get_attr('value'))
+                        for w in weight_vals1:
+                            self.assertFalse(const.shape == w.shape and
+                                             np.allclose(const, w))
+                ivs2 = loader.find_node('SampleIVs')
+                val_marginal2 = root2.get_value(
+                    inference_type=spn.InferenceType.MARGINAL)
+                with tf.Session() as sess:
+                    loader.initialize_params(sess)
+                    out_marginal2 = sess.run(val_marginal2,
+                                             feed_dict={ivs2: feed})
+                np.testing.assert_array_almost_equal(out_marginal2,
+                                                     out_marginal1)
+
+    def test_withparams_stream(self):
+        # Build an SPN
+        feed = np.array(list(itertools.product(range(2), repeat=6)))
+        model = spn.DiscreteDenseModel(
+            num_classes=1, num_decomps=1, num_subsets=3,
+            num_mixtures=2, weight_init_value=spn.ValueType.RANDOM_UNIFORM(0, 1))
+        root1 = model.build(num_vars=6, num_vals=2)
+        init1 = spn.initialize_weights(root1)
+        val_marginal1 = root1.get_value(inference_type=spn.InferenceType.MARGINAL)
+
+        with tf.Session() as sess:
+            # Initialize
+            init1.run()
+            out_marginal1 = sess.run(val_marginal1,
+                                     feed_dict={model.sample_ivs: feed})
+
+            # Save
+            path = self.out_path(self.cid() + ".spn")
+            saver = spn.JSONSaver(path, pretty=False)
+            saver.save(root1, save_param_vals=True)
+
+        # Nodes are stored one per line in topological order
+        with open(path) as f:
+            lines = f.readlines()
+        data = json.loads(''.join(lines))
+        self.assertTrue(data['topological'])
+        self.assertEqual(len(lines), len(data['nodes']) + 2)
+        self.assertEqual(data['nodes'][-1]['name'], data['root'])
+        seen = set()
+        for d in data['nodes']:
+            for key in ['values', 'weights', 'ivs']:
+                inputs = d.get(key)
+                if inputs is None:
+                    continue
+                if key != 'values':
+                    inputs = [inputs]
+                for name, _ in inputs:
+                    self.assertIn(name, seen)
+            seen.add(d['name'])
+
+        # Reset graph
+        tf.reset_default_graph()
+
+        with tf.Session() as sess:
+            # Load
+            loader = spn.JSONLoader(path)
+            root2 = loader.load(load_param_vals=True)
+            ivs2 = loader.find_node('SampleIVs')
+            val_marginal2 = root2.get_value(inference_type=spn.InferenceType.MARGINAL)
+
+            # Check model after loading
+            self.assertTrue(root2.is_valid())
+            out_marginal2 = sess.run(val_marginal2, feed_dict={ivs2: feed})
+            np.testing.assert_array_almost_equal(out_marginal2, out_marginal1)
+
+
 if __name__ == '__main__':
     tf.test.main()
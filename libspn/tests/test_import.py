@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+from context import libspn as spn
+from test import TestCase
+import tensorflow as tf
+import numpy as np
+import json
+import os
+import subprocess
+import sys
+
+
+class TestImport(TestCase):
+
+    def _loaded_modules(self, code):
+        """Run ``code`` in a new interpreter and return the names of all
+        modules loaded afterwards."""
+        code += "\nimport sys, json\nprint(json.dumps(sorted(sys.modules)))"
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(
+            os.path.dirname(os.path.abspath(spn.__file__))))
+        out = subprocess.check_output([sys.executable, '-c', code], env=env)
+        return set(json.loads(out.decode('utf-8').splitlines()[-1]))
+
+    def test_import_is_lazy(self):
+        """Importing libspn does not import its submodules"""
+        modules = self._loaded_modules("import libspn")
+        self.assertNotIn('tensorflow', modules)
+        for m in ['libspn.graph', 'libspn.data', 'libspn.inference',
+                  'libspn.learning', 'libspn.visual', 'libspn.ops.ops']:
+            self.assertNotIn(m, modules)
+
+    def test_attribute_imports_module(self):
+        """Accessing a name imports only the modules it requires"""
+        modules = self._loaded_modules("import libspn\nlibspn.IVs")
+        self.assertIn('libspn.graph.ivs', modules)
+        self.assertNotIn('libspn.visual', modules)
+        self.assertNotIn('libspn.data', modules)
+
+    def test_frozen_spn_loads_ops(self):
+        """FrozenSPN registers the custom ops used by exported graphs"""
+        model = spn.Poon11NaiveMixtureModel()
+        root = model.build()
+        init = spn.initialize_weights(root)
+        path = self.out_path(self.cid() + ".pb")
+        feed_path = self.out_path(self.cid() + "_feed.npy")
+        np.save(feed_path, model.feed)
+        with self.test_session() as sess:
+            sess.run(init)
+            spn.export_frozen_graph(root, path, sess=sess)
+        modules = self._loaded_modules(
+            "import numpy as np\n"
+            "import libspn\n"
+            "frozen = libspn.FrozenSPN(%r)\n"
+            "frozen.log_value(np.load(%r))\n" % (path, feed_path))
+        self.assertIn('libspn.ops.ops', modules)
+
+    def test_public_names(self):
+        """All public names are available and not shadowed by submodules"""
+        import libspn.session
+        from libspn.session import session
+        from libspn.ops import ops
+        self.assertIs(spn.session, session)
+        self.assertIs(spn.ops, ops)
+        for name in spn.__all__:
+            self.assertIn(name, dir(spn))
+            getattr(spn, name)
+        with self.assertRaises(AttributeError):
+            spn.NoSuchName
+
+
+if __name__ == '__main__':
+    tf.test.main()
@@ -54,6 +54,83 @@ class TestInference(TestCase):
         np.testing.assert_array_almost_equal(out_log_default, model.true_values)
         np.testing.assert_array_almost_equal(out_log_marginal, model.true_values)
 
+    def test_marginalized_value(self):
+        # Generate SPN
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        # Add ops, the second variable is always marginalized
+        init = spn.initialize_weights(model.root)
+        value = spn.Value(spn.InferenceType.MARGINAL,
+                          marginalized=[(model.ivs, 1)])
+        log_value = spn.LogValue(spn.InferenceType.MARGINAL,
+                                 marginalized=[(model.ivs, 1)])
+        val = value.get_value(model.root)
+        log_val = log_value.get_value(model.root)
+        rows = model.feed[:, 1] == -1
+        # Run
+        with tf.Session() as sess:
+            init.run()
+            out = sess.run(val, feed_dict={model.ivs: model.feed[rows]})
+            out_log = sess.run(tf.exp(log_val),
+                               feed_dict={model.ivs: model.feed[rows]})
+
+        # Sums over the second variable are replaced by constants
+        folded = {n.name for n, v in value.values.items()
+                  if v.op.type == 'Fill'}
+        self.assertEqual(folded, {"Sum2.1", "Sum2.2"})
+        np.testing.assert_array_almost_equal(out, model.true_values[rows])
+        np.testing.assert_array_almost_equal(out_log, model.true_values[rows])
+
+    def test_value_node_by_node(self):
+        """Values assembled node by node, e.g. during another traversal"""
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        init = spn.initialize_weights(model.root)
+        value = spn.LogValue(spn.InferenceType.MARGINAL,
+                             marginalized=[(model.ivs, 1)])
+        value.reset(model.root)
+        folded = dict(value.values)
+        self.assertEqual({n.name for n in folded}, {"Sum2.1", "Sum2.2"})
+        log_val = spn.compute_graph_up(model.root, val_fun=value.add_node_value)
+        self.assertIs(value.values[model.root], log_val)
+        for node, v in folded.items():
+            self.assertIs(value.values[node], v)
+        rows = model.feed[:, 1] == -1
+        with self.test_session() as sess:
+            sess.run(init)
+            out = sess.run(tf.exp(log_val),
+                           feed_dict={model.ivs: model.feed[rows]})
+        np.testing.assert_array_almost_equal(out, model.true_values[rows])
+
+    def test_marginalized_value_downward_pass(self):
+        """Values with marginalized variables are rejected by downward passes"""
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        value = spn.Value(marginalized=[model.ivs])
+        log_value = spn.LogValue(marginalized=[model.ivs])
+        with self.assertRaises(ValueError):
+            spn.MPEPath(value=value)
+        with self.assertRaises(ValueError):
+            spn.MPEPath(value=log_value)
+        with self.assertRaises(ValueError):
+            spn.Gradient(value=log_value)
+        with self.assertRaises(ValueError):
+            spn.Sample(value=log_value)
+        # Values without marginalized variables are accepted
+        spn.MPEPath(value=spn.LogValue(marginalized=[]))
+
+    def test_marginalized_mpe_value(self):
+        """Nodes computed with MPE inference are not replaced by constants"""
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        init = spn.initialize_weights(model.root)
+        val = spn.Value(spn.InferenceType.MPE,
+                        marginalized=[model.ivs]).get_value(model.root)
+        with tf.Session() as sess:
+            init.run()
+            out = sess.run(val, feed_dict={model.ivs: [[-1, -1]]})
+        np.testing.assert_array_almost_equal(out, model.true_mpe_values[:1])
+
     def test_mpe_value(self):
         """Calculation of SPN MPE value"""
         # Generate SPN
@@ -181,6 +258,188 @@ class TestInference(TestCase):
         np.testing.assert_array_equal(out.ravel(), model.true_mpe_state)
         np.testing.assert_array_equal(out_log.ravel(), model.true_mpe_state)
 
+    def test_marginal_inferencer(self):
+        # Generate SPN
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        # Add ops
+        init = spn.initialize_weights(model.root)
+        val = model.root.get_value(inference_type=spn.InferenceType.MARGINAL)
+        marginals, = spn.MarginalInferencer().infer(model.root, model.ivs)
+        # Run
+        with tf.Session() as sess:
+            init.run()
+            out = sess.run(marginals, feed_dict={model.ivs: model.feed})
+            out_evidence = sess.run(val, feed_dict={model.ivs: model.feed})
+            # Posterior of each value by setting the value of each variable
+            expected = np.zeros(out.shape)
+            for i in range(model.feed.shape[1]):
+                for v in range(2):
+                    feed = model.feed.copy()
+                    feed[:, i] = np.where(feed[:, i] < 0, v, feed[:, i])
+                    out_joint = sess.run(val, feed_dict={model.ivs: feed})
+                    expected[:, i, v] = np.where(
+                        model.feed[:, i] < 0,
+                        out_joint[:, 0] / out_evidence[:, 0],
+                        model.feed[:, i] == v)
+
+        self.assertEqual(out.shape, (model.feed.shape[0], 2, 2))
+        np.testing.assert_array_almost_equal(out, expected)
+
+    def test_marginal_queries(self):
+        # Generate SPN
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        # Add ops
+        init = spn.initialize_weights(model.root)
+        queries = spn.MarginalQueries(model.ivs)
+        val = queries.get_value(model.root)
+        evidence = np.array([1, 0])
+        masks = np.array([[False, False], [True, False],
+                          [False, True], [True, True]])
+        # Run
+        with tf.Session() as sess:
+            init.run()
+            out = sess.run(val, feed_dict=queries.feed_dict(
+                {model.ivs: evidence}, masks))
+
+        # Compare with the values for the evidence with marginalized variables
+        feed = np.where(masks, -1, evidence)
+        expected = [model.true_values[np.all(model.feed == f, axis=1)][0, 0]
+                    for f in feed]
+        self.assertEqual(out.shape, (len(masks),))
+        np.testing.assert_array_almost_equal(np.exp(out), expected)
+
+    def test_marginal_queries_nodes_unmodified(self):
+        """Variable nodes are not modified if invalid or not attached"""
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        feed = model.ivs.feed
+        with self.assertRaises(spn.StructureError):
+            spn.MarginalQueries(model.ivs, spn.ContVars(num_vars=1))
+        self.assertIs(model.ivs.feed, feed)
+        queries = spn.MarginalQueries(model.ivs, attach=False)
+        self.assertIs(model.ivs.feed, feed)
+        self.assertEqual(list(queries.feeds), [model.ivs])
+        queries.attach()
+        self.assertIs(model.ivs.feed, queries.feeds[model.ivs])
+
+    def test_sample(self):
+        # Generate SPN
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        # Add ops
+        init = spn.initialize_weights(model.root)
+        val = model.root.get_value(inference_type=spn.InferenceType.MARGINAL)
+        sample, = spn.Sample().get_sample(model.root, model.ivs)
+        num_samples = 20000
+        states = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+        # Run
+        with tf.Session() as sess:
+            init.run()
+            out = sess.run(sample, feed_dict={
+                model.ivs: np.full((num_samples, 2), -1)})
+            out_cond = sess.run(sample, feed_dict={
+                model.ivs: np.tile([[1, -1]], (num_samples, 1))})
+            out_joint = sess.run(val, feed_dict={model.ivs: states})[:, 0]
+
+        # Empirical distribution of samples matches the SPN
+        self.assertEqual(out.shape, (num_samples, 2))
+        freq = np.array([np.mean(np.all(out == s, axis=1)) for s in states])
+        np.testing.assert_allclose(freq, out_joint, atol=0.02)
+        # Conditioned on evidence
+        np.testing.assert_array_equal(out_cond[:, 0], 1)
+        freq_cond = np.array([np.mean(out_cond[:, 1] == v) for v in range(2)])
+        np.testing.assert_allclose(
+            freq_cond, out_joint[2:] / out_joint[2:].sum(), atol=0.02)
+
+    def test_top_k_mpe_state(self):
+        # Generate SPN
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        # Add ops
+        init = spn.initialize_weights(model.root)
+        k = 3
+        (ivs_states,), scores = spn.TopKMPEState(k).get_state(
+            model.root, model.ivs)
+        feed = np.array([[-1, -1], [0, -1]])
+        # Run
+        with tf.Session() as sess:
+            init.run()
+            out_states, out_scores = sess.run(
+                [ivs_states, scores], feed_dict={model.ivs: feed})
+
+        # Values and states of all explanations by brute force, the
+        # components are (weight, Sum1.x weights, Sum2.x weights)
+        components = [(0.5, [0.4, 0.6], [0.7, 0.3]),
+                      (0.2, [0.4, 0.6], [0.8, 0.2]),
+                      (0.3, [0.1, 0.9], [0.8, 0.2])]
+        self.assertEqual(out_states.shape, (2, k, 2))
+        self.assertEqual(out_scores.shape, (2, k))
+        for row, evidence in enumerate(feed):
+            explanations = sorted(
+                [(w * w1[a] * w2[b], (a, b))
+                 for w, w1, w2 in components
+                 for a in range(2) for b in range(2)
+                 if evidence[0] in (-1, a) and evidence[1] in (-1, b)],
+                reverse=True)
+            # The scores are sorted and the two best explanations are exact
+            self.assertTrue(np.all(np.diff(out_scores[row]) <= 0))
+            for j in range(2):
+                self.assertAlmostEqual(np.exp(out_scores[row, j]),
+                                       explanations[j][0], places=5)
+                np.testing.assert_array_equal(out_states[row, j],
+                                              explanations[j][1])
+            # Further explanations exist
+            for j in range(2, k):
+                self.assertTrue(any(
+                    np.isclose(np.exp(out_scores[row, j]), v) and
+                    tuple(out_states[row, j]) == s
+                    for v, s in explanations))
+        np.testing.assert_array_equal(out_states[0, 0], model.true_mpe_state)
+
+    def test_top_k_mpe_state_shared_sum(self):
+        """Top-k scores of a sum reached twice by the MPE path"""
+        ivs = spn.IVs(num_vars=1, num_vals=2)
+        s = spn.Sum(ivs)
+        s.generate_weights([0.7, 0.3])
+        root = spn.Product(s, s)
+        init = spn.initialize_weights(root)
+        (ivs_states,), scores = spn.TopKMPEState(2).get_state(root, ivs)
+        with self.test_session() as sess:
+            init.run()
+            out_states, out_scores = sess.run(
+                [ivs_states, scores], feed_dict={ivs: [[-1]]})
+        # Both occurrences of the sum deviate
+        self.assertAllClose(np.exp(out_scores), [[0.49, 0.09]])
+        np.testing.assert_array_equal(out_states, [[[0], [1]]])
+
+    def test_mpe_path_single_pass(self):
+        """MPE path assembled with the values in a single pass"""
+        model = spn.Poon11NaiveMixtureModel()
+        model.build()
+        init = spn.initialize_weights(model.root)
+        # Values assembled separately
+        value = spn.LogValue(spn.InferenceType.MPE)
+        value.get_value(model.root)
+        mpe_path_separate = spn.MPEPath(value=value)
+        mpe_path_separate.get_mpe_path(model.root)
+        # Values assembled in the same pass
+        mpe_path_fused = spn.MPEPath(value_inference_type=spn.InferenceType.MPE)
+        visited = []
+        mpe_path_fused.get_mpe_path(
+            model.root, counts_fun=lambda node, counts: visited.append(node))
+        self.assertIn(model.root, mpe_path_fused.value.values)
+        self.assertEqual(set(visited), set(mpe_path_fused.counts))
+        self.assertIs(visited[0], model.root)
+        with self.test_session() as sess:
+            sess.run(init)
+            for node in [model.ivs, model.root.weights.node]:
+                out_separate, out_fused = sess.run(
+                    [mpe_path_separate.counts[node], mpe_path_fused.counts[node]],
+                    feed_dict={model.ivs: model.feed})
+                np.testing.assert_array_almost_equal(out_separate, out_fused)
+
 
 if __name__ == '__main__':
     tf.test.main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+from context import libspn as spn
+from test import TestCase
+from parameterized import parameterized
+import tensorflow as tf
+import numpy as np
+import pickle
+import random
+
+
+class TestCompiledSPN(TestCase):
+
+    NodeType = spn.DenseSPNGeneratorLayerNodes.NodeType
+
+    def _dense_spn(self, node_type, num_vars=6, num_vals=3):
+        ivs = spn.IVs(num_vars=num_vars, num_vals=num_vals)
+        gen = spn.DenseSPNGeneratorLayerNodes(
+            num_decomps=2, num_subsets=2, num_mixtures=2,
+            input_dist=spn.DenseSPNGeneratorLayerNodes.InputDist.MIXTURE,
+            num_input_mixtures=num_vals, node_type=node_type)
+        root = gen.generate(ivs, rnd=random.Random(1234))
+        spn.generate_weights(root, init_value=spn.ValueType.RANDOM_UNIFORM(),
+                             log=True)
+        return ivs, root
+
+    def _feed(self, num_vars=6, num_vals=3, batch_size=20):
+        return np.random.RandomState(0).randint(
+            -1, num_vals, size=(batch_size, num_vars))
+
+    @parameterized.expand([(t.name, t) for t in NodeType])
+    def test_log_value(self, _, node_type):
+        """Compiled log values match LogValue"""
+        ivs, root = self._dense_spn(node_type)
+        init = spn.initialize_weights(root)
+        log_val = {t: spn.LogValue(t).get_value(root)
+                   for t in spn.InferenceType}
+        feed = self._feed()
+        with self.test_session() as sess:
+            sess.run(init)
+            compiled = spn.CompiledSPN(root, sess=sess)
+            for t, v in log_val.items():
+                out = sess.run(v, feed_dict={ivs: feed})
+                self.assertAllClose(
+                    compiled.log_value(feed, inference_type=t), out)
+                self.assertAllClose(
+                    compiled.log_value({ivs: feed[:5]}, inference_type=t),
+                    out[:5])
+
+    @parameterized.expand([(t.name, t) for t in NodeType])
+    def test_mpe_state(self, _, node_type):
+        """Compiled MPE states match MPEState"""
+        ivs, root = self._dense_spn(node_type)
+        init = spn.initialize_weights(root)
+        state, = spn.MPEState(
+            value_inference_type=spn.InferenceType.MPE).get_state(root, ivs)
+        feed = self._feed()
+        with self.test_session() as sess:
+            sess.run(init)
+            compiled = spn.CompiledSPN(root, sess=sess)
+            out = sess.run(state, feed_dict={ivs: feed})
+        compiled_state, = compiled.mpe_state(
+            feed, ivs, inference_type=spn.InferenceType.MPE)
+        np.testing.assert_array_equal(compiled_state, out)
+
+    def test_gaussian_leaf(self):
+        """Compiled Gaussian leaves with evidence given as NaN"""
+        leaf = spn.GaussianLeaf(num_vars=2, num_components=2,
+                                loc_init=np.array([[0., 1.], [2., 3.]]))
+        prods = spn.PermProducts((leaf, [0, 1]), (leaf, [2, 3]))
+        root = spn.Sum(prods)
+        root.generate_weights(init_value=spn.ValueType.RANDOM_UNIFORM())
+        init = [spn.initialize_weights(root)] + list(leaf.initialize())
+        log_val = root.get_log_value()
+        state, = spn.MPEState(
+            value_inference_type=spn.InferenceType.MPE).get_state(root, leaf)
+        feed = np.array([[0.5, 2.2], [1.1, np.nan], [np.nan, np.nan]])
+        with self.test_session() as sess:
+            sess.run(init)
+            compiled = spn.CompiledSPN(root, sess=sess)
+            out_val, out_state = sess.run(
+                [log_val, state],
+                feed_dict={leaf: np.nan_to_num(feed),
+                           leaf.evidence: ~np.isnan(feed)})
+        self.assertAllClose(compiled.log_value(feed), out_val)
+        compiled_state, = compiled.mpe_state(
+            feed, inference_type=spn.InferenceType.MPE)
+        self.assertAllClose(compiled_state, out_state)
+
+    def test_gaussian_leaf_round_trip(self):
+        """Compiled Gaussian leaves survive pickling, but are rejected when
+        compiling from a serialized graph"""
+        leaf = spn.GaussianLeaf(num_vars=2, num_components=2,
+                                loc_init=np.array([[0., 1.], [2., 3.]]),
+                                softplus_scale=True)
+        prods = spn.PermProducts((leaf, [0, 1]), (leaf, [2, 3]))
+        root = spn.Sum(prods)
+        root.generate_weights(init_value=spn.ValueType.RANDOM_UNIFORM())
+        init = [spn.initialize_weights(root)] + list(leaf.initialize())
+        log_val = root.get_log_value()
+        feed = np.array([[0.5, 2.2], [1.1, np.nan]])
+        with self.test_session() as sess:
+            sess.run(init)
+            compiled = spn.CompiledSPN(root, sess=sess)
+            out_val = sess.run(log_val,
+                               feed_dict={leaf: np.nan_to_num(feed),
+                                          leaf.evidence: ~np.isnan(feed)})
+            data = spn.serialize_graph(root, sess=sess)
+        unpickled = pickle.loads(pickle.dumps(compiled))
+        self.assertAllClose(unpickled.log_value(feed), out_val)
+        with self.assertRaisesRegex(spn.StructureError, leaf.name):
+            spn.CompiledSPN.from_serialized(data)
+
+    def test_serialized_and_pickled(self):
+        """Compiling from a serialized graph and pickling"""
+        ivs, root = self._dense_spn(self.NodeType.BLOCK)
+        init = spn.initialize_weights(root)
+        log_val = root.get_log_value()
+        feed = self._feed()
+        with self.test_session() as sess:
+            sess.run(init)
+            out = sess.run(log_val, feed_dict={ivs: feed})
+            data = spn.serialize_graph(root, sess=sess)
+        compiled = spn.CompiledSPN.from_serialized(data)
+        self.assertEqual(compiled.var_names, [ivs.name])
+        self.assertAllClose(compiled.log_value(feed), out)
+        unpickled = pickle.loads(pickle.dumps(compiled))
+        self.assertAllClose(unpickled.log_value({ivs.name: feed}), out)
+
+    def test_serialized_binary_params(self):
+        """Compiling from a graph saved with parameters in a binary file"""
+        ivs, root = self._dense_spn(self.NodeType.BLOCK)
+        init = spn.initialize_weights(root)
+        log_val = root.get_log_value()
+        feed = self._feed()
+        path = self.out_path(self.cid() + ".spn")
+        params_file = path + spn.JSONSaver.PARAMS_SUFFIX
+        with self.test_session() as sess:
+            sess.run(init)
+            out = sess.run(log_val, feed_dict={ivs: feed})
+            spn.JSONSaver(path, pretty=True, binary_params=True).save(root)
+            data = spn.serialize_graph(root, sess=sess,
+                                       params_file=params_file)
+        # Path stored by serialize_graph
+        self.assertEqual(data['params_file'], params_file)
+        compiled = spn.CompiledSPN.from_serialized(data)
+        self.assertAllClose(compiled.log_value(feed), out)
+        # Path relative to the saved file must be given
+        saved = spn.utils.json_load(path)
+        with self.assertRaises(ValueError):
+            spn.CompiledSPN.from_serialized(saved)
+        compiled = spn.CompiledSPN.from_serialized(saved,
+                                                   params_file=params_file)
+        self.assertAllClose(compiled.log_value(feed), out)
+        unpickled = pickle.loads(pickle.dumps(compiled))
+        self.assertAllClose(unpickled.log_value(feed), out)
+
+    def test_saved_without_session(self):
+        """No binary file is referenced if parameters were not saved"""
+        ivs, root = self._dense_spn(self.NodeType.BLOCK)
+        path = self.out_path(self.cid() + ".spn")
+        spn.JSONSaver(path, pretty=True, binary_params=True).save(root)
+        self.assertNotIn('params_file', spn.utils.json_load(path))
+
+    def test_batch_log_likelihood(self):
+        """Batch log likelihood sharded over worker processes"""
+        ivs, root = self._dense_spn(self.NodeType.LAYER)
+        init = spn.initialize_weights(root)
+        log_val = root.get_log_value()
+        feed = self._feed(batch_size=1003)
+        with self.test_session() as sess:
+            sess.run(init)
+            out = sess.run(log_val, feed_dict={ivs: feed})
+            compiled = spn.CompiledSPN(root, sess=sess)
+            out_single = spn.batch_log_likelihood(
+                root, {ivs: feed}, num_workers=1, batch_size=100, sess=sess)
+        out_pool = spn.batch_log_likelihood(
+            compiled, feed, num_workers=3, batch_size=100)
+        self.assertAllClose(out_single, out)
+        self.assertAllClose(out_pool, out)
+
+
+if __name__ == '__main__':
+    tf.test.main()
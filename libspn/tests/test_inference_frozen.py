@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+from context import libspn as spn
+from test import TestCase
+import tensorflow as tf
+import numpy as np
+import os
+import subprocess
+import sys
+
+
+class TestFrozenSPN(TestCase):
+
+    def test_export_and_load(self):
+        """Exported log values and MPE states match the SPN"""
+        model = spn.Poon11NaiveMixtureModel()
+        root = model.build()
+        ivs = model.ivs
+        init = spn.initialize_weights(root)
+        log_val = root.get_log_value()
+        mpe_state = spn.MPEState().get_state(root, ivs)
+        feed = model.feed
+        path = self.out_path(self.cid() + ".pb")
+        with self.test_session() as sess:
+            sess.run(init)
+            out_val, out_state = sess.run([log_val, mpe_state[0]],
+                                          feed_dict={ivs: feed})
+            spn.export_frozen_graph(root, path, sess=sess)
+
+        frozen = spn.FrozenSPN(path)
+        try:
+            self.assertEqual(frozen.root_name, root.name)
+            self.assertEqual(frozen.var_names, [ivs.name])
+            # No variables are created when loading
+            self.assertFalse(
+                frozen.graph.get_collection(tf.GraphKeys.GLOBAL_VARIABLES))
+            self.assertAllClose(frozen.log_value(feed), out_val)
+            self.assertAllClose(frozen.log_value({ivs.name: feed[:5]}),
+                                out_val[:5])
+            self.assertAllEqual(frozen.mpe_state(feed)[0], out_state)
+            self.assertAllEqual(frozen.mpe_state(feed, ivs.name)[0], out_state)
+            with self.assertRaises(ValueError):
+                frozen.mpe_state(feed, "NoSuchNode")
+        finally:
+            frozen.close()
+
+    def test_load_in_new_process(self):
+        """Exported graphs with custom ops load in a fresh interpreter"""
+        model = spn.Poon11NaiveMixtureModel()
+        root = model.build()
+        init = spn.initialize_weights(root)
+        log_val = root.get_log_value()
+        path = self.out_path(self.cid() + ".pb")
+        feed_path = self.out_path(self.cid() + "_feed.npy")
+        out_path = self.out_path(self.cid() + "_out.npy")
+        np.save(feed_path, model.feed)
+        with self.test_session() as sess:
+            sess.run(init)
+            out_val = sess.run(log_val, feed_dict={model.ivs: model.feed})
+            spn.export_frozen_graph(root, path, sess=sess)
+        # Custom ops are used with the default configuration
+        graph_def = tf.GraphDef()
+        with open(path, 'rb') as f:
+            graph_def.ParseFromString(f.read())
+        self.assertTrue({'GatherColumns', 'ScatterColumns', 'ScatterValues'} &
+                        {n.op for n in graph_def.node})
+
+        code = ("import sys\n"
+                "import numpy as np\n"
+                "import libspn as spn\n"
+                "frozen = spn.FrozenSPN(sys.argv[1])\n"
+                "np.save(sys.argv[3], frozen.log_value(np.load(sys.argv[2])))\n")
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(
+            os.path.dirname(os.path.abspath(spn.__file__))))
+        subprocess.check_call(
+            [sys.executable, '-c', code, path, feed_path, out_path], env=env)
+        self.assertAllClose(np.load(out_path), out_val)
+
+
+if __name__ == '__main__':
+    tf.test.main()
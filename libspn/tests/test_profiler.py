@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+from context import libspn as spn
+from test import TestCase
+import tensorflow as tf
+import numpy as np
+import json
+
+
+class TestProfiler(TestCase):
+
+    def test_profile_nodes(self):
+        """Profiling maps TF ops to SPN nodes"""
+        ivs = spn.IVs(num_vars=2, num_vals=2, name="IVs")
+        sums = spn.Sums((ivs, [0, 1]), (ivs, [2, 3]), num_sums=2, name="Sums")
+        prod = spn.Product(sums, name="Prod")
+        root = spn.Sum(prod, name="Root")
+        spn.generate_weights(root)
+        init = spn.initialize_weights(root)
+        log_val = root.get_log_value()
+        mpe_path = spn.MPEPath(log=True)
+        mpe_path.get_mpe_path(root)
+        feed = {ivs: np.array([[0, 1], [-1, 0]])}
+        with self.test_session() as sess:
+            sess.run(init)
+            report = spn.profile_nodes(
+                root, [log_val, mpe_path.counts[ivs]], feed_dict=feed,
+                sess=sess, num_runs=2)
+
+        self.assertEqual(report.num_runs, 2)
+        profiles = {p.name: p for p in report.nodes}
+        for node in [sums, prod, root]:
+            self.assertIn(node.name, profiles)
+            self.assertEqual(profiles[node.name].type, type(node).__name__)
+            self.assertGreater(profiles[node.name].num_ops, 0)
+        times = [p.time_micros for p in report.nodes]
+        self.assertListEqual(times, sorted(times, reverse=True))
+        self.assertAlmostEqual(report.total_time_micros, sum(times))
+
+        types = {p.type: p for p in report.by_type()}
+        self.assertEqual(types["Sum"].num_ops, profiles[root.name].num_ops)
+        self.assertIsNone(types["Sum"].name)
+
+        self.assertIn(sums.name, report.to_table())
+        self.assertNotIn(sums.name, report.to_table(by_type=True))
+        data = json.loads(report.to_json())
+        self.assertEqual(data['num_runs'], 2)
+        self.assertEqual(len(data['nodes']), len(report.nodes))
+        self.assertEqual(len(data['types']), len(types))
+
+
+    def test_profile_reentered_scopes(self):
+        """Ops in re-entered scopes are mapped to the node that opened them"""
+        ivs = spn.IVs(num_vars=1, num_vals=2)
+        sum1 = spn.Sum(ivs)
+        sum2 = spn.Sum(ivs)
+        root = spn.Sum(sum1, sum2)
+        self.assertEqual((sum1.name, sum2.name), ("Sum", "Sum_1"))
+        x = tf.cast(ivs.feed, tf.float32)
+        with tf.name_scope("Pass"):
+            with sum1.inference_scope() as scope:
+                a = tf.identity(x)
+            self.assertEqual(scope, "Pass/Sum/")
+            # Re-entered scope of sum1 is unique-named after sum2
+            with sum1.inference_scope() as scope:
+                b = tf.identity(x)
+            self.assertEqual(scope, "Pass/Sum_1/")
+            with sum2.inference_scope():
+                c = tf.identity(x)
+        with self.test_session() as sess:
+            report = spn.profile_nodes(root, [a, b, c],
+                                       feed_dict={ivs: [[0]]}, sess=sess)
+        profiles = {p.name: p for p in report.nodes}
+        self.assertEqual(profiles[sum1.name].num_ops, 2)
+        self.assertEqual(profiles[sum2.name].num_ops, 1)
+
+if __name__ == '__main__':
+    tf.test.main()
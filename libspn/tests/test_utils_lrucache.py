@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# ------------------------------------------------------------------------
+# Copyright (C) 2016-2017 Andrzej Pronobis - All Rights Reserved
+#
+# This file is part of LibSPN. Unauthorized use or copying of this file,
+# via any medium is strictly prohibited. Proprietary and confidential.
+# ------------------------------------------------------------------------
+
+from context import libspn as spn
+from test import TestCase
+import tensorflow as tf
+import gc
+
+
+class TestLRUCache(TestCase):
+
+    def test_hits_and_misses(self):
+        """Repeated calls are answered from the cache"""
+        @spn.utils.lru_cache
+        def add_one(t):
+            return t + 1
+
+        with tf.Graph().as_default():
+            t1 = tf.constant(1.0)
+            t2 = tf.constant(2.0)
+            a = add_one(t1)
+            self.assertIs(add_one(t1), a)
+            self.assertIsNot(add_one(t2), a)
+            info = add_one.cache_info()
+            self.assertEqual(info.hits, 1)
+            self.assertEqual(info.misses, 2)
+            self.assertEqual(info.currsize, 2)
+            self.assertIn(add_one.__qualname__, spn.utils.lru_cache_info())
+
+            add_one.cache_clear()
+            self.assertEqual(add_one.cache_info(), (0, 0, None, 0))
+            self.assertIsNot(add_one(t1), a)
+
+    def test_graph_scoped(self):
+        """Cached values are kept per graph and released with the graph"""
+        calls = [0]
+
+        @spn.utils.lru_cache
+        def fun(x):
+            calls[0] += 1
+            return tf.constant(x)
+
+        g1 = tf.Graph()
+        with g1.as_default():
+            c1 = fun(1)
+        with tf.Graph().as_default():
+            c2 = fun(1)
+        self.assertIsNot(c1, c2)
+        self.assertIs(c1.graph, g1)
+        self.assertEqual(calls[0], 2)
+
+        del c1, c2, g1
+        gc.collect()
+        self.assertEqual(fun.cache_info().currsize, 0)
+
+    def test_maxsize(self):
+        """Least recently used values are evicted"""
+        calls = []
+
+        @spn.utils.lru_cache(maxsize=2)
+        def fun(x):
+            calls.append(x)
+            return x
+
+        with tf.Graph().as_default():
+            fun(1)
+            fun(2)
+            fun(1)  # 2 is now least recently used
+            fun(3)  # Evicts 2
+            fun(1)
+            fun(2)
+            self.assertEqual(calls, [1, 2, 3, 2])
+            self.assertEqual(fun.cache_info().currsize, 2)
+            self.assertEqual(fun.cache_info().maxsize, 2)
+
+    def test_disabled(self):
+        """No caching when memoization is disabled"""
+        @spn.utils.lru_cache
+        def fun(x):
+            return [x]
+
+        memoization = spn.conf.memoization
+        spn.conf.memoization = False
+        try:
+            with tf.Graph().as_default():
+                self.assertIsNot(fun(1), fun(1))
+                self.assertEqual(fun.cache_info().misses, 0)
+        finally:
+            spn.conf.memoization = memoization
+
+
+if __name__ == '__main__':
+    tf.test.main()
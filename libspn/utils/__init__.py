@@ -9,12 +9,15 @@
 
 from .utils import decode_bytes_array
 from .lrucache import lru_cache
+from .lrucache import lru_cache_info
+from .lrucache import lru_cache_clear
 from .math import gather_cols
 from .math import gather_cols_3d
 from .math import scatter_cols
 from .math import scatter_values
 from .math import ValueType
 from .math import broadcast_value
+from .math import gumbel_noise
 from .math import normalize_tensor
 from .math import normalize_tensor_2D
 from .math import normalize_log_tensor_2D
@@ -34,12 +37,15 @@ from .doc import docinherit
 from .serialization import register_serializable
 from .serialization import json_dumps, json_loads
 from .serialization import json_dump, json_load
+from .serialization import json_dump_stream, json_load_stream
 from .serialization import str2type, type2str
 from .enum import Enum
 
 # All
-__all__ = ['decode_bytes_array', 'scatter_cols', 'scatter_values',
+__all__ = ['decode_bytes_array', 'lru_cache', 'lru_cache_info',
+           'lru_cache_clear', 'scatter_cols', 'scatter_values',
            'gather_cols', 'gather_cols_3d', 'ValueType', 'broadcast_value',
+           'gumbel_noise',
            'normalize_tensor', 'normalize_tensor_2D', 'normalize_log_tensor_2D',
            'reduce_log_sum', 'reduce_log_sum_3D', 'concat_maybe', 'split_maybe',
            'StirlingNumber', 'StirlingRatio', 'Stirling', 'random_partition',
@@ -49,5 +55,6 @@ __all__ = ['decode_bytes_array', 'scatter_cols', 'scatter_values',
            'docinherit',
            'register_serializable',
            'json_dumps', 'json_loads', 'json_dump', 'json_load',
+           'json_dump_stream', 'json_load_stream',
            'str2type', 'type2str',
            'Enum']
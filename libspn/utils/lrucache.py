@@ -1,6 +1,17 @@
+from collections import namedtuple, OrderedDict
+import functools
+import weakref
+import tensorflow as tf
 import libspn as spn
 
 
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+"""Statistics of a memoized function returned by ``cache_info()``."""
+
+_cached_functions = []
+"""List of all functions memoized with :meth:`lru_cache`."""
+
+
 class _HashedSeq(list):
     """ This class guarantees that hash() will be called no more than once
         per element.  This is important because the memoize() will hash
@@ -48,25 +59,103 @@ def _make_key(args, kwds, typed, kwd_mark=(object(),),
     return _HashedSeq(key)
 
 
-def lru_cache(f):
+def _graph_caches(tf_graph):
+    """Get the dictionary of caches of memoized functions attached to the TF
+    graph, installing a new one if the graph does not have one yet. Since the
+    caches are stored in the graph, they are released together with it."""
+    try:
+        return tf_graph.spn_lru_caches
+    except AttributeError:
+        tf_graph.spn_lru_caches = {}
+        return tf_graph.spn_lru_caches
+
+
+def lru_cache(f=None, maxsize=None):
     """Can be used as a decorator for least-recently used caching. This is helpful when traversing
     some edges several times during construction of the SPN, but also for reusing Tensors defined
     in upward computation vs. downward computation.
 
+    Return values are cached separately for each TF graph, using the default
+    graph at the time of the call, and are released once the graph is deleted.
+    Can be used both as ``@lru_cache`` and ``@lru_cache(maxsize=...)``.
+
+    The wrapped function provides ``cache_info()``, returning a
+    :class:`CacheInfo` with the number of hits and misses and the number of
+    cached values in all live graphs, and ``cache_clear()``, removing all
+    cached values and resetting the statistics.
+
     Args:
         f (function): A function f(*args, **kwargs) to memoize.
+        maxsize (int): Maximum number of values cached for each TF graph. If
+            ``None``, :obj:`~libspn.conf.memoization_maxsize` is used.
 
     Returns:
         A wrapped function with same behavior with f but added memoization.
     """
-    memo = {}
+    if f is None:
+        return functools.partial(lru_cache, maxsize=maxsize)
+
+    graphs = weakref.WeakSet()  # TF graphs with a cache for f
+    stats = [0, 0]  # Hits, misses
+
+    def get_maxsize():
+        return spn.conf.memoization_maxsize if maxsize is None else maxsize
 
     def helper(*args, **kwargs):
         if not spn.conf.memoization:
             return f(*args, **kwargs)
+        tf_graph = tf.get_default_graph()
+        caches = _graph_caches(tf_graph)
+        try:
+            memo = caches[helper]
+        except KeyError:
+            memo = caches[helper] = OrderedDict()
+            graphs.add(tf_graph)
         key = _make_key(args, kwargs, typed=True)
-        if key not in memo:
-            memo[key] = f(*args, **kwargs)
-        return memo[key]
+        try:
+            val = memo[key]
+        except KeyError:
+            stats[1] += 1
+            val = memo[key] = f(*args, **kwargs)
+            limit = get_maxsize()
+            if limit is not None:
+                while len(memo) > limit:
+                    memo.popitem(last=False)
+        else:
+            stats[0] += 1
+            memo.move_to_end(key)
+        return val
+
+    def cache_info():
+        return CacheInfo(hits=stats[0], misses=stats[1], maxsize=get_maxsize(),
+                         currsize=sum(len(g.spn_lru_caches.get(helper, ()))
+                                      for g in graphs))
+
+    def cache_clear():
+        for g in list(graphs):
+            g.spn_lru_caches.pop(helper, None)
+        graphs.clear()
+        stats[0] = stats[1] = 0
+
+    functools.update_wrapper(helper, f)
+    helper.cache_info = cache_info
+    helper.cache_clear = cache_clear
+    _cached_functions.append(helper)
+    return helper
+
+
+def lru_cache_info():
+    """Get the statistics of all functions memoized with :meth:`lru_cache`.
+
+    Returns:
+        dict: A dictionary of :class:`CacheInfo` indexed by the qualified name
+        of the memoized function.
+    """
+    return {fun.__qualname__: fun.cache_info() for fun in _cached_functions}
+
 
-    return helper
\ No newline at end of file
+def lru_cache_clear():
+    """Clear the caches and statistics of all functions memoized with
+    :meth:`lru_cache`."""
+    for fun in _cached_functions:
+        fun.cache_clear()
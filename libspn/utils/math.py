@@ -436,6 +436,29 @@ def broadcast_value(value, shape, dtype, name=None):
         return tensor
 
 
+def gumbel_noise(shape, dtype=None, name=None):
+    """Generate samples from the standard Gumbel distribution. Adding the
+    samples to log probabilities and taking the argmax draws a sample from the
+    categorical distribution given by the probabilities (the Gumbel-max
+    trick).
+
+    Args:
+        shape: The shape of the output.
+        dtype: The type of the output. If ``None``, ``conf.dtype`` is used.
+
+    Return:
+        Tensor: A tensor containing the samples.
+    """
+    if dtype is None:
+        dtype = conf.dtype
+    with tf.name_scope(name, "gumbel_noise"):
+        # Avoid log(0) by sampling from [tiny, 1)
+        uniform = tf.random_uniform(
+            shape=shape, minval=np.finfo(tf.as_dtype(dtype).as_numpy_dtype).tiny,
+            maxval=1.0, dtype=dtype)
+        return -tf.log(-tf.log(uniform))
+
+
 def normalize_tensor(tensor, name=None):
     """Normalize the tensor so that all elements sum to 1.
 
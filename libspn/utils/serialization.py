@@ -95,3 +95,66 @@ def json_load(path):
     """Load data from a JSON file."""
     with open(path, 'r') as json_file:
         return json.load(json_file, object_hook=_decode_json)
+
+
+def json_dump_stream(path, header, key, items):
+    """Dump data into a JSON file, such that the file can be read
+    incrementally using :func:`json_load_stream`. The data is a dictionary
+    containing the entries of ``header`` followed by the list ``key`` of
+    ``items``, with each item stored in a separate line.
+
+    Args:
+        path (str): Path to the file.
+        header (dict): Entries of the data other than the list.
+        key (str): Key of the list.
+        items (iterable): Items of the list.
+    """
+    with open(path, 'w') as json_file:
+        # Header without the closing brace
+        json_file.write(json.dumps(header, default=_encode_json)[:-1])
+        if header:
+            json_file.write(', ')
+        json_file.write(json.dumps(key) + ': [\n')
+        for i, item in enumerate(items):
+            if i > 0:
+                json_file.write(',\n')
+            json_file.write(json.dumps(item, default=_encode_json))
+        json_file.write('\n]}\n')
+
+
+def _iter_stream_items(json_file):
+    """Decode the list items stored one per line in an open JSON file."""
+    with json_file:
+        for line in json_file:
+            line = line.rstrip()
+            if line == ']}':
+                return
+            if line:
+                yield json.loads(line.rstrip(','), object_hook=_decode_json)
+
+
+def json_load_stream(path, key):
+    """Load data from a JSON file, reading the list ``key`` incrementally if
+    the file was written by :func:`json_dump_stream`. Other JSON files are
+    loaded at once.
+
+    Args:
+        path (str): Path to the file.
+        key (str): Key of the list.
+
+    Returns:
+        tuple: A dictionary with all the entries of the data except the list,
+        and an iterator over the items of the list.
+    """
+    json_file = open(path, 'r')
+    first_line = json_file.readline()
+    opening = json.dumps(key) + ': [\n'
+    if not first_line.endswith(opening):
+        # Not written by json_dump_stream
+        with json_file:
+            json_file.seek(0)
+            data = json.load(json_file, object_hook=_decode_json)
+        return data, iter(data.pop(key))
+    header = first_line[:-len(opening)].rstrip(', ') + '}'
+    return (json.loads(header, object_hook=_decode_json),
+            _iter_stream_items(json_file))